@@ -0,0 +1,42 @@
+# So sánh AVLVisualizer.bulk_load với chèn từng giá trị (insert_avl)
+# Chạy: python -m bench.avl_bulk_load [n1 n2 ...]
+import gc
+import random
+import sys
+import time
+
+from visualizer.avl_visualizer import AVLVisualizer
+
+
+def run(sizes, seed=42):
+    visualizer = AVLVisualizer(None)
+    rows = []
+    for n in sizes:
+        values = random.Random(seed).sample(range(n * 10), n)
+
+        start = time.perf_counter()
+        root = None
+        for v in values:
+            root = visualizer.insert_avl(root, v)
+        insert_time = time.perf_counter() - start
+        del root
+        gc.collect()
+
+        start = time.perf_counter()
+        visualizer.bulk_load(values)
+        bulk_time = time.perf_counter() - start
+        gc.collect()
+
+        start = time.perf_counter()
+        visualizer.bulk_load(sorted(values))
+        sorted_time = time.perf_counter() - start
+
+        rows.append((n, insert_time, bulk_time, sorted_time))
+    return rows
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    print(f"{'n':>10} {'insert_avl':>12} {'bulk_load':>12} {'bulk(sorted)':>13} {'speedup':>8}")
+    for n, insert_time, bulk_time, sorted_time in run(sizes):
+        print(f"{n:>10} {insert_time:>11.3f}s {bulk_time:>11.3f}s {sorted_time:>12.3f}s {insert_time / bulk_time:>7.1f}x")
@@ -0,0 +1,80 @@
+# So sánh định dạng text (bảng preorder) với định dạng nhị phân mmap
+# Chạy: python -m bench.file_format [n1 n2 ...]
+import gc
+import os
+import sys
+import tempfile
+import time
+
+from core import serialization
+from visualizer.binary_tree_visualizer import BinaryTreeVisualizer
+
+
+def materialize(root):
+    # Chạm vào mọi node như khi vẽ toàn bộ cây
+    count = 0
+    stack = [root] if root else []
+    while stack:
+        node = stack.pop()
+        count += 1
+        node.val
+        if node.right:
+            stack.append(node.right)
+        if node.left:
+            stack.append(node.left)
+    return count
+
+
+def run(sizes):
+    visualizer = BinaryTreeVisualizer(None)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        text_path = os.path.join(tmp, "tree.txt")
+        bin_path = os.path.join(tmp, "tree" + serialization.BINARY_SUFFIX)
+        for n in sizes:
+            root = visualizer.bulk_load(range(n))
+
+            start = time.perf_counter()
+            serialization.save_file(text_path, root)
+            text_save = time.perf_counter() - start
+
+            start = time.perf_counter()
+            serialization.save_file(bin_path, root)
+            bin_save = time.perf_counter() - start
+            del root
+            gc.collect()
+
+            start = time.perf_counter()
+            loaded = serialization.load_file(text_path)
+            text_load = time.perf_counter() - start
+            del loaded
+            gc.collect()
+
+            # open_binary: mmap, node được tạo khi chạm tới; load_file: đọc hết thành TreeNode
+            start = time.perf_counter()
+            with serialization.open_binary(bin_path) as tree:
+                loaded = tree.root()
+                bin_open = time.perf_counter() - start
+                materialize(loaded)
+                bin_lazy = time.perf_counter() - start
+                del loaded
+            gc.collect()
+
+            start = time.perf_counter()
+            loaded = serialization.load_file(bin_path)
+            bin_full = time.perf_counter() - start
+            del loaded
+            gc.collect()
+
+            rows.append((n, os.path.getsize(text_path), os.path.getsize(bin_path),
+                         text_save, bin_save, text_load, bin_open, bin_lazy, bin_full))
+    return rows
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    print(f"{'n':>10} {'text MB':>8} {'bin MB':>7} {'save txt':>9} {'save bin':>9} "
+          f"{'load txt':>9} {'open bin':>9} {'bin+walk':>9} {'load bin':>9}")
+    for n, text_size, bin_size, text_save, bin_save, text_load, bin_open, bin_lazy, bin_full in run(sizes):
+        print(f"{n:>10} {text_size / 1e6:>8.1f} {bin_size / 1e6:>7.1f} {text_save:>8.3f}s {bin_save:>8.3f}s "
+              f"{text_load:>8.3f}s {bin_open:>8.4f}s {bin_lazy:>8.3f}s {bin_full:>8.3f}s")
@@ -0,0 +1,260 @@
+# Benchmark các engine cây (AVL / BST / duyệt / serializer / draw_tree) trên canvas giả, xuất JSON
+# Chạy:  python -m bench.harness run [--size N] [--seed S] [--only avl.] [--out result.json]
+#        python -m bench.harness compare old.json new.json [--threshold 0.2]
+# Thoát với mã 1 khi compare phát hiện regression.
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from bench import workloads
+from bench.headless import HeadlessCanvas
+from components.traversal_bar import TraversalBar
+from core import serialization, traversal
+from visualizer.avl_visualizer import AVLVisualizer
+from visualizer.bst_visualizer import BSTVisualizer
+
+clock = time.perf_counter_ns
+
+
+# --- Các case: nhận (n, seed, repeat), dựng dữ liệu ngoài vùng đo, trả về danh sách độ trễ (ns) ---
+def _engine(name):
+    if name == "avl":
+        vis = AVLVisualizer(HeadlessCanvas())
+        return vis, vis.insert_avl, vis.delete_avl, vis.search
+    vis = BSTVisualizer(HeadlessCanvas())
+    return vis, vis.insert_bst, vis.delete_node, vis.search
+
+
+def engine_ops(name, kind):
+    def case(n, seed, repeat):
+        vis, insert, delete, search = _engine(name)
+        ops = workloads.operations(kind, n, seed)
+        root = None
+        latencies = []
+        for op, key in ops:
+            start = clock()
+            if op == "insert":
+                root = insert(root, key)
+            elif op == "delete":
+                root = delete(root, key)
+            else:
+                search(root, key)
+            latencies.append(clock() - start)
+        return latencies
+    return case
+
+
+def engine_delete(name):
+    def case(n, seed, repeat):
+        vis, insert, delete, _ = _engine(name)
+        keys = workloads.keys("random", n, seed)
+        root = vis.bulk_load(keys)
+        random.Random(seed + 1).shuffle(keys)
+        latencies = []
+        for key in keys:
+            start = clock()
+            root = delete(root, key)
+            latencies.append(clock() - start)
+        return latencies
+    return case
+
+
+def _avl_tree(n, seed):
+    vis = AVLVisualizer(HeadlessCanvas())
+    vis.set_root(vis.bulk_load(workloads.keys("random", n, seed)))
+    return vis
+
+
+def _repeat(repeat, func, *args):
+    latencies = []
+    for _ in range(repeat):
+        start = clock()
+        func(*args)
+        latencies.append(clock() - start)
+    return latencies
+
+
+def traversal_case(mode):
+    def case(n, seed, repeat):
+        root = _avl_tree(n, seed).root
+        # Các hàm get_*_list của TraversalBar không dùng tới widget -> gọi thẳng, không cần Tk
+        return _repeat(repeat, getattr(TraversalBar, f"get_{mode}_list"), None, root)
+    return case
+
+
+def serialize_case(fmt, direction):
+    def case(n, seed, repeat):
+        root = _avl_tree(n, seed).root
+        suffix = serialization.BINARY_SUFFIX if fmt == "binary" else ".txt"
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tree" + suffix)
+            serialization.save_file(path, root)
+            if direction == "save":
+                return _repeat(repeat, serialization.save_file, path, root)
+            latencies = []
+            for _ in range(repeat):
+                start = clock()
+                loaded = serialization.load_file(path)
+                for _ in traversal.preorder(loaded):
+                    pass  # Chạm vào mọi node như khi vẽ
+                latencies.append(clock() - start)
+                del loaded
+            return latencies
+    return case
+
+
+def draw_full(n, seed, repeat):
+    vis = _avl_tree(n, seed)
+    latencies = []
+    for _ in range(repeat):
+        vis._dirty = set()  # Không có thay đổi được đánh dấu -> layout + vẽ lại toàn bộ
+        start = clock()
+        vis.draw_tree(vis.root)
+        latencies.append(clock() - start)
+    return latencies
+
+
+def draw_incremental(n, seed, repeat):
+    vis = _avl_tree(n, seed)
+    vis.draw_tree(vis.root)
+    rng = random.Random(seed + 2)
+    latencies = []
+    for _ in range(repeat * 20):
+        key = rng.randrange(n * 10)
+        start = clock()
+        vis.root = vis.insert_avl(vis.root, key)
+        vis.draw_tree(vis.root)
+        latencies.append(clock() - start)
+    return latencies
+
+
+CASES = {}
+for _engine_name in ("avl", "bst"):
+    for _kind in workloads.KINDS:
+        CASES[f"{_engine_name}.{_kind}"] = engine_ops(_engine_name, _kind)
+    CASES[f"{_engine_name}.delete"] = engine_delete(_engine_name)
+for _mode in ("bfs", "preorder", "inorder", "postorder"):
+    CASES[f"traversal.{_mode}"] = traversal_case(_mode)
+for _fmt in ("text", "binary"):
+    for _direction in ("save", "load"):
+        CASES[f"serialize.{_fmt}.{_direction}"] = serialize_case(_fmt, _direction)
+CASES["draw.full"] = draw_full
+CASES["draw.incremental"] = draw_incremental
+
+
+# --- Đo ---
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def measure(case, n, seed, repeat, memory=True):
+    gc.collect()
+    latencies = case(n, seed, repeat)
+    ordered = sorted(latencies)
+    total = sum(latencies) or 1
+    result = {
+        "ops": len(latencies),
+        "ops_per_sec": len(latencies) * 1e9 / total,
+        "p50_us": percentile(ordered, 0.50) / 1e3,
+        "p99_us": percentile(ordered, 0.99) / 1e3,
+    }
+    if memory:
+        # Lượt chạy riêng dưới tracemalloc (làm chậm) -> không ảnh hưởng số đo thời gian ở trên
+        gc.collect()
+        tracemalloc.start()
+        case(n, seed, repeat)
+        result["peak_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    return result
+
+
+def run(n, seed, repeat, only=None, memory=True, log=None):
+    results = {}
+    for name, case in CASES.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        results[name] = measure(case, n, seed, repeat, memory)
+        if log:
+            log(name, results[name])
+    return {
+        "meta": {
+            "size": n,
+            "seed": seed,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(old, new, threshold):
+    # Regression: ops/sec giảm, p99 hoặc bộ nhớ đỉnh tăng quá threshold (tỉ lệ)
+    rows = []
+    for name in sorted(set(old["results"]) & set(new["results"])):
+        a, b = old["results"][name], new["results"][name]
+        flags = []
+        if b["ops_per_sec"] < a["ops_per_sec"] * (1 - threshold):
+            flags.append("throughput")
+        if b["p99_us"] > a["p99_us"] * (1 + threshold):
+            flags.append("p99")
+        if "peak_kb" in a and "peak_kb" in b and b["peak_kb"] > a["peak_kb"] * (1 + threshold):
+            flags.append("memory")
+        rows.append((name, a["ops_per_sec"], b["ops_per_sec"], flags))
+    return rows
+
+
+def _print_result(name, result):
+    memory = f" {result['peak_kb']:>10.0f}KB" if "peak_kb" in result else ""
+    print(f"{name:<24} {result['ops_per_sec']:>12.0f}/s {result['p50_us']:>10.1f}us {result['p99_us']:>10.1f}us{memory}",
+          file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.harness")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run")
+    run_parser.add_argument("--size", type=int, default=2000)
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--only", action="append", help="chỉ chạy case có tên bắt đầu bằng giá trị này")
+    run_parser.add_argument("--no-memory", action="store_true")
+    run_parser.add_argument("--out")
+    compare_parser = sub.add_parser("compare")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.20)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = run(args.size, args.seed, args.repeat, args.only, not args.no_memory, _print_result)
+        text = json.dumps(report, indent=2)
+        if args.out:
+            with open(args.out, "w") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        return 0
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    regressions = 0
+    for name, before, after, flags in compare(old, new, args.threshold):
+        regressions += bool(flags)
+        mark = "REGRESSION " + ",".join(flags) if flags else "ok"
+        print(f"{name:<24} {before:>12.0f}/s -> {after:>12.0f}/s {after / before - 1:>+7.1%}  {mark}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
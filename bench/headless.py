@@ -0,0 +1,112 @@
+# Canvas giả (không cần màn hình) cho benchmark: giữ đúng API mà các visualizer dùng,
+# lưu item trong dict để chi phí vẽ vẫn tỉ lệ với số item được tạo / sửa
+import itertools
+
+
+class HeadlessCanvas:
+    def __init__(self, width=1200, height=800):
+        self.width = width
+        self.height = height
+        self.items = {}
+        self.options = {}
+        self._ids = itertools.count(1)
+        self._xview = 0.0
+        self._yview = 0.0
+
+    def _create(self, kind, coords, options):
+        item = next(self._ids)
+        self.items[item] = (kind, coords, options)
+        return item
+
+    def create_line(self, *coords, **options):
+        return self._create("line", coords, options)
+
+    def create_oval(self, *coords, **options):
+        return self._create("oval", coords, options)
+
+    def create_text(self, *coords, **options):
+        return self._create("text", coords, options)
+
+    def create_rectangle(self, *coords, **options):
+        return self._create("rectangle", coords, options)
+
+    def coords(self, item, *coords):
+        kind, old, options = self.items[item]
+        if coords:
+            self.items[item] = (kind, coords, options)
+        return old
+
+    def itemconfig(self, item, **options):
+        self.items[item][2].update(options)
+
+    itemconfigure = itemconfig
+
+    def delete(self, *items):
+        for item in items:
+            if item == "all":
+                self.items.clear()
+            else:
+                self.items.pop(item, None)
+
+    def tag_lower(self, *args):
+        pass
+
+    def tag_raise(self, *args):
+        pass
+
+    def config(self, **options):
+        self.options.update(options)
+
+    configure = config
+
+    def cget(self, key):
+        return self.options.get(key, 0)
+
+    def bind(self, *args):
+        pass
+
+    def update_idletasks(self):
+        pass
+
+    def after(self, delay, callback=None, *args):
+        return None
+
+    def after_idle(self, callback, *args):
+        return None
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+    def winfo_toplevel(self):
+        return self
+
+    def _region(self):
+        x0, y0, x1, y1 = self.options.get("scrollregion", (0, 0, self.width, self.height))
+        return x0, y0, x1 - x0, y1 - y0
+
+    def xview_moveto(self, fraction):
+        self._xview = fraction
+
+    def yview_moveto(self, fraction):
+        self._yview = fraction
+
+    def xview(self, *args):
+        if len(args) == 2 and args[0] == "moveto":
+            self._xview = float(args[1])
+        return self._xview, self._xview
+
+    def yview(self, *args):
+        if len(args) == 2 and args[0] == "moveto":
+            self._yview = float(args[1])
+        return self._yview, self._yview
+
+    def canvasx(self, x):
+        x0, _, width, _ = self._region()
+        return x0 + self._xview * width + x
+
+    def canvasy(self, y):
+        _, y0, _, height = self._region()
+        return y0 + self._yview * height + y
@@ -0,0 +1,52 @@
+# Dãy thao tác có seed cho benchmark: cùng (kind, n, seed) luôn cho cùng một dãy
+import random
+from bisect import bisect_left
+from itertools import accumulate
+
+KINDS = ("random", "sorted", "reverse", "zipfian", "mixed")
+
+
+def keys(kind, n, seed):
+    # n key để chèn (random / sorted / reverse không trùng, zipfian lặp nhiều ở vài key "nóng")
+    rng = random.Random(seed)
+    if kind == "random":
+        return rng.sample(range(n * 10), n)
+    if kind == "sorted":
+        return list(range(n))
+    if kind == "reverse":
+        return list(range(n - 1, -1, -1))
+    if kind == "zipfian":
+        return zipf(rng, n, n)
+    raise ValueError(f"Unknown workload: {kind}")
+
+
+def zipf(rng, count, universe, s=1.1):
+    # Phân phối Zipf trên [0, universe): lấy mẫu theo hàm phân phối tích lũy + bisect
+    cumulative = list(accumulate(1.0 / (rank ** s) for rank in range(1, universe + 1)))
+    total = cumulative[-1]
+    # Key nóng nằm rải rác, không dồn về một đầu của cây
+    labels = rng.sample(range(universe * 10), universe)
+    return [labels[bisect_left(cumulative, rng.random() * total)] for _ in range(count)]
+
+
+def operations(kind, n, seed):
+    # Dãy (thao tác, key): với "mixed" gồm insert / delete / search (50/25/25) trên tập key đang có,
+    # các kiểu khác chỉ gồm insert
+    if kind != "mixed":
+        return [("insert", key) for key in keys(kind, n, seed)]
+    rng = random.Random(seed)
+    present = []
+    ops = []
+    for _ in range(n):
+        roll = rng.random()
+        if roll < 0.5 or not present:
+            key = rng.randrange(n * 10)
+            present.append(key)
+            ops.append(("insert", key))
+        elif roll < 0.75:
+            i = rng.randrange(len(present))
+            present[i], present[-1] = present[-1], present[i]
+            ops.append(("delete", present.pop()))
+        else:
+            ops.append(("search", rng.choice(present)))
+    return ops
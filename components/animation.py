@@ -0,0 +1,81 @@
+import math
+import time
+
+# Bộ lập lịch hoạt ảnh theo khung hình: tốc độ tính bằng bước / giây, số bước đến hạn tính từ đồng hồ
+# monotonic kể từ mốc (không cộng dồn độ trễ của after()). Tốc độ thấp: đánh thức đúng lúc bước kế tiếp
+# đến hạn. Tốc độ cao: mỗi khung hình chạy nhiều bước trong ngân sách budget_ms rồi chỉ vẽ trạng thái cuối.
+
+INSTANT = math.inf
+
+
+class FrameScheduler:
+    def __init__(self, widget, step, render, on_finish=None, fps=60, budget_ms=8):
+        self.widget = widget  # widget Tk cung cấp after / after_cancel
+        self.step = step  # step() -> False khi đã hết bước
+        self.render = render  # render(): vẽ trạng thái sau bước cuối của khung hình
+        self.on_finish = on_finish
+        self.frame = 1.0 / fps
+        self.budget = budget_ms / 1000
+        self.speed = 1.0
+        self.clock = time.monotonic
+        self.running = False
+        self._pending = None
+        self._t0 = 0.0
+        self._done = 0
+
+    def start(self):
+        self.stop()
+        self.running = True
+        self._anchor()
+        self._pending = self.widget.after(0, self._tick)
+
+    def stop(self):
+        self.running = False
+        if self._pending is not None:
+            self.widget.after_cancel(self._pending)
+            self._pending = None
+
+    def set_speed(self, speed):
+        self.speed = speed
+        if self.running:
+            self._anchor()
+
+    def _anchor(self):
+        # Mốc mới (bắt đầu, tiếp tục, đổi tốc độ, bị tụt lại): bước đến hạn tính lại từ đây
+        self._t0 = self.clock()
+        self._done = 0
+
+    def _tick(self):
+        self._pending = None
+        if not self.running:
+            return
+        start = self.clock()
+        deadline = start + self.budget
+        due = INSTANT if self.speed == INSTANT else int((start - self._t0) * self.speed) - self._done
+        steps = 0
+        finished = False
+        while steps < due:
+            if not self.step():
+                finished = True
+                break
+            steps += 1
+            if self.clock() >= deadline:
+                break
+        self._done += steps
+        if steps:
+            self.render()
+        if finished:
+            self.running = False
+            if self.on_finish is not None:
+                self.on_finish()
+            return
+
+        if self.speed == INSTANT:
+            wake = start + self.frame
+        else:
+            if due - steps > self.speed * self.frame:
+                # Hết ngân sách mà vẫn nợ hơn một khung hình: bỏ phần nợ thay vì dồn sang các khung sau
+                self._anchor()
+            wake = max(self._t0 + (self._done + 1) / self.speed, start + self.frame)
+        delay = max(1, math.ceil((wake - self.clock()) * 1000))
+        self._pending = self.widget.after(delay, self._tick)
@@ -0,0 +1,77 @@
+import tkinter as tk
+import tkinter.messagebox as messagebox
+from core import tree_node
+
+
+class HistoryPanel(tk.Toplevel):
+    # Cửa sổ lịch sử phiên bản: kéo thanh trượt để tua qua các phiên bản, Undo / Redo,
+    # lưu / khôi phục snapshot có tên. Mỗi lần tua chỉ là đổi root của visualizer.
+    def __init__(self, parent, visualizer):
+        super().__init__(parent)
+        self.visualizer = visualizer
+        self.title("Tree history")
+        self.geometry("420x330")
+        self.transient(parent)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.version_label = tk.Label(self, font=("Arial", 12), anchor="w", justify="left")
+        self.version_label.pack(fill="x", padx=15, pady=(12, 0))
+        self.scale = tk.Scale(self, orient="horizontal", showvalue=False, from_=0, to=0,
+                              command=lambda value: self.visualizer.goto_version(int(value)))
+        self.scale.pack(fill="x", padx=15)
+
+        buttons = tk.Frame(self)
+        buttons.pack(fill="x", padx=15, pady=(0, 10))
+        self.undo_btn = tk.Button(buttons, text="Undo", font=("Arial", 12), width=8, command=visualizer.undo)
+        self.undo_btn.pack(side="left")
+        self.redo_btn = tk.Button(buttons, text="Redo", font=("Arial", 12), width=8, command=visualizer.redo)
+        self.redo_btn.pack(side="left", padx=5)
+
+        tk.Label(self, text="Snapshots:", font=("Arial", 12), anchor="w").pack(fill="x", padx=15)
+        snapshot_row = tk.Frame(self)
+        snapshot_row.pack(fill="x", padx=15)
+        self.name_entry = tk.Entry(snapshot_row, font=("Arial", 12))
+        self.name_entry.pack(side="left", fill="x", expand=True)
+        self.name_entry.bind("<Return>", lambda e: self.save_snapshot())
+        tk.Button(snapshot_row, text="Save", font=("Arial", 12), width=8,
+                  command=self.save_snapshot).pack(side="left", padx=(5, 0))
+
+        self.snapshot_list = tk.Listbox(self, font=("Arial", 12), height=5)
+        self.snapshot_list.pack(fill="both", expand=True, padx=15, pady=5)
+        self.snapshot_list.bind("<Double-Button-1>", lambda e: self.restore_snapshot())
+        tk.Button(self, text="Restore", font=("Arial", 12), width=8,
+                  command=self.restore_snapshot).pack(side="right", padx=15, pady=(0, 10))
+        self.refresh()
+
+    def refresh(self):
+        history = self.visualizer.history
+        if history is None:
+            return
+        self.scale.config(to=len(history) - 1)
+        self.scale.set(history.index)
+        self.version_label.config(
+            text=f"Version {history.index + 1}/{len(history)}: {history.label}\n"
+                 f"{tree_node.size(history.root)} nodes, height {tree_node.height(history.root)}")
+        self.undo_btn.config(state="normal" if history.can_undo() else "disabled")
+        self.redo_btn.config(state="normal" if history.can_redo() else "disabled")
+        names = list(history.snapshots)
+        if list(self.snapshot_list.get(0, tk.END)) != names:
+            self.snapshot_list.delete(0, tk.END)
+            self.snapshot_list.insert(tk.END, *names)
+
+    def save_snapshot(self):
+        name = self.name_entry.get().strip()
+        if not name:
+            messagebox.showwarning("Warning", "Please enter a snapshot name.", parent=self)
+            return
+        self.visualizer.save_snapshot(name)
+        self.name_entry.delete(0, tk.END)
+
+    def restore_snapshot(self):
+        selection = self.snapshot_list.curselection()
+        if selection:
+            self.visualizer.restore_snapshot(self.snapshot_list.get(selection[0]))
+
+    def close(self):
+        self.visualizer.history_panel = None
+        self.destroy()
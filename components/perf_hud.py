@@ -0,0 +1,76 @@
+from core import perf, tree_node
+
+REFRESH_MS = 250  # Chu kỳ cập nhật HUD khi đang hiện
+# (nhãn, tên timer trong core.perf)
+ROWS = (
+    ("draw_tree", "draw_tree"),
+    ("layout", "layout"),
+    ("canvas render", "render"),
+    ("tree op", "tree_op"),
+    ("sidebar", "sidebar"),
+    ("traversal step", "traversal_step"),
+)
+
+
+class PerfHUD:
+    # Lớp phủ ở góc trên-trái vùng nhìn của canvas: last / avg của các timer trong core.perf,
+    # số canvas item, số node, chiều cao cây. Bật / tắt bằng F3, chỉ đọc số liệu khi đang hiện.
+    visible = False  # Dùng chung giữa các visualizer: đổi loại cây vẫn giữ trạng thái bật
+
+    def __init__(self, canvas, visualizer):
+        self.canvas = canvas
+        self.visualizer = visualizer
+        self.text = None
+        self.box = None
+        self._after = None
+        if PerfHUD.visible:
+            self._refresh()
+
+    def toggle(self):
+        PerfHUD.visible = not PerfHUD.visible
+        perf.set_enabled(PerfHUD.visible)
+        if PerfHUD.visible:
+            self._refresh()
+        else:
+            self._hide()
+
+    def _hide(self):
+        if self._after is not None:
+            self.canvas.after_cancel(self._after)
+            self._after = None
+        if self.canvas.winfo_exists():
+            self.canvas.delete("hud")
+        self.text = self.box = None
+
+    def _lines(self):
+        lines = [f"{'F3 perf':<15}{'last':>9}{'avg':>9}"]
+        for label, name in ROWS:
+            t = perf.TIMERS.get(name)
+            if t is None or not t.count:
+                lines.append(f"{label:<15}{'-':>9}{'-':>9}")
+            else:
+                lines.append(f"{label:<15}{t.last * 1000:>9.2f}{t.average * 1000:>9.2f} ms")
+        canvas = self.canvas
+        root = self.visualizer.root
+        lines.append(f"{'canvas items':<15}{len(canvas.find_all()) - len(canvas.find_withtag('hud')):>9}")
+        lines.append(f"{'nodes':<15}{tree_node.size(root):>9}")
+        lines.append(f"{'height':<15}{tree_node.height(root):>9}")
+        return "\n".join(lines)
+
+    def _refresh(self):
+        self._after = None
+        canvas = self.canvas
+        if not PerfHUD.visible or not canvas.winfo_exists():
+            return
+        # clear_canvas() xóa mọi item -> tạo lại khi item của HUD không còn
+        if self.text is None or not canvas.type(self.text):
+            self.box = canvas.create_rectangle(0, 0, 0, 0, fill="#263238", outline="", tags=("hud",))
+            self.text = canvas.create_text(0, 0, anchor="nw", fill="white", font=("Courier", 10), tags=("hud",))
+        x = canvas.canvasx(0) + 8
+        y = canvas.canvasy(0) + 8
+        canvas.itemconfig(self.text, text=self._lines())
+        canvas.coords(self.text, x + 6, y + 4)
+        x0, y0, x1, y1 = canvas.bbox(self.text)
+        canvas.coords(self.box, x0 - 6, y0 - 4, x1 + 6, y1 + 4)
+        canvas.tag_raise("hud")  # node mới tạo nằm trên HUD
+        self._after = canvas.after(REFRESH_MS, self._refresh)
@@ -0,0 +1,58 @@
+import tkinter as tk
+import tkinter.ttk as ttk
+import tkinter.messagebox as messagebox
+
+POLL_MS = 50  # Chu kỳ đọc hàng đợi của job bằng after()
+
+
+class ProgressDialog(tk.Toplevel):
+    # Hộp tiến độ modal cho một core.jobs.Job: thanh tiến độ + nút Cancel.
+    # Job xong -> đóng hộp rồi gọi on_done(kết quả) trên UI thread; lỗi -> thông báo; hủy -> chỉ đóng.
+    def __init__(self, parent, title, job, on_done):
+        super().__init__(parent)
+        self.job = job
+        self.on_done = on_done
+        self.title(title)
+        self.geometry("320x120")
+        self.resizable(False, False)
+        self.transient(parent)
+
+        self.label = tk.Label(self, text=f"{title}...", font=("Arial", 12), anchor="w")
+        self.label.pack(fill="x", padx=20, pady=(15, 5))
+        self.bar = ttk.Progressbar(self, orient="horizontal", mode="determinate", maximum=100)
+        self.bar.pack(fill="x", padx=20)
+        self.cancel_btn = tk.Button(self, text="Cancel", font=("Arial", 12), width=8, command=self.cancel)
+        self.cancel_btn.pack(side="right", padx=20, pady=10)
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        # Modal: cây không bị sửa trong lúc thread nền đang đọc / dựng. grab chỉ được khi cửa sổ đã hiện
+        # (X11: "grab failed: window not viewable") -> đợi tới lúc rảnh, chưa hiện thì thử lại
+        self.after_idle(self._grab)
+        self._after = self.after(POLL_MS, self._poll)
+
+    def _grab(self):
+        if not self.winfo_exists():
+            return
+        try:
+            self.grab_set()
+        except tk.TclError:
+            self.after(POLL_MS, self._grab)
+
+    def cancel(self):
+        self.job.cancel()
+        self.label.config(text="Cancelling...")
+        self.cancel_btn.config(state="disabled")
+
+    def _poll(self):
+        for kind, payload in self.job.poll():
+            if kind == "progress":
+                self.bar["value"] = payload * 100
+                continue
+            self.grab_release()
+            self.destroy()
+            if kind == "done":
+                self.on_done(payload)
+            elif kind == "error":
+                messagebox.showerror("Error", str(payload))
+            return
+        self._after = self.after(POLL_MS, self._poll)
@@ -5,16 +5,15 @@ import tkinter.messagebox as messagebox
 from tkinter.filedialog import asksaveasfilename
 from PIL import Image, ImageTk
 import os
-from visualizer.binary_tree_visualizer import BinaryTreeVisualizer
+from visualizer.binary_tree_visualizer import BinaryTreeVisualizer, TREE_FILE_TYPES
+from core.tree_node import TreeNode
+from core import jobs, perf, serialization, traversal, order_stats, sampling
 from controller import Controller
 from tkinter.filedialog import askopenfilename
+from itertools import islice
 
+VALUES_PER_LINE = 10  # Ô Array của BST/AVL: số giá trị trên một dòng
 
-class TreeNode:
-    def __init__(self, val):
-        self.val = val
-        self.left = None
-        self.right = None
 
 class Sidebar(tk.Frame):
     def __init__(self, parent, show_status=None):
@@ -140,15 +139,15 @@ class Sidebar(tk.Frame):
 
 
     def format_array_multiline(self, array):
-        lines = []
-        for i, val in enumerate(array):
-            if val == 0:
-                continue  # Bỏ qua nếu node cha là rỗng
-            left = array[2 * i + 1] if 2 * i + 1 < len(array) and array[2 * i + 1] != 0 else "0"
-            right = array[2 * i + 2] if 2 * i + 2 < len(array) and array[2 * i + 2] != 0 else "0"
-            lines.append(f"{val}, {left}, {right}")
-        return "\n".join(lines)
+        # Mỗi dòng: "value, left, right" với left/right là chỉ số dòng (-1 = không có con)
+        return serialization.format_table(array)
+
+    def is_binary_mode(self):
+        from visualizer.bst_visualizer import BSTVisualizer
+        from visualizer.avl_visualizer import AVLVisualizer
+        return isinstance(self.visualizer, BinaryTreeVisualizer) and not isinstance(self.visualizer, (BSTVisualizer, AVLVisualizer))
 
+    @perf.timed("sidebar")
     def update_array_display(self, array):
         self.array_display.config(state="normal")
         self.array_display.delete("1.0", tk.END)
@@ -159,28 +158,16 @@ class Sidebar(tk.Frame):
         if isinstance(self.visualizer, BinaryTreeVisualizer) and not isinstance(self.visualizer, (BSTVisualizer, AVLVisualizer)):
             text = self.format_array_multiline(array)
         else:
-            # Lọc bỏ các số 0 (node rỗng) cho BST/AVL
-            filtered = [v for v in array if v != 0]
-            text = ", ".join(map(str, filtered))
+            # BST/AVL: dãy giá trị inorder (0 là một giá trị hợp lệ, không còn bị lọc),
+            # xuống dòng sau mỗi VALUES_PER_LINE giá trị: Text chỉ vẽ các dòng đang nhìn thấy, dòng ngắn giữ cuộn nhanh
+            text = ",\n".join(", ".join(map(str, array[i:i + VALUES_PER_LINE]))
+                               for i in range(0, len(array), VALUES_PER_LINE))
         self.array_display.insert("1.0", text)
         # Đừng đặt state="disabled" ở đây, để người dùng sửa trực tiếp
     def tree_to_array(self, root):
-        if not root:
-            return []
-        result = []
-        queue = [root]
-        while queue:
-            node = queue.pop(0)
-            if node:
-                result.append(node.val)
-                queue.append(node.left)
-                queue.append(node.right)
-            else:
-                result.append(0)
-        # Bỏ các 0 dư thừa cuối mảng
-        while result and result[-1] == 0:
-            result.pop()
-        return result
+        if self.is_binary_mode():
+            return serialization.tree_to_table(root)
+        return [node.val for node in traversal.inorder(root)]
 
     def save_tree_to_file(self):
         if not self.tree_root:
@@ -189,39 +176,17 @@ class Sidebar(tk.Frame):
 
         file_path = asksaveasfilename(
             defaultextension=".txt",
-            filetypes=[("Text Files", "*.txt")],
+            filetypes=TREE_FILE_TYPES,
             title="Save Tree As"
         )
 
         if not file_path:
             return  # Người dùng bấm Cancel
 
-        from visualizer.binary_tree_visualizer import BinaryTreeVisualizer
-        from visualizer.bst_visualizer import BSTVisualizer
-        from visualizer.avl_visualizer import AVLVisualizer
-
-        if isinstance(self.visualizer, BinaryTreeVisualizer) and not isinstance(self.visualizer, (BSTVisualizer, AVLVisualizer)):
-            # Binary Tree: giữ nguyên
-            result = []
-            def dfs(node):
-                if not node:
-                    return
-                left_val = node.left.val if node.left else 0
-                right_val = node.right.val if node.right else 0
-                result.append(f"{node.val}, {left_val}, {right_val}")
-                dfs(node.left)
-                dfs(node.right)
-            dfs(self.tree_root)
-            content = "\n".join(result)
-        else:
-            # BST/AVL: chỉ lưu các giá trị khác 0, dãy ngang
-            array = self.tree_to_array(self.tree_root)
-            filtered = [str(v) for v in array if v != 0]
-            content = ", ".join(filtered)
-
+        # Mọi loại cây đều lưu dạng bảng preorder (value, left, right) -> giữ nguyên cấu trúc,
+        # đuôi .btree -> bảng nhị phân
         try:
-            with open(file_path, "w") as f:
-                f.write(content)
+            serialization.save_file(file_path, self.tree_root)
             self.show_toast_notification(f"Tree successfully saved to \n{file_path}")
         except Exception as e:
             self.show_toast_notification(f"Error saving file \n{e}")
@@ -262,85 +227,92 @@ class Sidebar(tk.Frame):
     def load_tree_from_file(self):
         file_path = askopenfilename(
             defaultextension=".txt",
-            filetypes=[("Text Files", "*.txt")],
+            filetypes=TREE_FILE_TYPES,
             title="Open Tree File"
         )
 
         if not file_path:
             return
 
-        try:
-            with open(file_path, "r") as f:
-                lines = f.readlines()
-
-            node_map = {}
-            for line in lines:
-                parts = line.strip().split(",")
-                if len(parts) != 3:
-                    continue
-                node_val = int(parts[0].strip())
-                left_val = int(parts[1].strip())
-                right_val = int(parts[2].strip())
-                node_map[node_val] = (left_val, right_val)
-
-            nodes = {}
+        vis = self.visualizer
+        binary_mode = self.is_binary_mode()
+        engine_class = type(vis.engine) if vis.engine is not None else None
 
-            def get_node(val):
-                if val == 0:
-                    return None
-                if val not in nodes:
-                    nodes[val] = TreeNode(val)
-                return nodes[val]
-
-            for val, (l_val, r_val) in node_map.items():
-                node = get_node(val)
-                node.left = get_node(l_val)
-                node.right = get_node(r_val)
-
-            root_val = int(lines[0].strip().split(",")[0])
-            root = get_node(root_val)
-
-            self.tree_root = root
-
-            # Vẽ lại cây
-            self.visualizer.draw_tree(self.tree_root)
-
-            # Cập nhật mảng nếu bạn cần
-            array_representation = self.tree_to_array(self.tree_root)
-            self.update_array_display(array_representation)
+        def build(progress):
+            # Chạy trên thread nền: chỉ đọc file và dựng cây mới, không chạm vào cây đang hiển thị
+            if serialization.is_binary_file(file_path):
+                # File nhị phân: đọc thẳng bảng int64 thành cây
+                return serialization.load_file(file_path, progress)
+            with open(file_path, "r") as f:
+                content = f.read()
+            if serialization.is_table_text(content) or binary_mode:
+                return serialization.loads(content, progress)
+            # File BST/AVL kiểu cũ: dãy giá trị, chèn lại lần lượt để dựng đúng cây
+            # (engine riêng, không có listener -> không đụng tới trạng thái vẽ của visualizer)
+            values = [int(v) for v in content.replace(",", " ").split()]
+            engine = engine_class()
+            root = None
+            for count, val in enumerate(values, 1):
+                root = engine.insert(root, val)
+                jobs.report(progress, count, len(values))
+            return root
 
-            self.show_toast_notification(f"Tree loaded from \n{file_path}")
-
-        except Exception as e:
-            self.show_toast_notification(f"Error loading file \n{e}")
+        vis.run_tree_job("Loading tree", build,
+                         on_done=lambda: self.show_toast_notification(f"Tree loaded from \n{file_path}"))
 
     def on_search_node(self):
-        value = self.search_entry.get()
-        if value.isdigit():
-            value = int(value)
+        self.search(self.search_entry.get())
 
-            # Tìm node trong cây (không kiểm tra trong self.array nữa)
-            self.highlighted_node = self._find_node(self.tree_root, value)
+    def search(self, text):
+        # Ô Find / menu "Find node" của canvas: số (tìm node) hoặc truy vấn thứ tự trên BST/AVL:
+        # "10..20", "#3", "rank 7", "floor 7", "ceil 7", "pred 7", "succ 7"
+        try:
+            query, args = order_stats.parse_query(text)
+        except ValueError:
+            self.show_toast_notification("Please enter an integer or a query (10..20, #3, floor 7).")
+            return
+        vis = self.visualizer
+        if query != "find" and not isinstance(vis, order_stats.OrderStatistics):
+            self.show_toast_notification("Order queries need a BST or AVL tree.")
+            return
+        if vis:
+            vis.set_highlight_range(None)
 
-            if self.highlighted_node:
-                if self.visualizer:
-                    self.visualizer.highlighted_node = self.highlighted_node
-                    self.visualizer.scroll_to_node(self.highlighted_node)
-                    self.visualizer.draw_tree(self.tree_root)
-            else:
-                self.show_toast_notification(f"No valid node found {value}.")
+        if query == "find":
+            # Tìm node trong cây (không kiểm tra trong self.array nữa)
+            self.highlighted_node = self._find_node(self.tree_root, args[0])
+            if not self.highlighted_node:
+                self.show_toast_notification(f"No valid node found {args[0]}.")
+        elif query == "range":
+            lo, hi = args
+            self.highlighted_node = None
+            vis.set_highlight(None)
+            vis.set_highlight_range((lo, hi))
+            first = next(vis.range_query(lo, hi), None)
+            if first:
+                vis.scroll_to_node(first)
+            self.show_toast_notification(f"{vis.count_range(lo, hi)} node(s) in [{lo}, {hi}].")
+            return
+        elif query == "rank":
+            self.show_toast_notification(f"{vis.rank(args[0])} node(s) smaller than {args[0]}.")
+            return
         else:
-            self.show_toast_notification("Please enter a valid integer.")
+            if query == "kth":
+                self.highlighted_node = vis.kth_smallest(args[0])
+            else:
+                self.highlighted_node = order_stats.QUERIES[query](vis.root, args[0])
+            if not self.highlighted_node:
+                self.show_toast_notification("No node matches the query.")
+
+        if self.highlighted_node and vis:
+            vis.set_highlight(self.highlighted_node)
+            vis.scroll_to_node(self.highlighted_node)
 
     def _find_node(self, root, value):
-        if root is None:
-            return None
-        if root.val == value:
-            return root
-        left_result = self._find_node(root.left, value)
-        if left_result:
-            return left_result
-        return self._find_node(root.right, value)
+        # Cây đang hiển thị: tra qua value_index của visualizer (O(1))
+        if self.visualizer and root is self.visualizer.root:
+            return self.visualizer.find_value(value)
+        return next((node for node in traversal.preorder(root) if node.val == value), None)
     
     def on_random_tree(self):
         self.popup = tk.Toplevel(self)
@@ -398,18 +370,13 @@ class Sidebar(tk.Frame):
             vis = self.visualizer
             if vis is None:
                 raise ValueError("Chưa có visualizer")
+            if not self.is_binary_mode() and max_val - min_val + 1 < extra:
+                raise ValueError("Không đủ số lượng giá trị duy nhất trong khoảng")
 
-            # Tạo cây mới
-            self.tree_root = vis.create_random_tree(min_val, max_val, extra)
-            self.visualizer.set_root(self.tree_root)
-            self.visualizer.draw_tree(self.tree_root)
-
-            # Cập nhật mảng nếu có
-            if hasattr(self, "tree_to_array") and hasattr(self, "update_array_display"):
-                self.array = self.tree_to_array(self.tree_root)
-                self.update_array_display(self.array)
-
+            # Tạo cây mới trên thread nền; xong thì visualizer thay root, vẽ và cập nhật mảng một lần
             self.popup.destroy()
+            vis.run_tree_job("Creating random tree",
+                             lambda progress: vis.create_random_tree(min_val, max_val, extra, progress))
 
         except Exception as e:
             print("DEBUG ERROR:", e)
@@ -450,9 +417,9 @@ class Sidebar(tk.Frame):
 
             if self.tree_root:  # Kiểm tra nếu cây đã được tạo
                 if self.visualizer:
-                    self.visualizer.set_root(self.tree_root)  # Gán cây vào visualizer
+                    self.tree_root = self.visualizer.set_root(self.tree_root)  # Gán cây vào visualizer
                     self.visualizer.draw_tree(self.tree_root)  # Vẽ cây
-                    new_array = self.visualizer.tree_to_array(self.tree_root)  # Cập nhật lại array
+                    new_array = self.tree_to_array(self.tree_root)  # Cập nhật lại array
                     self.array = new_array
                     self.update_array_display(new_array)
 
@@ -468,34 +435,18 @@ class Sidebar(tk.Frame):
             messagebox.showerror("Error", f"An error occurred: {e}")
 
     def generate_random_tree_array(self, min_value, max_value, depth):
-        max_nodes = 2**depth - 1
-        all_values = list(range(min_value, max_value + 1))
-
-        if max_nodes > len(all_values):
-            # Không đủ giá trị duy nhất => cho phép trùng
-            array = [random.choice(all_values) for _ in range(max_nodes)]
-            if min_value not in array:
-                array[0] = min_value
-            if max_value not in array:
-                array[-1] = max_value
-            return array
-        else:
-            # Đủ giá trị => đảm bảo min và max có mặt
-            base_values = all_values.copy()
-            base_values.remove(min_value)
-            if max_value != min_value:  # tránh remove 2 lần nếu bằng nhau
-                base_values.remove(max_value)
-
-            sample = random.sample(base_values, max_nodes - 2)
-            sample += [min_value, max_value]
-            random.shuffle(sample)
-            return sample
+        # Luôn có min và max; không đủ giá trị duy nhất => cho phép trùng.
+        # Lấy mẫu Floyd: O(số node) bộ nhớ, không dựng cả khoảng [min, max]
+        return sampling.random_tree_values(min_value, max_value, 2**depth - 1)
         
     def build_random_tree(self, values, current_depth, max_depth):
         if not values or current_depth > max_depth:
             return None
 
-        val = values.pop(random.randrange(len(values)))
+        # Lấy một phần tử ngẫu nhiên trong O(1): đổi chỗ với phần tử cuối rồi pop
+        i = random.randrange(len(values))
+        values[i], values[-1] = values[-1], values[i]
+        val = values.pop()
         node = TreeNode(val)
 
         force_create = current_depth < 2  # Ép phải có nhánh lúc đầu cho chắc kèo
@@ -533,7 +484,7 @@ class Sidebar(tk.Frame):
         self.highlighted_node = None
         self.update_array_display([])
         if self.visualizer:
-            self.visualizer.canvas.delete("all")
+            self.visualizer.on_clear_tree()  # Xóa cây của visualizer (không chỉ canvas) -> journal ghi nhận
 
     def build_tree_from_list(self, lst):
         if not lst:
@@ -569,36 +520,21 @@ class Sidebar(tk.Frame):
         from visualizer.avl_visualizer import AVLVisualizer
 
         if isinstance(self.visualizer, BinaryTreeVisualizer) and not isinstance(self.visualizer, (BSTVisualizer, AVLVisualizer)):
-            # --- Xử lý cho Binary Tree ---
-            lines = text.split("\n")
-            new_vals = []
-            for line in lines:
-                parts = line.split(",")
-                if len(parts) != 3:
-                    self.show_toast_notification("Error: Each line must have exactly 3 values (val, left, right).")
-                    return
-                try:
-                    val = int(parts[0].strip())
-                    new_vals.append(val)
-                except ValueError:
-                    self.show_toast_notification("Error: All values must be integers.")
-                    return
-
-            queue = [self.tree_root] if self.tree_root else []
-            idx = 0
-            changed = False
-            while queue and idx < len(new_vals):
-                node = queue.pop(0)
-                if node:
-                    if node.val != new_vals[idx]:
-                        node.val = new_vals[idx]
-                        changed = True
-                    idx += 1
-                    queue.append(node.left)
-                    queue.append(node.right)
-
-            if changed:
-                self.visualizer.root = self.tree_root  # Đảm bảo đồng bộ sau khi update!
+            # --- Xử lý cho Binary Tree: bảng (value, left, right) ---
+            try:
+                table = serialization.parse_table(text)
+                new_root = serialization.table_to_tree(table)
+            except ValueError as e:
+                self.show_toast_notification(f"Error: {e}")
+                return
+            values = [row[0] for row in table]
+            if len(set(values)) != len(values):
+                self.show_toast_notification("Error: Node values must be unique.")
+                return
+
+            if table != serialization.tree_to_table(self.tree_root):
+                self.tree_root = new_root
+                self.tree_root = self.visualizer.set_root(self.tree_root)  # Đảm bảo đồng bộ sau khi update!
                 self.visualizer.draw_tree(self.tree_root)
                 self.array = self.tree_to_array(self.tree_root)
                 self.update_array_display(self.array)
@@ -615,57 +551,31 @@ class Sidebar(tk.Frame):
                 self.show_toast_notification("Error: All values must be integers.")
                 return
 
-            inorder_nodes = []
-            def inorder(node):
-                if not node:
-                    return
-                inorder(node.left)
-                inorder_nodes.append(node)
-                inorder(node.right)
-            inorder(self.tree_root)
-
-            if len(new_vals) != len(inorder_nodes):
+            old_vals = [node.val for node in traversal.inorder(self.tree_root)]
+            if len(new_vals) != len(old_vals):
                 self.show_toast_notification("Error: Số lượng giá trị không khớp số node trong cây.")
                 return
 
-            # Kiểm tra BST: inorder phải tăng dần
-            if isinstance(self.visualizer, BSTVisualizer):
-                for i in range(1, len(new_vals)):
-                    if new_vals[i] <= new_vals[i-1]:
-                        self.show_toast_notification("Error: BST values must be strictly increasing (inorder).")
-                        return
-
-            # Kiểm tra AVL: inorder phải tăng dần và sau khi cập nhật phải rebuild lại cây để đảm bảo cân bằng
-            if isinstance(self.visualizer, AVLVisualizer):
-                for i in range(1, len(new_vals)):
-                    if new_vals[i] <= new_vals[i-1]:
-                        self.show_toast_notification("Error: AVL values must be strictly increasing (inorder).")
-                        return
-                # Xây lại cây AVL từ đầu để đảm bảo cân bằng
-                root = None
-                for val in new_vals:
-                    root = self.visualizer.insert_avl(root, val)
-                self.tree_root = root
-                self.visualizer.set_root(self.tree_root)
-                self.visualizer.draw_tree(self.tree_root)
-                self.array = self.tree_to_array(self.tree_root)
-                self.update_array_display(self.array)
-                self.show_toast_notification("AVL tree rebuilt successfully.")
+            # Kiểm tra BST/AVL: inorder phải tăng dần
+            if any(b <= a for a, b in zip(new_vals, islice(new_vals, 1, None))):
+                kind = "AVL" if isinstance(self.visualizer, AVLVisualizer) else "BST"
+                self.show_toast_notification(f"Error: {kind} values must be strictly increasing (inorder).")
                 return
 
-            changed = False
-            for node, val in zip(inorder_nodes, new_vals):
-                if node.val != val:
-                    node.val = val
-                    changed = True
-
-            if changed:
-                self.visualizer.draw_tree(self.tree_root)
-                self.array = self.tree_to_array(self.tree_root)
-                self.update_array_display(self.array)
-                self.show_toast_notification("Node values updated successfully.")
-            else:
+            if new_vals == old_vals:
                 self.show_toast_notification("No values changed.")
+                return
+
+            # Một batch: mọi giá trị đổi tại chỗ (cây giữ nguyên hình dạng, AVL vẫn cân bằng),
+            # commit layout + vẽ lại cây và ô Array đúng một lần
+            batch = self.visualizer.begin_batch()
+            batch.relabel(old_vals, new_vals)
+            batch.commit()
+            self.array = self.tree_to_array(self.visualizer.root)
+            if batch.skipped:
+                self.show_toast_notification(f"{len(batch.skipped)} edit(s) skipped: value missing or already in the tree.")
+                return
+            self.show_toast_notification("Node values updated successfully.")
 
     def set_visualizer(self, visualizer):
         self.visualizer = visualizer
@@ -694,8 +604,7 @@ def on_sidebar_button_click(sidebar, visualizer_class, right_frame):
     sample_tree.left.left = TreeNode(4)
     sample_tree.left.right = TreeNode(5)
 
-    sidebar.tree_root = sample_tree
-    visualizer.set_root(sample_tree)
+    sample_tree = sidebar.tree_root = visualizer.set_root(sample_tree)
     visualizer.draw_tree(sample_tree)
 
     # Cập nhật lại array display
@@ -1,5 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
+from collections import deque
+from components.animation import FrameScheduler, INSTANT
+from core import perf, traversal
+
+# Các nấc tốc độ của thanh Speed (bước / giây); nấc cuối chạy hết ngân sách mỗi khung hình
+SPEEDS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 100, 1000, 10000, 100000, INSTANT)
 
 class TraversalBar(tk.Frame):
     def __init__(self, parent, visualizer, tree_getter):
@@ -9,13 +15,20 @@ class TraversalBar(tk.Frame):
         self.parent = parent
         self.pack(side="bottom", fill="x")
 
-        self.traversal_nodes = []
+        self.traversal_nodes = []  # các node đã duyệt tới (lớn dần theo từng bước)
         self.traversal_index = 0
+        self.traversal_iter = None
+        self.traversal_total = None
         self.traversing = False
         self.paused = False
         self.traversal_mode = "bfs"
         self.result_popup = None
         self.option_popup = None
+        # Popup kết quả chỉ giữ max_visible_results giá trị cuối, danh sách đầy đủ xem qua nút "All"
+        self.max_visible_results = 200
+        self.shown_count = 0
+        self.shown_lengths = deque()
+        self.shown_truncated = False
 
         self.grid_columnconfigure(5, weight=1)
 
@@ -37,10 +50,18 @@ class TraversalBar(tk.Frame):
         self.node_label.grid(row=0, column=6, padx=5)
 
         tk.Label(self, text="Speed:", bg="grey", font=("Arial", 12)).grid(row=0, column=7, padx=(10, 0))
-        self.speed_var = tk.DoubleVar(value=1.0)
-        self.speed_scale = tk.Scale(self, from_=0.1, to=2.0, resolution=0.1,
-                                    orient="horizontal", variable=self.speed_var, length=100)
-        self.speed_scale.grid(row=0, column=8, padx=(0, 10))
+        self.speed_var = tk.IntVar(value=SPEEDS.index(1))  # chỉ số nấc trong SPEEDS
+        self.speed_scale = tk.Scale(self, from_=0, to=len(SPEEDS) - 1, resolution=1, showvalue=False,
+                                    orient="horizontal", variable=self.speed_var, length=100,
+                                    command=lambda _: self._on_speed())
+        self.speed_scale.grid(row=0, column=8)
+        self.speed_label = tk.Label(self, width=8, anchor="w", bg="grey", font=("Arial", 12))
+        self.speed_label.grid(row=0, column=9, padx=(0, 10))
+
+        # Mỗi khung hình có thể duyệt nhiều bước nhưng chỉ vẽ highlight của bước cuối
+        self.scheduler = FrameScheduler(self, self._advance, self._render_frame, self._finish_traversal)
+        self._frame_node = None
+        self._on_speed()
 
     def create_button(self, text, command, col):
         width = 9 if col == 0 else None  # Nút Traversal nhỏ lại chút
@@ -103,18 +124,11 @@ class TraversalBar(tk.Frame):
         if not root:
             return
 
-        self.traversal_nodes = {
-            "preorder": self.get_preorder_list,
-            "inorder": self.get_inorder_list,
-            "postorder": self.get_postorder_list,
-            "bfs": self.get_bfs_list,
-        }.get(self.traversal_mode, self.get_bfs_list)(root)
-
-        self.traversal_index = 0
+        self._begin_traversal(root)
+        self.scheduler.stop()
         self.traversing = False
         self.paused = True
         self.node_label.config(text="Node: -")
-        self.progress_var.set(0)
         self.visualizer.highlighted_node = None
         self.visualizer.draw_tree(self.tree_getter())
         self.show_result_popup()
@@ -124,20 +138,46 @@ class TraversalBar(tk.Frame):
         if not root:
             return
 
-        self.traversal_nodes = {
-            "preorder": self.get_preorder_list,
-            "inorder": self.get_inorder_list,
-            "postorder": self.get_postorder_list,
-            "bfs": self.get_bfs_list,
-        }.get(self.traversal_mode, self.get_bfs_list)(root)
-
-        self.traversal_index = 0
+        self._begin_traversal(root)
         self.traversing = True
         self.paused = False
         self.pause_btn.config(text="Pause")
 
         self.show_result_popup()
-        self._traversal_step()
+        self.scheduler.start()
+
+    def _begin_traversal(self, root):
+        # Chỉ tạo generator: O(1), các node được lấy dần ở mỗi bước
+        self.traversal_iter = traversal.walk(self.traversal_mode, root)
+        self.traversal_nodes = []
+        self.traversal_index = 0
+        self.traversal_total = traversal.tree_size(root)
+        self.progress_bar.config(mode="determinate" if self.traversal_total else "indeterminate")
+        self.progress_var.set(0)
+        self._reset_result_display()
+
+    def _next_node(self):
+        if self.traversal_iter is None:
+            return None
+        node = next(self.traversal_iter, None)
+        if node is None:
+            self.traversal_iter = None
+            self.progress_bar.config(mode="determinate")
+            self.progress_var.set(100 if self.traversal_nodes else 0)
+            return None
+        self.traversal_nodes.append(node)
+        self.traversal_index += 1
+        return node
+
+    @perf.timed("traversal_step")
+    def _show_step(self, node):
+        self.visualizer.set_highlight(node)
+        self.node_label.config(text=f"Node: {node.val}")
+        if self.traversal_total:
+            self.progress_var.set((self.traversal_index / self.traversal_total) * 100)
+        else:
+            self.progress_bar.step()
+        self.update_result_display()
 
     def show_result_popup(self):
         if self.result_popup and self.result_popup.winfo_exists():
@@ -164,108 +204,141 @@ class TraversalBar(tk.Frame):
         close_btn.bind("<Leave>", lambda e: close_btn.config(bg="white"))
         close_btn.bind("<Button-1>", lambda e: self.result_popup.destroy())
 
+        all_btn = tk.Label(container, text="All", font=("Arial", 11, "underline"),
+                           bg="white", fg="black", cursor="hand2")
+        all_btn.pack(side="right", anchor="ne", pady=5)
+        all_btn.bind("<Button-1>", lambda e: self.show_full_result())
+
         self.output_display = tk.Text(container, height=2, font=("Arial", 12),
                                       bg="white", wrap="word", relief="flat", bd=0)
         self.output_display.pack(side="left", fill="both", expand=True, padx=(10, 0), pady=5)
-        self.output_display.insert("1.0", "Traversal result: ")
-        self.output_display.config(state="disabled")
+        self.output_display.tag_config("bold", font=("Arial", 12, "bold"))
+        self._reset_result_display()
 
     def hide_result_popup(self):
         if self.result_popup and self.result_popup.winfo_exists():
             self.result_popup.destroy()
             self.result_popup = None
 
-    def update_result_display(self):
+    def _reset_result_display(self):
+        self.shown_count = 0
+        self.shown_lengths.clear()
+        self.shown_truncated = False
         if not self.result_popup or not hasattr(self, 'output_display'):
             return
-
         self.output_display.config(state="normal")
         self.output_display.delete("1.0", tk.END)
         self.output_display.insert("1.0", "Traversal result: ")
-
-        base_len = len("Traversal result: ")
-        for i, node in enumerate(self.traversal_nodes[:self.traversal_index]):
-            node_str = str(node.val)
-            self.output_display.insert(tk.END, node_str)
-
-            if i == self.traversal_index - 1:
-                start = base_len
-                end = start + len(node_str)
-                self.output_display.tag_add("bold", f"1.{start}", f"1.{end}")
-                self.output_display.tag_config("bold", font=("Arial", 12, "bold"))
-
-            base_len += len(node_str)
-            if i < self.traversal_index - 1:
-                self.output_display.insert(tk.END, " -> ")
-                base_len += 4
-
+        # "entries" đánh dấu chỗ bắt đầu các giá trị (sau tiêu đề)
+        self.output_display.mark_set("entries", "end-1c")
+        self.output_display.mark_gravity("entries", "left")
         self.output_display.config(state="disabled")
 
-    def _traversal_step(self):
-        if not self.traversing or self.traversal_index >= len(self.traversal_nodes):
-            self.traversing = False
-            self.pause_btn.config(text="Pause")
+    def update_result_display(self):
+        # Chỉ nối thêm các node mới duyệt: chi phí mỗi bước là hằng số
+        if not self.result_popup or not hasattr(self, 'output_display'):
+            return
+        if self.shown_count > self.traversal_index:
+            self._reset_result_display()
+        if self.shown_count == self.traversal_index:
             return
 
-        if not self.paused:
-            node = self.traversal_nodes[self.traversal_index]
-            self.visualizer.highlighted_node = node
-            self.visualizer.draw_tree(self.tree_getter())
-            self.node_label.config(text=f"Node: {node.val}")
-            self.traversal_index += 1
-            self.progress_var.set((self.traversal_index / len(self.traversal_nodes)) * 100)
-            self.update_result_display()
-
-        delay = int(1000 / self.speed_var.get())
-        self.after(delay, self._traversal_step)
+        display = self.output_display
+        display.config(state="normal")
+        start = max(self.shown_count, self.traversal_index - self.max_visible_results)
+        if start > self.shown_count:
+            self.shown_truncated = True
+        for node in self.traversal_nodes[start:self.traversal_index]:
+            node_str = str(node.val)
+            if self.shown_lengths:
+                display.insert(tk.END, " -> ")
+                self.shown_lengths.append(len(node_str) + 4)
+            else:
+                self.shown_lengths.append(len(node_str))
+            display.insert(tk.END, node_str)
+        self.shown_count = self.traversal_index
+
+        # Cắt bớt các giá trị cũ nhất để cửa sổ hiển thị luôn có kích thước cố định
+        while len(self.shown_lengths) > self.max_visible_results:
+            first = self.shown_lengths.popleft()
+            self.shown_lengths[0] -= 4  # bỏ luôn " -> " đứng trước giá trị kế tiếp
+            display.delete("entries", f"entries + {first + 4} chars")
+            self.shown_truncated = True
+        if self.shown_truncated and display.get("entries - 2 chars", "entries") != "… ":
+            display.insert("entries", "… ")
+            display.mark_set("entries", "entries + 2 chars")
+
+        # Chuyển tag bold sang giá trị vừa thêm
+        last_len = len(str(self.traversal_nodes[self.traversal_index - 1].val))
+        display.tag_remove("bold", "entries", tk.END)
+        display.tag_add("bold", f"end-1c - {last_len} chars", "end-1c")
+        display.see(tk.END)
+        display.config(state="disabled")
+
+    def show_full_result(self):
+        # Danh sách đầy đủ chỉ được dựng khi người dùng yêu cầu
+        popup = tk.Toplevel(self)
+        popup.title("Traversal result")
+        popup.geometry("600x300")
+        text = tk.Text(popup, font=("Arial", 12), wrap="word")
+        scroll = tk.Scrollbar(popup, command=text.yview)
+        text.config(yscrollcommand=scroll.set)
+        scroll.pack(side="right", fill="y")
+        text.pack(side="left", fill="both", expand=True)
+        text.insert("1.0", " -> ".join(str(node.val) for node in self.traversal_nodes[:self.traversal_index]))
+        text.config(state="disabled")
+
+    def speed(self):
+        return SPEEDS[self.speed_var.get()]
+
+    def _on_speed(self):
+        speed = self.speed()
+        if speed == INSTANT:
+            text = "Instant"
+        elif speed >= 1000:
+            text = f"{speed // 1000}k/s"
+        else:
+            text = f"{speed:g}/s"
+        self.speed_label.config(text=text)
+        self.scheduler.set_speed(speed)
+
+    def _advance(self):
+        node = self._next_node()
+        if node is None:
+            return False
+        self._frame_node = node
+        return True
+
+    def _render_frame(self):
+        self._show_step(self._frame_node)
+
+    def _finish_traversal(self):
+        self.traversing = False
+        self.pause_btn.config(text="Pause")
 
     def stop_traversal(self):
+        self.scheduler.stop()
         self.traversing = False
         self.paused = False
-        self.visualizer.highlighted_node = None
-        self.visualizer.draw_tree(self.tree_getter())
+        self.visualizer.set_highlight(None)
         self.node_label.config(text="Node: -")
+        self.progress_bar.config(mode="determinate")
         self.progress_var.set(0)
         self.pause_btn.config(text="Pause")
         # self.hide_result_popup()  # Bỏ dòng này nếu muốn popup vẫn hiện
         self.traversal_btn.config(text="Traversal")
 
-    def next_step(self):
-        if not self.traversal_nodes or self.traversal_index >= len(self.traversal_nodes):
-            return
-        node = self.traversal_nodes[self.traversal_index]
-        self.visualizer.highlighted_node = node
-        self.visualizer.draw_tree(self.tree_getter())
-        self.node_label.config(text=f"Node: {node.val}")
-        self.traversal_index += 1
-        self.progress_var.set((self.traversal_index / len(self.traversal_nodes)) * 100)
-        self.update_result_display()
-
     def get_bfs_list(self, root):
-        result = []
-        queue = [root]
-        while queue:
-            current = queue.pop(0)
-            if current:
-                result.append(current)
-                queue.append(current.left)
-                queue.append(current.right)
-        return result
+        return list(traversal.walk("bfs", root))
 
     def get_preorder_list(self, root):
-        if not root:
-            return []
-        return [root] + self.get_preorder_list(root.left) + self.get_preorder_list(root.right)
+        return list(traversal.walk("preorder", root))
 
     def get_inorder_list(self, root):
-        if not root:
-            return []
-        return self.get_inorder_list(root.left) + [root] + self.get_inorder_list(root.right)
+        return list(traversal.walk("inorder", root))
 
     def get_postorder_list(self, root):
-        if not root:
-            return []
-        return self.get_postorder_list(root.left) + self.get_postorder_list(root.right) + [root]
+        return list(traversal.walk("postorder", root))
     
     def toggle_pause_resume(self):
         self.show_result_popup()  # Đảm bảo popup luôn hiện khi pause/resume
@@ -273,14 +346,15 @@ class TraversalBar(tk.Frame):
         if self.traversing:
             self.paused = not self.paused
             self.pause_btn.config(text="Resume" if self.paused else "Pause")
+            if self.paused:
+                self.scheduler.stop()
+            else:
+                self.scheduler.start()
+
     def next_step(self):
-        if not self.traversal_nodes or self.traversal_index >= len(self.traversal_nodes):
+        node = self._next_node()
+        if node is None:
             return
-        self.show_result_popup()  # Đảm bảo bảng popup hiện khi next
-        node = self.traversal_nodes[self.traversal_index]
-        self.visualizer.highlighted_node = node
-        self.visualizer.draw_tree(self.tree_getter())
-        self.node_label.config(text=f"Node: {node.val}")
-        self.traversal_index += 1
-        self.progress_var.set((self.traversal_index / len(self.traversal_nodes)) * 100)
-        self.update_result_display()
+        if not self.result_popup or not self.result_popup.winfo_exists():
+            self.show_result_popup()  # Đảm bảo bảng popup hiện khi next
+        self._show_step(node)
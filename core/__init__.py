@@ -0,0 +1,8 @@
+# Lõi cây thuần Python (không import tkinter / PIL): node store, engine BST/AVL, duyệt cây, serializer.
+# Dùng được trực tiếp trong batch job / server; các visualizer chỉ là lớp hiển thị bọc quanh engine.
+from core.tree_node import TreeNode
+from core.node_store import NodeStore, NodeView
+from core.bst import BSTEngine, TreeListener, bulk_load
+from core.batch import Batch
+from core.avl import AVLEngine
+from core.persistent import PersistentBSTEngine, PersistentAVLEngine, History
@@ -0,0 +1,75 @@
+from core import tree_node
+from core.bst import BSTEngine
+
+
+def balance(node):
+    return tree_node.height(node.left) - tree_node.height(node.right) if node else 0
+
+
+class AVLEngine(BSTEngine):
+    # Chèn / xóa như BSTEngine, rồi đi ngược đường đi để xoay cân bằng lại
+
+    def right_rotate(self, y):
+        x = y.left
+        T2 = x.right
+
+        x.right = y
+        y.left = T2
+
+        tree_node.update(y)
+        tree_node.update(x)
+        self.listener.links_changed(x, y)
+        return x
+
+    def left_rotate(self, x):
+        y = x.right
+        T2 = y.left
+
+        y.left = x
+        x.right = T2
+
+        tree_node.update(x)
+        tree_node.update(y)
+        self.listener.links_changed(x, y)
+        return y
+
+    def rebalance_node(self, node):
+        b = balance(node)
+        if b > 1:
+            if balance(node.left) < 0:  # LR
+                node.left = self.left_rotate(node.left)
+            return self.right_rotate(node)  # LL
+        if b < -1:
+            if balance(node.right) > 0:  # RL
+                node.right = self.right_rotate(node.right)
+            return self.left_rotate(node)  # RR
+        return node
+
+    def _repair(self, root, path):
+        # Đi ngược từ node sâu nhất lên root theo stack đường đi, hết cân bằng lại khi chiều cao
+        # của một node không đổi; các tổ tiên phía trên chỉ còn phải cập nhật size
+        for k in range(len(path) - 1, -1, -1):
+            node = path[k]
+            old_height = node.height
+            tree_node.update(node)
+            sub = self.rebalance_node(node)
+            if sub is not node:
+                if k == 0:
+                    root = sub
+                elif path[k - 1].left is node:
+                    path[k - 1].left = sub
+                else:
+                    path[k - 1].right = sub
+                if k:
+                    self.listener.links_changed(path[k - 1])
+            if sub.height == old_height:
+                for ancestor in reversed(path[:k]):
+                    ancestor.size = 1 + tree_node.size(ancestor.left) + tree_node.size(ancestor.right)
+                break
+        return root
+
+    def _store_insert(self, root, key):
+        return self.store.avl_insert(root, key)
+
+    def _store_delete(self, root, key):
+        return self.store.avl_delete(root, key)
@@ -0,0 +1,110 @@
+# Giao dịch gom nhiều thao tác insert / delete / edit: các thao tác chỉ được ghi lại,
+# cây không đổi cho tới commit(); discard() (hoặc lỗi trong khối with) bỏ toàn bộ.
+# commit() chạy thử trên tập giá trị trước (edit không áp dụng được -> skipped, không lỗi), rồi mới áp dụng;
+# một thao tác ném lỗi giữa chừng -> các thao tác đã áp dụng được hoàn tác bằng thao tác ngược,
+# cây trở về đúng tập giá trị ban đầu. Engine vẫn báo từng thay đổi (kể cả thao tác ngược) cho listener,
+# phía hiển thị gom lại và layout + vẽ một lần ở on_commit.
+
+
+class Batch:
+    def __init__(self, engine, root, on_commit=None):
+        self.engine = engine
+        self.root = root
+        self.on_commit = on_commit  # on_commit(root mới), gọi một lần sau khi áp dụng mọi thao tác
+        self.ops = []  # (tên method của engine, tham số)
+        self.skipped = []  # (old, new) của các edit bị bỏ ở lần commit gần nhất
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+        return False
+
+    def insert(self, key):
+        self.ops.append(("insert", (key,)))
+
+    def delete(self, key):
+        self.ops.append(("delete", (key,)))
+
+    def edit(self, old, new):
+        self.ops.append(("edit", (old, new)))
+
+    def relabel(self, old_values, new_values):
+        # Đổi giá trị theo vị trí inorder, hai dãy cùng tăng dần: sửa các giá trị tăng từ phải sang trái,
+        # rồi các giá trị giảm từ trái sang phải -> mỗi giá trị mới luôn nằm giữa hai node kề
+        # nên mọi edit đều sửa tại chỗ, cây giữ nguyên hình dạng
+        pairs = [(a, b) for a, b in zip(old_values, new_values) if a != b]
+        for a, b in reversed(pairs):
+            if b > a:
+                self.edit(a, b)
+        for a, b in pairs:
+            if b < a:
+                self.edit(a, b)
+
+    def discard(self):
+        self.ops = []
+
+    def _plan(self):
+        # Chạy thử trên tập giá trị, không đụng vào cây: chỉ giữ các thao tác thực sự đổi cây
+        engine, root = self.engine, self.root
+        present = {}  # giá trị -> còn trong cây sau các thao tác trước đó hay không
+
+        def has(key):
+            if key not in present:
+                present[key] = engine.find(root, key) is not None
+            return present[key]
+
+        plan, skipped = [], []
+        for name, args in self.ops:
+            if name == "insert":
+                if not has(args[0]):
+                    present[args[0]] = True
+                    plan.append((name, args))
+            elif name == "delete":
+                if has(args[0]):
+                    present[args[0]] = False
+                    plan.append((name, args))
+            else:
+                old, new = args
+                if old == new:
+                    continue
+                if not has(old) or has(new):
+                    skipped.append(args)
+                    continue
+                present[old], present[new] = False, True
+                plan.append((name, args))
+        return plan, skipped
+
+    def commit(self):
+        plan, self.skipped = self._plan()
+        self.ops = []
+        root = self.root
+        engine = self.engine
+        applied = 0
+        try:
+            for name, args in plan:
+                root = getattr(engine, name)(root, *args)
+                applied += 1
+        except Exception:
+            for name, args in reversed(plan[:applied]):
+                root = getattr(engine, INVERSE[name])(root, *args[::-1])
+            self._finish(root)
+            raise
+        return self._finish(root)
+
+    def _finish(self, root):
+        self.root = root
+        if self.on_commit is not None:
+            self.on_commit(root)
+        return root
+
+
+# Thao tác ngược (tham số đảo thứ tự: edit(old, new) -> edit(new, old))
+INVERSE = {"insert": "delete", "delete": "insert", "edit": "edit"}
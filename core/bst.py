@@ -0,0 +1,266 @@
+from bisect import bisect_left
+from itertools import islice
+from core import order_stats, traversal, tree_node
+from core.jobs import PROGRESS_EVERY, substep
+from core.tree_node import TreeNode
+
+# Thuật toán BST không phụ thuộc GUI: chạy trên TreeNode, hoặc trên NodeStore khi engine có store.
+# Mỗi thay đổi liên kết được báo cho listener (visualizer dùng để vẽ lại cục bộ và cập nhật ValueIndex).
+
+
+class TreeListener:
+    # Listener mặc định: bỏ qua mọi thông báo (batch job, server...)
+
+    def links_changed(self, *nodes):
+        # Các node vừa đổi left/right: cha của node chèn/xóa, node bị xoay, node bị gỡ (có thể có None)
+        pass
+
+    def node_added(self, root, new_root, node):
+        # Sau mỗi lần chèn: root là gốc trước thao tác, node là node mới (None nếu trùng)
+        pass
+
+    def node_removed(self, root, new_root, key, moved=None):
+        # moved: node có 2 con đã nhận giá trị của successor (successor bị gỡ khỏi cây)
+        pass
+
+    def node_renamed(self, root, node, old):
+        # Giá trị của node đổi tại chỗ (old -> node.val), liên kết và hình dạng cây giữ nguyên
+        pass
+
+    def nodes_copied(self, root, new_root, pairs):
+        # Engine bền vững: các node (old, new) của cây root được thay bằng bản chép, cây giờ là new_root.
+        # Node cũ vẫn thuộc về phiên bản trước; các thông báo tiếp theo nói về cây new_root
+        pass
+
+
+def bulk_load(values, store=None, progress=None):
+    # Dựng cây cân bằng từ danh sách giá trị: bỏ trùng + sắp xếp (bỏ qua nếu đã tăng dần),
+    # rồi lấy phần tử giữa làm gốc, gán height/size trực tiếp -> O(n) với dãy đã sắp xếp
+    keys = values if isinstance(values, list) else list(values)
+    if not all(a < b for a, b in zip(keys, islice(keys, 1, None))):
+        keys = sorted(set(keys))
+    if store is not None:
+        return store.view(store.build_balanced(keys))
+    return _build_balanced(keys, progress)
+
+
+def _build_balanced(keys, progress=None):
+    # Tạo node theo thứ tự key (báo tiến độ), rồi nối: node giữa của mỗi đoạn [lo, hi] là gốc đoạn đó
+    n = len(keys)
+    nodes = []
+    for start in range(0, n, PROGRESS_EVERY):
+        nodes.extend(map(TreeNode, keys[start:start + PROGRESS_EVERY]))
+        if progress is not None:
+            progress(len(nodes) / n)
+    if not nodes:
+        return None
+    stack = [(0, n - 1)]
+    while stack:
+        lo, hi = stack.pop()
+        mid = (lo + hi) // 2
+        node = nodes[mid]
+        node.height = (hi - lo + 1).bit_length()  # chiều cao của cây dựng theo phần tử giữa
+        node.size = hi - lo + 1
+        if lo < mid:
+            node.left = nodes[(lo + mid - 1) // 2]
+            stack.append((lo, mid - 1))
+        if mid < hi:
+            node.right = nodes[(mid + 1 + hi) // 2]
+            stack.append((mid + 1, hi))
+    return nodes[(n - 1) // 2]
+
+
+def rebuild_with_root(root, key, progress=None):
+    # Cây mới chứa cùng các giá trị, node có giá trị key (hoặc giá trị nhỏ nhất >= key) làm root,
+    # hai bên là cây con cân bằng
+    all_values = [node.val for node in traversal.inorder(root)]
+    i = bisect_left(all_values, key)
+    if i == len(all_values):
+        return root
+    new_root = TreeNode(all_values[i])
+    new_root.left = bulk_load(all_values[:i], progress=substep(progress, 0, 0.5))
+    new_root.right = bulk_load(all_values[i + 1:], progress=substep(progress, 0.5, 1))
+    tree_node.update(new_root)
+    return new_root
+
+
+class BSTEngine:
+    def __init__(self, store=None, listener=None):
+        self.store = store  # NodeStore hoặc None (cây TreeNode)
+        self.listener = listener if listener is not None else TreeListener()
+
+    def find(self, root, key):
+        if self.store is not None:
+            return self.store.view(self.store.find(self.store.index(root), key))
+        node = root
+        while node is not None:
+            if key == node.val:
+                return node
+            node = node.left if key < node.val else node.right
+        return None
+
+    def search(self, root, key):
+        return self.find(root, key) is not None
+
+    def bulk_load(self, values, progress=None):
+        return bulk_load(values, self.store, progress)
+
+    def insert(self, root, key):
+        if self.store is not None:
+            store = self.store
+            count = len(store)
+            new_root = store.view(self._store_insert(store.index(root), key))
+            # Trùng -> store không tạo node mới: báo node None như nhánh TreeNode
+            node = store.view(store.find(new_root.idx, key)) if len(store) != count else None
+            self.listener.node_added(root, new_root, node)
+            return new_root
+        if not root:
+            new_node = self._new_node(key)
+            self.listener.node_added(root, new_node, new_node)
+            return new_node
+        path = []
+        node = root
+        while node:
+            if key == node.val:
+                self.listener.node_added(root, root, None)
+                return root  # Không chèn trùng
+            path.append(node)
+            node = node.left if key < node.val else node.right
+        root, path = self._writable(root, path)
+        parent = path[-1]
+        new_node = self._new_node(key)
+        if key < parent.val:
+            parent.left = new_node
+        else:
+            parent.right = new_node
+        self.listener.links_changed(parent)
+        new_root = self._repair(root, path)
+        self.listener.node_added(root, new_root, new_node)
+        return new_root
+
+    def delete(self, root, key):
+        if self.store is not None:
+            store = self.store
+            target = store.find(store.index(root), key)
+            if target == -1:
+                return root  # Không có key: không đổi gì, không báo listener (như nhánh TreeNode)
+            moved = store.view(target) if store.left[target] != -1 and store.right[target] != -1 else None
+            new_root = store.view(self._store_delete(store.index(root), key))
+            self.listener.node_removed(root, new_root, key, moved)
+            return new_root
+        path = []  # tổ tiên của node bị gỡ, từ root xuống
+        node = root
+        while node and node.val != key:
+            path.append(node)
+            node = node.left if key < node.val else node.right
+        if not node:
+            return root
+        moved = None
+        if node.left and node.right:
+            # Node có 2 con: chép giá trị successor (node nhỏ nhất cây con phải) rồi gỡ successor
+            path.append(node)
+            k = len(path) - 1
+            succ = node.right
+            while succ.left:
+                path.append(succ)
+                succ = succ.left
+            root, path = self._writable(root, path)
+            moved = path[k]
+            moved.val = succ.val
+            node = succ
+        else:
+            root, path = self._writable(root, path)
+        child = node.left if node.left else node.right
+        parent = path[-1] if path else None
+        self.listener.links_changed(parent, node, child)
+        if parent is None:
+            self.listener.node_removed(root, child, key)
+            return child
+        if parent.left is node:
+            parent.left = child
+        else:
+            parent.right = child
+        new_root = self._repair(root, path)
+        self.listener.node_removed(root, new_root, key, moved)
+        return new_root
+
+    def edit(self, root, old, new):
+        # Đổi giá trị old -> new: sửa tại chỗ khi new vẫn nằm giữa predecessor và successor
+        # (giữ nguyên hình dạng cây), ngược lại xóa rồi chèn lại. old không có / new đã có -> bỏ qua
+        node = self.find(root, old)
+        if node is None or old == new or self.find(root, new) is not None:
+            return root
+        pred = order_stats.predecessor(root, old)
+        succ = order_stats.successor(root, old)
+        if (pred is None or pred.val < new) and (succ is None or new < succ.val):
+            return self._rename(root, node, new)
+        return self.insert(self.delete(root, old), new)
+
+    def _rename(self, root, node, new):
+        old = node.val
+        node.val = new
+        self.listener.node_renamed(root, node, old)
+        return root
+
+    def _new_node(self, key):
+        return TreeNode(key)
+
+    def _writable(self, root, path):
+        # Trước khi sửa các node trên path (từ root xuống): trả về (root, path) được phép sửa.
+        # Engine thường sửa tại chỗ; engine bền vững (core.persistent) trả về bản chép của path
+        return root, path
+
+    def _repair(self, root, path):
+        # Sau khi đổi liên kết ở cuối path (từ root xuống): sửa height/size, trả về root mới
+        tree_node.update_path(path)
+        return root
+
+    def _store_insert(self, root, key):
+        return self.store.bst_insert(root, key)
+
+    def _store_delete(self, root, key):
+        return self.store.bst_delete(root, key)
+
+    def rebalance(self, root):
+        # Day–Stout–Warren: cân bằng lại cây tại chỗ, O(n) thời gian, O(1) bộ nhớ phụ; trả về root mới
+        if root is None:
+            return None
+        if self.store is not None:
+            return self.store.view(self.store.dsw(self.store.index(root)))
+        pseudo_root = TreeNode(None)
+        pseudo_root.right = root
+
+        # 1. Duỗi cây thành "vine" (chuỗi lệch phải) bằng các phép xoay phải
+        count = 0
+        tail = pseudo_root
+        rest = tail.right
+        while rest:
+            if rest.left:
+                temp = rest.left
+                rest.left = temp.right
+                temp.right = rest
+                rest = temp
+                tail.right = temp
+            else:
+                count += 1
+                tail = rest
+                rest = rest.right
+
+        # 2. Gấp vine lại thành cây cân bằng bằng các lượt xoay trái
+        leaves = count + 1 - (1 << ((count + 1).bit_length() - 1))
+        _compress(pseudo_root, leaves)
+        size = count - leaves
+        while size > 1:
+            size //= 2
+            _compress(pseudo_root, size)
+        return tree_node.augment(pseudo_root.right)  # Các phép xoay đã làm sai height/size
+
+
+def _compress(pseudo_root, count):
+    scanner = pseudo_root
+    for _ in range(count):
+        child = scanner.right
+        scanner.right = child.right
+        scanner = scanner.right
+        child.right = scanner.left
+        scanner.left = child
@@ -0,0 +1,70 @@
+import queue
+import threading
+
+# Chạy một hàm nặng (dựng cây, đọc file...) trên thread nền. Tiến độ / kết quả đi qua hàng đợi,
+# phía UI lấy ra bằng poll() (không chặn). Hủy là hợp tác: hàm nhận progress(fraction) và
+# progress raise Cancelled ở lần báo kế tiếp sau khi cancel().
+
+PROGRESS_EVERY = 4096  # Các hàm trong core báo tiến độ sau mỗi chừng này phần tử
+
+
+class Cancelled(Exception):
+    pass
+
+
+def report(progress, done, total):
+    # Gọi trong vòng lặp: chỉ báo sau mỗi PROGRESS_EVERY phần tử (progress có thể là None)
+    if progress is not None and done % PROGRESS_EVERY == 0:
+        progress(done / total if total else 1.0)
+
+
+def substep(progress, start, end):
+    # Tiến độ của một bước con, ánh xạ [0, 1] vào [start, end] của tiến độ chung
+    if progress is None:
+        return None
+    return lambda fraction: progress(start + (end - start) * fraction)
+
+
+class Job:
+    def __init__(self, func, *args):
+        self.messages = queue.Queue()  # ("progress", fraction) / ("done", kết quả) / ("error", lỗi) / ("cancelled", None)
+        self._cancel = threading.Event()
+        self._reported = -1.0
+        self.thread = threading.Thread(target=self._run, args=(func, args), daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def progress(self, fraction):
+        if self._cancel.is_set():
+            raise Cancelled
+        # Bỏ các bước nhỏ hơn 1% để hàng đợi không phình ra
+        if fraction - self._reported >= 0.01 or fraction >= 1.0:
+            self._reported = fraction
+            self.messages.put(("progress", fraction))
+
+    def _run(self, func, args):
+        try:
+            result = func(self.progress, *args)
+        except Cancelled:
+            self.messages.put(("cancelled", None))
+        except Exception as e:
+            self.messages.put(("error", e))
+        else:
+            self.messages.put(("cancelled", None) if self._cancel.is_set() else ("done", result))
+
+    def poll(self):
+        messages = []
+        while True:
+            try:
+                messages.append(self.messages.get_nowait())
+            except queue.Empty:
+                return messages
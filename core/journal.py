@@ -0,0 +1,282 @@
+import os
+import re
+import struct
+import time
+import zlib
+from core import bst, serialization, tree_node
+from core.avl import AVLEngine
+from core.bst import BSTEngine
+from core.jobs import report, substep
+from core.tree_node import TreeNode
+
+# Journal chỉ-ghi-thêm của các thao tác sửa cây, nằm trong một thư mục phiên:
+#   checkpoint-<gen>.btree  cây tại thời điểm checkpoint (định dạng nhị phân của serialization)
+#   journal-<gen>.bjnl      các thao tác sau checkpoint đó
+# Khôi phục = đọc checkpoint mới nhất (tốc độ bulk load) + chạy lại phần đuôi journal (<= COMPACT_EVERY
+# bản ghi). Bản ghi có kích thước cố định + CRC: bản ghi ghi dở khi crash bị bỏ và cắt khỏi file.
+# Checkpoint mới và journal rỗng của nó được ghi + fsync xong, checkpoint mới được rename sang tên thật,
+# sau cùng mới xóa thế hệ cũ -> crash ở bất kỳ bước nào vẫn còn một cặp checkpoint + journal nhất quán.
+
+MAGIC = b"BJNL"
+VERSION = 1
+HEADER = struct.Struct("<4sHHq")  # magic, version, loại cây, thế hệ
+RECORD = struct.Struct("<Bqqq")  # thao tác, a, b, c
+CRC = struct.Struct("<I")
+RECORD_SIZE = RECORD.size + CRC.size
+SUFFIX = ".bjnl"
+
+KINDS = ("binary", "bst", "avl")
+ENGINES = {"bst": BSTEngine, "avl": AVLEngine}
+
+# BST / AVL (theo giá trị)
+INSERT = 1  # a = key
+DELETE = 2  # a = key
+EDIT = 3  # a = old, b = new
+REBALANCE = 4
+TO_ROOT = 5  # a = key: dựng lại cây với key làm root (bst.rebuild_with_root)
+# Cây nhị phân thường (theo đường đi: bit i của a = 1 nếu bước thứ i rẽ phải, b = độ sâu)
+ADD_CHILD = 6  # a, b = đường đi tới node mới, c = giá trị
+SET_VALUE = 7  # c = giá trị mới
+CUT = 8  # gỡ cả cây con
+SWITCH = 9  # hoán đổi con trái / phải
+SWITCH_ALL = 10  # tree_node.switch_full_nodes
+MAX_DEPTH = 62  # đường đi sâu hơn không vừa một int64 -> ghi checkpoint thay cho bản ghi
+
+FLUSH_BYTES = 64 * 1024  # Gom bản ghi rồi mới write + fsync
+FLUSH_SECONDS = 0.2  # Độ trễ tối đa trước khi bản ghi đang gom được fsync (phía UI hẹn giờ gọi flush)
+COMPACT_EVERY = 50000  # Số bản ghi sau checkpoint thì nên gộp thành checkpoint mới
+
+
+class JournalError(ValueError):
+    pass
+
+
+def path_bits(path):
+    # path: các node từ root xuống node đích -> (a, b) của bản ghi, None nếu quá sâu
+    depth = len(path) - 1
+    if depth > MAX_DEPTH:
+        return None
+    bits = 0
+    for i in range(depth):
+        if path[i].right is path[i + 1]:
+            bits |= 1 << i
+    return bits, depth
+
+
+def _follow(root, bits, depth):
+    node = root
+    for i in range(depth):
+        if node is None:
+            break
+        node = node.right if bits >> i & 1 else node.left
+    if node is None:
+        raise JournalError("Journal refers to a node that does not exist.")
+    return node
+
+
+def apply(root, kind, op, a, b, c, engine=None):
+    # Áp dụng một bản ghi lên cây, trả về root mới
+    if kind != "binary":
+        if op == INSERT:
+            return engine.insert(root, a)
+        if op == DELETE:
+            return engine.delete(root, a)
+        if op == EDIT:
+            return engine.edit(root, a, b)
+        if op == REBALANCE:
+            return engine.rebalance(root)
+        if op == TO_ROOT:
+            return bst.rebuild_with_root(root, a)
+    else:
+        if op == ADD_CHILD:
+            parent = _follow(root, a, b - 1) if b else None
+            if parent is None:
+                return TreeNode(c)
+            setattr(parent, "right" if a >> (b - 1) & 1 else "left", TreeNode(c))
+            return root
+        if op == SET_VALUE:
+            _follow(root, a, b).val = c
+            return root
+        if op == CUT:
+            if not b:
+                return None
+            parent = _follow(root, a, b - 1)
+            setattr(parent, "right" if a >> (b - 1) & 1 else "left", None)
+            return root
+        if op == SWITCH:
+            node = _follow(root, a, b)
+            node.left, node.right = node.right, node.left
+            return root
+        if op == SWITCH_ALL:
+            return tree_node.switch_full_nodes(root)
+    raise JournalError(f"Unknown journal operation {op} for a {kind} tree.")
+
+
+def _generations(directory):
+    checkpoints, journals = set(), set()
+    for name in os.listdir(directory):
+        match = re.fullmatch(r"(checkpoint|journal)-(\d+)(\.btree|\.bjnl)", name)
+        if match:
+            (checkpoints if match.group(1) == "checkpoint" else journals).add(int(match.group(2)))
+    return checkpoints, journals
+
+
+def _sync_directory(directory):
+    # Để rename / tạo file cũng bền (POSIX); Windows không mở được thư mục -> bỏ qua
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class Journal:
+    def __init__(self, directory, kind, generation, file):
+        self.directory = directory
+        self.kind = kind
+        self.generation = generation
+        self.records = 0  # số bản ghi sau checkpoint hiện tại
+        self._file = file
+        self._buffer = bytearray()
+        self._first_pending = None  # thời điểm bản ghi chưa fsync đầu tiên
+
+    def _path(self, prefix, generation, suffix):
+        return os.path.join(self.directory, f"{prefix}-{generation}{suffix}")
+
+    @classmethod
+    def create(cls, directory, kind, root):
+        # Phiên mới: checkpoint của cây hiện tại + journal rỗng; xóa phiên cũ trong thư mục (nếu có)
+        if kind not in KINDS:
+            raise JournalError(f"Unknown tree kind {kind!r}.")
+        os.makedirs(directory, exist_ok=True)
+        checkpoints, journals = _generations(directory)
+        journal = cls(directory, kind, max(checkpoints | journals, default=0), None)
+        journal.checkpoint(root)
+        return journal
+
+    @classmethod
+    def recover(cls, directory, progress=None):
+        # -> (journal mở để ghi tiếp, root khôi phục được). Chỉ dùng checkpoint đã rename xong
+        checkpoints, _ = _generations(directory)
+        if not checkpoints:
+            raise JournalError("No checkpoint found in this folder.")
+        journal = cls(directory, None, max(checkpoints), None)
+        journal.kind, root, good = journal._replay(progress)
+        f = open(journal._path("journal", journal.generation, SUFFIX), "r+b")
+        f.truncate(HEADER.size + good * RECORD_SIZE)
+        f.seek(0, 2)
+        journal._file = f
+        journal.records = good
+        return journal, root
+
+    def _replay(self, progress=None):
+        # Đọc checkpoint của thế hệ hiện tại + chạy lại journal, không sửa file -> (loại cây, root, số bản ghi dùng được)
+        generation = self.generation
+        root = serialization.read_binary(self._path("checkpoint", generation, serialization.BINARY_SUFFIX),
+                                         substep(progress, 0, 0.5))
+        tree_node.augment(root)
+
+        with open(self._path("journal", generation, SUFFIX), "rb") as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            raise JournalError("Journal header is missing or truncated.")
+        magic, version, kind_id, file_generation = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION or kind_id >= len(KINDS) or file_generation != generation:
+            raise JournalError("Not a journal file for this checkpoint.")
+        kind = KINDS[kind_id]
+        engine = ENGINES[kind]() if kind in ENGINES else None
+
+        # Chạy lại các bản ghi còn nguyên vẹn; dừng ở bản ghi hỏng đầu tiên (đuôi ghi dở) hoặc bản ghi
+        # đúng CRC nhưng không áp dụng được lên cây -> giữ checkpoint + phần đã chạy, cắt phần còn lại
+        count = (len(data) - HEADER.size) // RECORD_SIZE
+        good = 0
+        replay_progress = substep(progress, 0.5, 1)
+        for i in range(count):
+            start = HEADER.size + i * RECORD_SIZE
+            body = data[start:start + RECORD.size]
+            if CRC.unpack_from(data, start + RECORD.size)[0] != zlib.crc32(body):
+                break
+            try:
+                root = apply(root, kind, *RECORD.unpack(body), engine=engine)
+            except JournalError:
+                break
+            good += 1
+            report(replay_progress, good, count)
+        if kind == "binary":
+            tree_node.augment(root)
+        return kind, root, good
+
+    def verify(self, root):
+        # Chế độ kiểm tra: khôi phục từ đĩa (checkpoint + journal hiện tại) rồi so hình dạng với cây đang sửa
+        self.flush()
+        kind, recovered, good = self._replay()
+        if good != self.records or serialization.tree_to_table(recovered) != serialization.tree_to_table(root):
+            raise AssertionError(f"Journal replay ({good}/{self.records} records) does not reproduce the live tree")
+
+    def append(self, op, a=0, b=0, c=0):
+        body = RECORD.pack(op, a, b, c)
+        self._buffer += body
+        self._buffer += CRC.pack(zlib.crc32(body))
+        self.records += 1
+        if self._first_pending is None:
+            self._first_pending = time.monotonic()
+        if len(self._buffer) >= FLUSH_BYTES:
+            self.flush()
+
+    @property
+    def pending(self):
+        return bool(self._buffer)
+
+    def flush_due(self):
+        return self._first_pending is not None and time.monotonic() - self._first_pending >= FLUSH_SECONDS
+
+    def flush(self):
+        # Một lần write + fsync cho cả nhóm bản ghi
+        if self._buffer and self._file is not None:
+            self._file.write(self._buffer)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._buffer.clear()
+        self._first_pending = None
+
+    def needs_compaction(self):
+        return self.records >= COMPACT_EVERY
+
+    def checkpoint(self, root):
+        # Gộp journal vào checkpoint mới (cũng dùng khi cả cây bị thay: load, random, clear, undo...)
+        self.flush()
+        old = self.generation
+        new = old + 1
+        target = self._path("checkpoint", new, serialization.BINARY_SUFFIX)
+        serialization.write_binary(target + ".tmp", root, sync=True)
+        # Journal mới có trước khi checkpoint mang tên thật: checkpoint nào nhìn thấy được cũng có journal
+        f = open(self._path("journal", new, SUFFIX), "wb")
+        f.write(HEADER.pack(MAGIC, VERSION, KINDS.index(self.kind), new))
+        f.flush()
+        os.fsync(f.fileno())
+        os.replace(target + ".tmp", target)
+        _sync_directory(self.directory)
+
+        if self._file is not None:
+            self._file.close()
+        self._file = f
+        self.generation = new
+        self.records = 0
+        checkpoints, journals = _generations(self.directory)
+        for generation in checkpoints:
+            if generation < new:
+                os.remove(self._path("checkpoint", generation, serialization.BINARY_SUFFIX))
+        for generation in journals:
+            if generation < new:
+                os.remove(self._path("journal", generation, SUFFIX))
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
@@ -0,0 +1,406 @@
+from array import array
+from collections import deque
+from core.tree_node import TreeNode
+
+NIL = -1
+
+
+class NodeStore:
+    # Struct-of-arrays: mỗi node là 1 chỉ số vào các cột int64 song song (~32 byte/node)
+    def __init__(self):
+        self.val = array('q')
+        self.left = array('q')
+        self.right = array('q')
+        self.height = array('q')
+        self.size = array('q')  # số node của cây con
+        self._free = array('q')  # các slot đã xóa, dùng lại khi tạo node mới
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def nbytes(self):
+        columns = (self.val, self.left, self.right, self.height, self.size, self._free)
+        return sum(col.itemsize * len(col) for col in columns)
+
+    def new_node(self, value):
+        if self._free:
+            i = self._free.pop()
+            self.val[i] = value
+            self.left[i] = NIL
+            self.right[i] = NIL
+            self.height[i] = 1
+            self.size[i] = 1
+        else:
+            i = len(self.val)
+            self.val.append(value)
+            self.left.append(NIL)
+            self.right.append(NIL)
+            self.height.append(1)
+            self.size.append(1)
+        self.count += 1
+        return i
+
+    def free_node(self, i):
+        self.left[i] = NIL
+        self.right[i] = NIL
+        self._free.append(i)
+        self.count -= 1
+
+    def view(self, i):
+        return NodeView(self, i) if i != NIL else None
+
+    # --- Chiều cao, kích thước cây con / xoay ---
+    def _h(self, i):
+        return self.height[i] if i != NIL else 0
+
+    def _update_size(self, i):
+        l, r = self.left[i], self.right[i]
+        self.size[i] = 1 + (self.size[l] if l != NIL else 0) + (self.size[r] if r != NIL else 0)
+
+    def _update_node(self, i):
+        hl = self.height[self.left[i]] if self.left[i] != NIL else 0
+        hr = self.height[self.right[i]] if self.right[i] != NIL else 0
+        self.height[i] = 1 + (hl if hl > hr else hr)
+        self._update_size(i)
+
+    def _balance(self, i):
+        return self._h(self.left[i]) - self._h(self.right[i])
+
+    def _rotate_right(self, y):
+        x = self.left[y]
+        self.left[y] = self.right[x]
+        self.right[x] = y
+        self._update_node(y)
+        self._update_node(x)
+        return x
+
+    def _rotate_left(self, x):
+        y = self.right[x]
+        self.right[x] = self.left[y]
+        self.left[y] = x
+        self._update_node(x)
+        self._update_node(y)
+        return y
+
+    def _rebalance(self, i):
+        balance = self._balance(i)
+        if balance > 1:
+            if self._balance(self.left[i]) < 0:  # LR
+                self.left[i] = self._rotate_left(self.left[i])
+            return self._rotate_right(i)
+        if balance < -1:
+            if self._balance(self.right[i]) > 0:  # RL
+                self.right[i] = self._rotate_right(self.right[i])
+            return self._rotate_left(i)
+        return i
+
+    def _replace_child(self, parent, old, new):
+        if self.left[parent] == old:
+            self.left[parent] = new
+        else:
+            self.right[parent] = new
+
+    def _retrace(self, root, path, balanced):
+        # Đi ngược đường đi, hết cân bằng lại khi chiều cao của node không đổi;
+        # phần còn lại của đường đi chỉ cần cập nhật size
+        for k in range(len(path) - 1, -1, -1):
+            i = path[k]
+            old_height = self.height[i]
+            self._update_node(i)
+            sub = self._rebalance(i) if balanced else i
+            if sub != i:
+                if k == 0:
+                    root = sub
+                else:
+                    self._replace_child(path[k - 1], i, sub)
+            if self.height[sub] == old_height:
+                for j in range(k - 1, -1, -1):
+                    self._update_size(path[j])
+                break
+        return root
+
+    # --- BST / AVL trên chỉ số ---
+    def find(self, root, key):
+        i = root
+        while i != NIL:
+            v = self.val[i]
+            if key == v:
+                return i
+            i = self.left[i] if key < v else self.right[i]
+        return NIL
+
+    def _insert(self, root, key, balanced):
+        if root == NIL:
+            return self.new_node(key)
+        path = []
+        i = root
+        while i != NIL:
+            v = self.val[i]
+            if key == v:
+                return root  # Không chèn trùng
+            path.append(i)
+            i = self.left[i] if key < v else self.right[i]
+        n = self.new_node(key)
+        parent = path[-1]
+        if key < self.val[parent]:
+            self.left[parent] = n
+        else:
+            self.right[parent] = n
+        return self._retrace(root, path, balanced)
+
+    def _delete(self, root, key, balanced):
+        path = []
+        i = root
+        while i != NIL and self.val[i] != key:
+            path.append(i)
+            i = self.left[i] if key < self.val[i] else self.right[i]
+        if i == NIL:
+            return root
+        if self.left[i] != NIL and self.right[i] != NIL:
+            # Node có 2 con: chép giá trị successor rồi xóa successor
+            path.append(i)
+            s = self.right[i]
+            while self.left[s] != NIL:
+                path.append(s)
+                s = self.left[s]
+            self.val[i] = self.val[s]
+            i = s
+        child = self.left[i] if self.left[i] != NIL else self.right[i]
+        self.free_node(i)
+        if not path:
+            return child
+        self._replace_child(path[-1], i, child)
+        return self._retrace(root, path, balanced)
+
+    def bst_insert(self, root, key):
+        return self._insert(root, key, False)
+
+    def bst_delete(self, root, key):
+        return self._delete(root, key, False)
+
+    def avl_insert(self, root, key):
+        return self._insert(root, key, True)
+
+    def avl_delete(self, root, key):
+        return self._delete(root, key, True)
+
+    def build_balanced(self, keys):
+        # keys đã sắp xếp tăng dần, không trùng: dựng cây cân bằng, height gán trực tiếp
+        if not keys:
+            return NIL
+        root = self.new_node(0)
+        stack = [(root, 0, len(keys) - 1, False)]
+        while stack:
+            i, lo, hi, done = stack.pop()
+            mid = (lo + hi) // 2
+            if done:
+                self._update_node(i)
+                continue
+            self.val[i] = keys[mid]
+            stack.append((i, lo, hi, True))
+            if lo <= mid - 1:
+                self.left[i] = self.new_node(0)
+                stack.append((self.left[i], lo, mid - 1, False))
+            if mid + 1 <= hi:
+                self.right[i] = self.new_node(0)
+                stack.append((self.right[i], mid + 1, hi, False))
+        return root
+
+    def dsw(self, root):
+        # Day–Stout–Warren trên mảng: chỉ xoay (đổi left/right), không cấp / giải phóng slot nào
+        # -> các NodeView đang giữ (ValueIndex, canvas item) vẫn trỏ đúng node. Trả về chỉ số root mới
+        if root == NIL:
+            return NIL
+        left, right = self.left, self.right
+        pseudo = self.new_node(0)
+        right[pseudo] = root
+
+        # 1. Duỗi cây thành "vine" (chuỗi lệch phải) bằng các phép xoay phải
+        count = 0
+        tail = pseudo
+        rest = right[tail]
+        while rest != NIL:
+            temp = left[rest]
+            if temp != NIL:
+                left[rest] = right[temp]
+                right[temp] = rest
+                rest = temp
+                right[tail] = temp
+            else:
+                count += 1
+                tail = rest
+                rest = right[rest]
+
+        # 2. Gấp vine lại thành cây cân bằng bằng các lượt xoay trái
+        leaves = count + 1 - (1 << ((count + 1).bit_length() - 1))
+        self._compress(pseudo, leaves)
+        size = count - leaves
+        while size > 1:
+            size //= 2
+            self._compress(pseudo, size)
+        root = right[pseudo]
+        self.free_node(pseudo)
+        for i in self.postorder(root):  # Các phép xoay đã làm sai height/size
+            self._update_node(i)
+        return root
+
+    def _compress(self, pseudo, count):
+        left, right = self.left, self.right
+        scanner = pseudo
+        for _ in range(count):
+            child = right[scanner]
+            right[scanner] = right[child]
+            scanner = right[scanner]
+            right[child] = left[scanner]
+            left[scanner] = child
+
+    def free_tree(self, root):
+        for i in list(self.postorder(root)):
+            self.free_node(i)
+
+    # --- Duyệt cây (generator trên chỉ số, không đệ quy) ---
+    def preorder(self, root):
+        stack = [root] if root != NIL else []
+        while stack:
+            i = stack.pop()
+            yield i
+            if self.right[i] != NIL:
+                stack.append(self.right[i])
+            if self.left[i] != NIL:
+                stack.append(self.left[i])
+
+    def inorder(self, root):
+        stack = []
+        i = root
+        while stack or i != NIL:
+            while i != NIL:
+                stack.append(i)
+                i = self.left[i]
+            i = stack.pop()
+            yield i
+            i = self.right[i]
+
+    def postorder(self, root):
+        stack = [(root, False)] if root != NIL else []
+        while stack:
+            i, visited = stack.pop()
+            if visited:
+                yield i
+                continue
+            stack.append((i, True))
+            if self.right[i] != NIL:
+                stack.append((self.right[i], False))
+            if self.left[i] != NIL:
+                stack.append((self.left[i], False))
+
+    def bfs(self, root):
+        queue = deque([root] if root != NIL else [])
+        while queue:
+            i = queue.popleft()
+            yield i
+            if self.left[i] != NIL:
+                queue.append(self.left[i])
+            if self.right[i] != NIL:
+                queue.append(self.right[i])
+
+    # --- Chuyển đổi với TreeNode ---
+    def index(self, node):
+        # Chỉ số của một NodeView thuộc store này (None -> NIL). Cây TreeNode / store khác phải được
+        # chuyển một lần bằng from_tree: chép ngầm ở mỗi thao tác sẽ rò slot và sửa nhầm sang bản chép
+        if node is None:
+            return NIL
+        if isinstance(node, NodeView) and node.store is self:
+            return node.idx
+        raise TypeError("Node is not a view into this NodeStore; convert the tree once with from_tree()")
+
+    def from_tree(self, node):
+        if node is None:
+            return NIL
+        if isinstance(node, NodeView) and node.store is self:
+            return node.idx
+        root = self.new_node(node.val)
+        stack = [(node, root)]
+        while stack:
+            src, i = stack.pop()
+            self.height[i] = getattr(src, "height", 1)
+            self.size[i] = getattr(src, "size", 1)
+            if src.left is not None:
+                self.left[i] = self.new_node(src.left.val)
+                stack.append((src.left, self.left[i]))
+            if src.right is not None:
+                self.right[i] = self.new_node(src.right.val)
+                stack.append((src.right, self.right[i]))
+        return root
+
+    def to_tree(self, root):
+        if root == NIL:
+            return None
+        top = TreeNode(self.val[root])
+        stack = [(root, top)]
+        while stack:
+            i, node = stack.pop()
+            node.height = self.height[i]
+            node.size = self.size[i]
+            if self.left[i] != NIL:
+                node.left = TreeNode(self.val[self.left[i]])
+                stack.append((self.left[i], node.left))
+            if self.right[i] != NIL:
+                node.right = TreeNode(self.val[self.right[i]])
+                stack.append((self.right[i], node.right))
+        return top
+
+
+class NodeView:
+    # View mỏng để UI dùng như TreeNode (val/left/right/height/size), dữ liệu nằm trong NodeStore
+    __slots__ = ("store", "idx")
+
+    def __init__(self, store, idx):
+        self.store = store
+        self.idx = idx
+
+    def __eq__(self, other):
+        return isinstance(other, NodeView) and other.store is self.store and other.idx == self.idx
+
+    def __hash__(self):
+        return hash((id(self.store), self.idx))
+
+    @property
+    def val(self):
+        return self.store.val[self.idx]
+
+    @val.setter
+    def val(self, value):
+        self.store.val[self.idx] = value
+
+    @property
+    def left(self):
+        return self.store.view(self.store.left[self.idx])
+
+    @left.setter
+    def left(self, node):
+        self.store.left[self.idx] = self.store.from_tree(node)
+
+    @property
+    def right(self):
+        return self.store.view(self.store.right[self.idx])
+
+    @right.setter
+    def right(self, node):
+        self.store.right[self.idx] = self.store.from_tree(node)
+
+    @property
+    def height(self):
+        return self.store.height[self.idx]
+
+    @height.setter
+    def height(self, value):
+        self.store.height[self.idx] = value
+
+    @property
+    def size(self):
+        return self.store.size[self.idx]
+
+    @size.setter
+    def size(self, value):
+        self.store.size[self.idx] = value
@@ -0,0 +1,179 @@
+from core.tree_node import size
+
+# Truy vấn thứ tự trên BST/AVL có trường size (TreeNode hoặc NodeView), tất cả đều lặp, không đệ quy:
+# O(h) cho một node, O(h + k) cho truy vấn khoảng trả về k node.
+
+
+def kth(root, k):
+    # Node nhỏ thứ k (k bắt đầu từ 1), None nếu k ngoài [1, n]
+    node = root
+    while node:
+        left = size(node.left)
+        if k <= left:
+            node = node.left
+        elif k == left + 1:
+            return node
+        else:
+            k -= left + 1
+            node = node.right
+    return None
+
+
+def rank(root, key):
+    # Số key nhỏ hơn hẳn key (key có trong cây thì kth(root, rank + 1) là node đó)
+    count = 0
+    node = root
+    while node:
+        if key <= node.val:
+            node = node.left
+        else:
+            count += size(node.left) + 1
+            node = node.right
+    return count
+
+
+def count_range(root, lo, hi):
+    # Số key trong [lo, hi], O(h)
+    if lo > hi:
+        return 0
+    count = 0
+    node = root
+    while node:
+        if hi < node.val:
+            node = node.left
+        else:
+            count += size(node.left) + 1
+            node = node.right
+    return count - rank(root, lo)
+
+
+def floor(root, key):
+    # Node lớn nhất có val <= key
+    best = None
+    node = root
+    while node:
+        if node.val == key:
+            return node
+        if node.val < key:
+            best = node
+            node = node.right
+        else:
+            node = node.left
+    return best
+
+
+def ceiling(root, key):
+    # Node nhỏ nhất có val >= key
+    best = None
+    node = root
+    while node:
+        if node.val == key:
+            return node
+        if node.val > key:
+            best = node
+            node = node.left
+        else:
+            node = node.right
+    return best
+
+
+def predecessor(root, key):
+    # Node lớn nhất có val < key
+    best = None
+    node = root
+    while node:
+        if node.val < key:
+            best = node
+            node = node.right
+        else:
+            node = node.left
+    return best
+
+
+def successor(root, key):
+    # Node nhỏ nhất có val > key
+    best = None
+    node = root
+    while node:
+        if node.val > key:
+            best = node
+            node = node.left
+        else:
+            node = node.right
+    return best
+
+
+def range_query(root, lo, hi):
+    # Generator các node có lo <= val <= hi theo thứ tự tăng dần:
+    # chỉ đi xuống nhánh có thể chứa key trong khoảng, dừng ngay khi vượt hi
+    stack = []
+    node = root
+    while stack or node:
+        while node:
+            if node.val < lo:
+                node = node.right
+            else:
+                stack.append(node)
+                node = node.left
+        if not stack:
+            return
+        node = stack.pop()
+        if node.val > hi:
+            return
+        yield node
+        node = node.right
+
+
+def parse_query(text):
+    # Cú pháp ô Find: "42" (tìm), "10..20" (khoảng), "#5" (nhỏ thứ 5),
+    # "rank 42", "floor 42", "ceil 42", "pred 42", "succ 42".
+    # Trả về (tên truy vấn, tham số) hoặc raise ValueError.
+    text = text.strip()
+    if text.startswith("#"):
+        return "kth", (int(text[1:]),)
+    if ".." in text:
+        lo, hi = text.split("..", 1)
+        return "range", (int(lo), int(hi))
+    parts = text.split()
+    if len(parts) == 2 and parts[0].lower() in QUERIES:
+        return parts[0].lower(), (int(parts[1]),)
+    if len(parts) == 1:
+        return "find", (int(parts[0]),)
+    raise ValueError(f"Unknown query: {text}")
+
+
+QUERIES = {
+    "rank": rank,
+    "floor": floor,
+    "ceil": ceiling,
+    "pred": predecessor,
+    "succ": successor,
+}
+
+
+class OrderStatistics:
+    # Mixin cho BSTVisualizer / AVLVisualizer: truy vấn thứ tự trên self.root
+
+    def kth_smallest(self, k):
+        return kth(self.root, k)
+
+    def rank(self, key):
+        return rank(self.root, key)
+
+    def count_range(self, lo, hi):
+        return count_range(self.root, lo, hi)
+
+    def floor(self, key):
+        return floor(self.root, key)
+
+    def ceiling(self, key):
+        return ceiling(self.root, key)
+
+    def predecessor(self, key):
+        return predecessor(self.root, key)
+
+    def successor(self, key):
+        return successor(self.root, key)
+
+    def range_query(self, lo, hi):
+        return range_query(self.root, lo, hi)
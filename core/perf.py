@@ -0,0 +1,73 @@
+import functools
+import time
+from collections import deque
+
+# Bộ đếm thời gian nhẹ cho các đường nóng (draw_tree, layout, sidebar, traversal...): mỗi tên giữ
+# lần đo cuối + trung bình trượt của WINDOW lần gần nhất. Chỉ dùng trên UI thread; HUD đọc từ TIMERS.
+# Chỉ đo khi enabled (HUD đang hiện): tắt thì mỗi lần gọi chỉ tốn thêm một phép kiểm tra cờ.
+
+WINDOW = 30
+clock = time.perf_counter
+enabled = False
+
+
+class Timer:
+    __slots__ = ("last", "total", "count", "samples")
+
+    def __init__(self, window=WINDOW):
+        self.last = 0.0  # giây
+        self.total = 0.0  # tổng các mẫu đang nằm trong cửa sổ
+        self.count = 0  # số lần đo từ đầu
+        self.samples = deque(maxlen=window)
+
+    def add(self, seconds):
+        samples = self.samples
+        if len(samples) == samples.maxlen:
+            self.total -= samples[0]
+        samples.append(seconds)
+        self.total += seconds
+        self.last = seconds
+        self.count += 1
+
+    @property
+    def average(self):
+        return self.total / len(self.samples) if self.samples else 0.0
+
+
+TIMERS = {}
+
+
+def timer(name):
+    t = TIMERS.get(name)
+    if t is None:
+        t = TIMERS[name] = Timer()
+    return t
+
+
+def set_enabled(flag):
+    global enabled
+    enabled = flag
+
+
+def record(name, start):
+    # start lấy từ perf.clock() trước đoạn cần đo
+    if enabled:
+        timer(name).add(clock() - start)
+
+
+def timed(name):
+    # Decorator: đo mọi lần gọi hàm (kể cả khi return sớm / raise)
+    t = timer(name)
+
+    def wrap(func):
+        @functools.wraps(func)
+        def timed_func(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                t.add(clock() - start)
+        return timed_func
+    return wrap
@@ -0,0 +1,188 @@
+from core.avl import AVLEngine
+from core.bst import BSTEngine
+from core.tree_node import TreeNode
+
+# Engine bền vững (path copying): insert / delete / edit không sửa node nào của cây cũ, chỉ chép
+# các node trên đường đi từ root (+ node bị xoay khi cân bằng lại) -> O(log n) node mới mỗi thao tác
+# với AVL. Mọi root cũ vẫn là một phiên bản nguyên vẹn, các phiên bản dùng chung phần không đổi:
+# giữ root là có snapshot, undo / redo chỉ là đổi root. Chỉ chạy trên cây TreeNode (không NodeStore).
+
+
+def clone(node):
+    copy = TreeNode(node.val)
+    copy.left = node.left
+    copy.right = node.right
+    copy.height = node.height
+    copy.size = node.size
+    return copy
+
+
+def clone_tree(root):
+    # Chép cả cây (không đệ quy): các node mới, cây cũ giữ nguyên
+    if root is None:
+        return None
+    top = clone(root)
+    stack = [top]
+    while stack:
+        node = stack.pop()
+        if node.left is not None:
+            node.left = clone(node.left)
+            stack.append(node.left)
+        if node.right is not None:
+            node.right = clone(node.right)
+            stack.append(node.right)
+    return top
+
+
+class PathCopying:
+    # Mixin đặt trước BSTEngine / AVLEngine: thay các hook _writable / _new_node / _rename của engine
+    def __init__(self, store=None, listener=None):
+        if store is not None:
+            raise ValueError("Persistent engines work on TreeNode trees only")
+        super().__init__(None, listener)
+        self.changes = []  # mô tả các thao tác đã làm đổi cây, History dùng làm nhãn phiên bản
+        self._fresh = set()  # node được tạo / chép trong thao tác hiện tại: sửa tại chỗ được
+        self._root = None  # root (bản chép) của cây đang sửa
+
+    def insert(self, root, key):
+        new_root = super().insert(root, key)
+        if new_root is not root:
+            self.changes.append(f"insert {key}")
+        return new_root
+
+    def delete(self, root, key):
+        new_root = super().delete(root, key)
+        if new_root is not root:
+            self.changes.append(f"delete {key}")
+        return new_root
+
+    def edit(self, root, old, new):
+        mark = len(self.changes)
+        new_root = super().edit(root, old, new)
+        del self.changes[mark:]  # edit = delete + insert -> chỉ giữ một nhãn
+        if new_root is not root:
+            self.changes.append(f"edit {old} -> {new}")
+        return new_root
+
+    def rebalance(self, root):
+        # DSW xoay mọi node -> chạy trên bản chép của cả cây (O(n) như chính DSW), cây cũ giữ nguyên.
+        # Cùng hình dạng với engine thường: bật / tắt lịch sử không đổi kết quả, journal chạy lại khớp
+        if root is None:
+            return None
+        self.changes.append("rebalance")
+        return super().rebalance(clone_tree(root))
+
+    def _new_node(self, key):
+        node = TreeNode(key)
+        self._fresh.add(node)
+        return node
+
+    def _writable(self, root, path):
+        # Chép path rồi nối các bản chép với nhau: cây mới dùng chung mọi cây con nằm ngoài path
+        copies = [clone(node) for node in path]
+        for parent, child, original in zip(copies, copies[1:], path[1:]):
+            if parent.left is original:
+                parent.left = child
+            else:
+                parent.right = child
+        self._fresh = set(copies)
+        if not copies:
+            self._root = root
+            return root, copies
+        self._root = copies[0]
+        self.listener.nodes_copied(root, copies[0], list(zip(path, copies)))
+        return copies[0], copies
+
+    def _own(self, node):
+        # Node sắp bị sửa (khi xoay): chép nếu nó còn thuộc về phiên bản cũ
+        if node is None or node in self._fresh:
+            return node
+        copy = clone(node)
+        self._fresh.add(copy)
+        self.listener.nodes_copied(self._root, self._root, [(node, copy)])
+        return copy
+
+    def _rename(self, root, node, new):
+        path = []
+        current = root
+        while current is not node:
+            path.append(current)
+            current = current.left if node.val < current.val else current.right
+        path.append(node)
+        root, path = self._writable(root, path)
+        return super()._rename(root, path[-1], new)
+
+
+class PersistentBSTEngine(PathCopying, BSTEngine):
+    pass
+
+
+class PersistentAVLEngine(PathCopying, AVLEngine):
+    # Khi xóa, phép xoay có thể chạm vào cây con anh em (ngoài path) -> chép trước khi xoay
+
+    def right_rotate(self, y):
+        y = self._own(y)
+        y.left = self._own(y.left)
+        return super().right_rotate(y)
+
+    def left_rotate(self, x):
+        x = self._own(x)
+        x.right = self._own(x.right)
+        return super().left_rotate(x)
+
+
+# Engine thường <-> engine bền vững tương ứng
+PERSISTENT = {BSTEngine: PersistentBSTEngine, AVLEngine: PersistentAVLEngine}
+MUTABLE = {persistent: mutable for mutable, persistent in PERSISTENT.items()}
+
+
+class History:
+    # Dãy phiên bản (root của engine bền vững) + vị trí hiện tại; ghi phiên bản mới sau khi undo
+    # thì bỏ nhánh redo. Bộ nhớ tỉ lệ với số node được chép, không phải số phiên bản x n
+    def __init__(self, root=None, label="start"):
+        self.versions = [(root, label)]
+        self.index = 0
+        self.snapshots = {}  # tên -> root
+
+    def __len__(self):
+        return len(self.versions)
+
+    @property
+    def root(self):
+        return self.versions[self.index][0]
+
+    @property
+    def label(self):
+        return self.versions[self.index][1]
+
+    def record(self, root, label):
+        if root is self.root:
+            return False
+        del self.versions[self.index + 1:]
+        self.versions.append((root, label))
+        self.index += 1
+        return True
+
+    def can_undo(self):
+        return self.index > 0
+
+    def can_redo(self):
+        return self.index < len(self.versions) - 1
+
+    def undo(self):
+        return self.goto(self.index - 1)
+
+    def redo(self):
+        return self.goto(self.index + 1)
+
+    def goto(self, index):
+        self.index = max(0, min(index, len(self.versions) - 1))
+        return self.root
+
+    def snapshot(self, name):
+        self.snapshots[name] = self.root
+
+    def restore(self, name):
+        # Khôi phục snapshot như một phiên bản mới -> vẫn undo được
+        self.record(self.snapshots[name], f"restore {name}")
+        return self.root
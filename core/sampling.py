@@ -0,0 +1,61 @@
+import random
+from core import tree_node
+from core.jobs import report
+from core.tree_node import TreeNode
+
+# Lấy mẫu giá trị cho cây ngẫu nhiên mà không dựng list(range(min, max + 1)):
+# bộ nhớ O(k) theo số node, không phụ thuộc độ rộng khoảng giá trị.
+
+
+def floyd_sample(lo, hi, k, rng=random):
+    # Thuật toán Floyd: k giá trị phân biệt, đều nhau trong [lo, hi], sinh dần từng giá trị
+    n = hi - lo + 1
+    if k > n:
+        raise ValueError(f"Cannot pick {k} distinct values from [{lo}, {hi}]")
+    chosen = set()
+    for j in range(n - k, n):
+        t = rng.randrange(j + 1)
+        if t in chosen:
+            t = j
+        chosen.add(t)
+        yield lo + t
+
+
+def random_tree_values(lo, hi, k, rng=random):
+    # k giá trị cho cây ngẫu nhiên, luôn có lo và hi, thứ tự đã xáo trộn.
+    # Khoảng không đủ k giá trị phân biệt -> cho phép trùng.
+    if k <= 0:
+        return []
+    if k == 1:
+        return [lo]
+    n = hi - lo + 1
+    if k > n:
+        values = [lo, hi] + [rng.randint(lo, hi) for _ in range(k - 2)]
+    else:
+        values = [lo, hi]
+        values.extend(floyd_sample(lo + 1, hi - 1, k - 2, rng))
+    rng.shuffle(values)
+    return values
+
+
+def random_insert_tree(values, rng=random, progress=None):
+    # Cây nhị phân hình dạng ngẫu nhiên: mỗi giá trị đi xuống trái/phải ngẫu nhiên tới chỗ trống
+    root = None
+    for count, val in enumerate(values, 1):
+        if root is None:
+            root = TreeNode(val)
+            continue
+        node = root
+        while True:
+            if rng.random() < 0.5:
+                if node.left is None:
+                    node.left = TreeNode(val)
+                    break
+                node = node.left
+            else:
+                if node.right is None:
+                    node.right = TreeNode(val)
+                    break
+                node = node.right
+        report(progress, count, len(values))
+    return tree_node.augment(root)
@@ -0,0 +1,287 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import deque
+from core.jobs import report, substep
+from core.tree_node import TreeNode
+
+# Định dạng bảng: mỗi dòng là (value, left, right) theo thứ tự preorder,
+# left/right là chỉ số dòng của node con, -1 nếu không có con.
+# Tuyến tính theo số node và không nhập nhằng với bất kỳ giá trị nguyên nào (kể cả 0).
+TABLE_HEADER = "# tree-table v1"
+NO_CHILD = -1
+
+# Định dạng nhị phân: header 16 byte (magic, version, reserved, số node) rồi bảng
+# int64 little-endian [val, left, right] * n - cùng bảng preorder như bản text.
+BINARY_MAGIC = b"BTRE"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<4sHHq")
+BINARY_SUFFIX = ".btree"
+
+
+def tree_to_table(root):
+    table = []
+    stack = [(root, NO_CHILD, 0)] if root else []
+    while stack:
+        node, parent_row, side = stack.pop()
+        row = len(table)
+        table.append([node.val, NO_CHILD, NO_CHILD])
+        if parent_row != NO_CHILD:
+            table[parent_row][side] = row
+        # Đẩy con phải trước để con trái được đánh số ngay sau node cha (preorder)
+        if node.right:
+            stack.append((node.right, row, 2))
+        if node.left:
+            stack.append((node.left, row, 1))
+    return [tuple(r) for r in table]
+
+
+def table_to_tree(table, progress=None):
+    if not table:
+        return None
+    n = len(table)
+    nodes = [TreeNode(row[0]) for row in table]
+    referenced = bytearray(n)
+    for i, (_, left, right) in enumerate(table):
+        report(progress, i, n)
+        for child, side in ((left, "left"), (right, "right")):
+            if child == NO_CHILD:
+                continue
+            # Preorder: con luôn nằm sau cha, mỗi dòng chỉ được trỏ tới một lần
+            if not (i < child < n) or referenced[child]:
+                raise ValueError(f"Row {i}: invalid {side} child index {child}.")
+            referenced[child] = 1
+            setattr(nodes[i], side, nodes[child])
+    if referenced.count(0) != 1:
+        raise ValueError("Table does not describe a single tree.")
+    return nodes[0]
+
+
+def format_table(table):
+    return "\n".join(f"{val}, {left}, {right}" for val, left, right in table)
+
+
+def parse_table(text, progress=None):
+    table = []
+    lines = text.splitlines()
+    for line_no, line in enumerate(lines, 1):
+        report(progress, line_no, len(lines))
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split(",")
+        if len(parts) != 3:
+            raise ValueError(f"Line {line_no}: expected 'value, left, right'.")
+        try:
+            table.append(tuple(int(p) for p in parts))
+        except ValueError:
+            raise ValueError(f"Line {line_no}: all values must be integers.")
+    return table
+
+
+def dumps(root):
+    return TABLE_HEADER + "\n" + format_table(tree_to_table(root))
+
+
+def is_table_text(text):
+    return text.lstrip().startswith(TABLE_HEADER)
+
+
+def loads(text, progress=None):
+    if is_table_text(text):
+        return table_to_tree(parse_table(text, substep(progress, 0, 0.6)), substep(progress, 0.6, 1))
+    return load_legacy(text)
+
+
+def load_legacy(text):
+    # Hai định dạng cũ: "val, left_val, right_val" mỗi dòng (0 = không có con),
+    # hoặc mảng level-order đệm 0 cách nhau bởi dấu cách/dấu phẩy
+    lines = [line for line in text.splitlines() if line.strip()]
+    if lines and all(len(line.split(",")) == 3 for line in lines):
+        nodes = {}
+        links = []
+        for line in lines:
+            val, left, right = (int(p) for p in line.split(","))
+            nodes.setdefault(val, TreeNode(val))
+            links.append((val, left, right))
+        for val, left, right in links:
+            node = nodes[val]
+            node.left = nodes.setdefault(left, TreeNode(left)) if left != 0 else None
+            node.right = nodes.setdefault(right, TreeNode(right)) if right != 0 else None
+        return nodes[links[0][0]]
+    values = [int(v) for v in text.replace(",", " ").split()]
+    if not values or values[0] == 0:
+        return None
+    # Level-order kiểu cũ: mỗi node khác 0 có đúng 2 ô con kế tiếp (0 = rỗng)
+    root = TreeNode(values[0])
+    queue = deque([root])
+    i = 1
+    while queue and i < len(values):
+        node = queue.popleft()
+        for side in ("left", "right"):
+            if i < len(values) and values[i] != 0:
+                child = TreeNode(values[i])
+                setattr(node, side, child)
+                queue.append(child)
+            i += 1
+    return root
+
+
+def table_to_array(table):
+    flat = array("q")
+    for row in table:
+        flat.extend(row)
+    return flat
+
+
+def write_binary(path, root, sync=False):
+    # sync: fsync trước khi đóng (checkpoint của journal phải nằm hẳn trên đĩa trước khi được dùng)
+    flat = table_to_array(tree_to_table(root))
+    if sys.byteorder != "little":
+        flat.byteswap()
+    with open(path, "wb") as f:
+        f.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, len(flat) // 3))
+        flat.tofile(f)
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def read_binary(path, progress=None):
+    # Đọc hết file nhị phân thành cây TreeNode rồi đóng file (khác open_binary: không giữ mmap)
+    with MappedTree(path) as tree:
+        table = tree.table
+        flat = table if isinstance(table, array) else array("q", table.tobytes())
+    return table_to_tree(list(zip(flat[0::3], flat[1::3], flat[2::3])), progress)
+
+
+def is_binary_file(path):
+    with open(path, "rb") as f:
+        return f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+
+class MappedTree:
+    # Bảng node đọc thẳng từ file qua mmap; node chỉ được tạo khi cần tới. Giữ mở chừng nào còn
+    # dùng các MappedNode của nó (with ... / close()); cần cả cây thì dùng read_binary
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            size = f.seek(0, 2)
+            if size < BINARY_HEADER.size:
+                raise ValueError("File is too small to be a binary tree file.")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count = BINARY_HEADER.unpack_from(self._mmap)
+        if magic != BINARY_MAGIC:
+            self.close()
+            raise ValueError("Not a binary tree file.")
+        if version != BINARY_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported binary tree version {version}.")
+        if count < 0 or size != BINARY_HEADER.size + count * 24:
+            self.close()
+            raise ValueError("Binary tree file is truncated or corrupt.")
+        self.count = count
+        self.heights = self.sizes = None  # tính một lần khi có node đầu tiên cần height/size
+        self._view = memoryview(self._mmap)[BINARY_HEADER.size:]
+        if sys.byteorder == "little":
+            self.table = self._view.cast("q")
+        else:
+            # Máy big-endian: phải copy để đảo byte
+            self.table = array("q", self._view.tobytes())
+            self.table.byteswap()
+
+    def __len__(self):
+        return self.count
+
+    def root(self):
+        return MappedNode(self, 0) if self.count else None
+
+    def child(self, row, offset):
+        child = self.table[3 * row + offset]
+        if child == NO_CHILD:
+            return None
+        if not (row < child < self.count):
+            raise ValueError(f"Row {row}: invalid child index {child}.")
+        return MappedNode(self, child)
+
+    def measure(self):
+        # height/size của mọi dòng trong một lượt đi ngược bảng (preorder: con luôn nằm sau cha),
+        # chỉ đọc các số int64, không tạo node nào
+        if self.heights is not None:
+            return
+        n, table = self.count, self.table
+        heights = array("q", bytes(8 * n))
+        sizes = array("q", bytes(8 * n))
+        for row in range(n - 1, -1, -1):
+            height, size = 0, 1
+            for child in (table[3 * row + 1], table[3 * row + 2]):
+                if child == NO_CHILD:
+                    continue
+                if not (row < child < n):
+                    raise ValueError(f"Row {row}: invalid child index {child}.")
+                if heights[child] > height:
+                    height = heights[child]
+                size += sizes[child]
+            heights[row] = height + 1
+            sizes[row] = size
+        self.heights, self.sizes = heights, sizes
+
+    def close(self):
+        if hasattr(self, "table") and isinstance(self.table, memoryview):
+            self.table.release()
+        if hasattr(self, "_view"):
+            self._view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MappedNode:
+    # Giống TreeNode nhưng left/right/height/size chỉ được đọc từ bảng (con thành MappedNode mới)
+    # ở lần truy cập đầu tiên, sau đó là thuộc tính bình thường, gán lại được
+    __slots__ = ("_tree", "_row", "val", "left", "right", "height", "size")
+
+    def __init__(self, tree, row):
+        self._tree = tree
+        self._row = row
+        self.val = tree.table[3 * row]
+
+    def __getattr__(self, name):
+        # Chỉ được gọi khi slot chưa có giá trị
+        tree = self._tree
+        if name == "left":
+            value = tree.child(self._row, 1)
+        elif name == "right":
+            value = tree.child(self._row, 2)
+        elif name in ("height", "size"):
+            tree.measure()
+            value = (tree.heights if name == "height" else tree.sizes)[self._row]
+        else:
+            raise AttributeError(name)
+        setattr(self, name, value)
+        return value
+
+
+def open_binary(path):
+    return MappedTree(path)
+
+
+def save_file(path, root):
+    if path.lower().endswith(BINARY_SUFFIX):
+        write_binary(path, root)
+    else:
+        with open(path, "w") as f:
+            f.write(dumps(root))
+
+
+def load_file(path, progress=None):
+    # Cây để hiển thị: layout đi qua mọi node -> file nhị phân được đọc hết (read_binary) rồi đóng ngay
+    if is_binary_file(path):
+        return read_binary(path, progress)
+    with open(path, "r") as f:
+        return loads(f.read(), progress)
@@ -0,0 +1,129 @@
+from collections import deque
+from core.node_store import NodeView
+
+# Các generator duyệt cây không đệ quy: mỗi bước next() là O(1) khấu hao,
+# bộ nhớ phụ O(h) (stack) hoặc O(độ rộng) (BFS), Morris là O(1).
+
+
+def preorder(root):
+    stack = [root] if root else []
+    while stack:
+        node = stack.pop()
+        yield node
+        if node.right:
+            stack.append(node.right)
+        if node.left:
+            stack.append(node.left)
+
+
+def inorder(root):
+    stack = []
+    node = root
+    while stack or node:
+        while node:
+            stack.append(node)
+            node = node.left
+        node = stack.pop()
+        yield node
+        node = node.right
+
+
+def postorder(root):
+    stack = []
+    last = None
+    node = root
+    while stack or node:
+        if node:
+            stack.append(node)
+            node = node.left
+            continue
+        top = stack[-1]
+        if top.right and last is not top.right:
+            node = top.right
+        else:
+            yield top
+            last = stack.pop()
+
+
+def bfs(root):
+    queue = deque([root] if root else [])
+    while queue:
+        node = queue.popleft()
+        yield node
+        if node.left:
+            queue.append(node.left)
+        if node.right:
+            queue.append(node.right)
+
+
+def morris_inorder(root):
+    # Inorder với bộ nhớ phụ O(1): tạm nối node.right của predecessor về node hiện tại.
+    # Cây bị sửa tạm thời trong lúc duyệt -> không vẽ/sửa cây khi generator chưa chạy hết.
+    node = root
+    while node:
+        if node.left is None:
+            yield node
+            node = node.right
+            continue
+        pred = node.left
+        while pred.right and pred.right is not node:
+            pred = pred.right
+        if pred.right is None:
+            pred.right = node
+            node = node.left
+        else:
+            pred.right = None
+            yield node
+            node = node.right
+
+
+ORDERS = {
+    "preorder": preorder,
+    "inorder": inorder,
+    "postorder": postorder,
+    "bfs": bfs,
+    "morris": morris_inorder,
+}
+
+
+def walk(mode, root):
+    if isinstance(root, NodeView):
+        # Cây trong NodeStore: duyệt trên chỉ số, chỉ tạo view cho node được trả về
+        store = root.store
+        order = "inorder" if mode == "morris" else mode
+        return (store.view(i) for i in getattr(store, order)(root.idx))
+    return ORDERS.get(mode, bfs)(root)
+
+
+def tree_size(root):
+    # Số node nếu biết được trong O(1) (trường size), ngược lại None
+    if root is None:
+        return 0
+    return getattr(root, "size", None)
+
+
+def count_nodes(root):
+    count = tree_size(root)
+    if count is not None:
+        return count
+    count = 0
+    for _ in preorder(root):
+        count += 1
+    return count
+
+
+def path_to(root, target):
+    # Đường đi root -> target (cây nhị phân thường, không có thứ tự): DFS giữ stack đường đi, O(n)
+    path = []
+    stack = [(root, 0)] if root else []
+    while stack:
+        node, depth = stack.pop()
+        del path[depth:]
+        path.append(node)
+        if node == target:
+            return path
+        if node.right:
+            stack.append((node.right, depth + 1))
+        if node.left:
+            stack.append((node.left, depth + 1))
+    return None
@@ -0,0 +1,83 @@
+class TreeNode:
+    def __init__(self, value):
+        self.val = value
+        self.left = None
+        self.right = None
+        self.height = 1
+        self.size = 1  # số node của cây con gốc tại node này
+
+
+# Trường tăng cường (height, size) được giữ đúng ở mọi thao tác sửa cây:
+# sau khi đổi liên kết con, gọi update() cho các node bị ảnh hưởng theo thứ tự từ dưới lên.
+
+def height(node):
+    return node.height if node else 0
+
+
+def size(node):
+    return node.size if node else 0
+
+
+def update(node):
+    left, right = node.left, node.right
+    hl = left.height if left else 0
+    hr = right.height if right else 0
+    node.height = 1 + (hl if hl > hr else hr)
+    node.size = 1 + (left.size if left else 0) + (right.size if right else 0)
+
+
+def update_path(path):
+    # path: từ root xuống node sâu nhất bị đổi
+    for node in reversed(path):
+        update(node)
+
+
+def augment(root):
+    # Tính lại height/size cho cả cây (cây đến từ file, sidebar, bộ sinh ngẫu nhiên...), O(n)
+    stack = [(root, False)] if root else []
+    while stack:
+        node, visited = stack.pop()
+        if visited:
+            update(node)
+            continue
+        stack.append((node, True))
+        if node.left:
+            stack.append((node.left, False))
+        if node.right:
+            stack.append((node.right, False))
+    return root
+
+
+def switch_full_nodes(root):
+    # Hoán đổi con trái / phải của mọi node có đủ hai con (cây nhị phân thường), height/size không đổi
+    stack = [root] if root else []
+    while stack:
+        node = stack.pop()
+        if node.left is not None and node.right is not None:
+            node.left, node.right = node.right, node.left
+        if node.left:
+            stack.append(node.left)
+        if node.right:
+            stack.append(node.right)
+    return root
+
+
+def validate(root):
+    # Kiểm tra (debug) height/size của mọi node so với giá trị tính lại từ đầu
+    stack = [(root, False)] if root else []
+    computed = {}
+    while stack:
+        node, visited = stack.pop()
+        if not visited:
+            stack.append((node, True))
+            if node.left:
+                stack.append((node.left, False))
+            if node.right:
+                stack.append((node.right, False))
+            continue
+        hl, sl = computed.pop(node.left, (0, 0)) if node.left else (0, 0)
+        hr, sr = computed.pop(node.right, (0, 0)) if node.right else (0, 0)
+        expected = (1 + max(hl, hr), 1 + sl + sr)
+        if (node.height, node.size) != expected:
+            raise AssertionError(f"Node {node.val}: height/size {(node.height, node.size)}, expected {expected}")
+        computed[node] = expected
@@ -0,0 +1,79 @@
+from core import traversal
+from core.node_store import NodeView
+
+_STALE = object()  # Chưa dựng / cần dựng lại từ root
+
+
+class ValueIndex:
+    # Bảng băm giá trị -> node, cập nhật theo từng thao tác insert/delete/edit
+    # thay cho việc duyệt cả cây mỗi lần kiểm tra trùng hoặc tìm node.
+    # root: gốc của cây mà bảng đang phản ánh; khác root của visualizer -> dựng lại.
+    def __init__(self):
+        self.nodes = {}
+        self.dup = {}  # Giá trị trùng (cây nhị phân random cho phép): val -> số node thừa
+        self.root = _STALE
+        self.check = False  # Chế độ kiểm tra: so với một lần duyệt đầy đủ ở mỗi lần tra cứu
+
+    def __len__(self):
+        return len(self.nodes) + sum(self.dup.values())
+
+    def __contains__(self, val):
+        return val in self.nodes
+
+    def get(self, val):
+        return self.nodes.get(val)
+
+    def tracks(self, root):
+        return self.root is not _STALE and self.root == root
+
+    def invalidate(self):
+        self.root = _STALE
+
+    def rebuild(self, root):
+        self.nodes = {}
+        self.dup = {}
+        if isinstance(root, NodeView):
+            store = root.store
+            for i in store.preorder(root.idx):
+                self.add(NodeView(store, i))
+        else:
+            for node in traversal.preorder(root):
+                self.add(node)
+        self.root = root
+
+    def add(self, node):
+        val = node.val
+        if val in self.nodes and self.nodes[val] != node:
+            self.dup[val] = self.dup.get(val, 0) + 1
+        else:
+            self.nodes[val] = node
+
+    def discard(self, val, node=None):
+        if val in self.dup:
+            self.dup[val] -= 1
+            if not self.dup[val]:
+                del self.dup[val]
+            if node is None or self.nodes.get(val) == node:
+                # Không biết node trùng còn lại là node nào -> dựng lại khi cần
+                self.invalidate()
+            return
+        self.nodes.pop(val, None)
+
+    def rename(self, node, old_val):
+        self.discard(old_val, node)
+        self.add(node)
+
+    def remove_subtree(self, node):
+        for n in traversal.preorder(node):
+            self.discard(n.val, n)
+
+    def verify(self, root):
+        expected = ValueIndex()
+        expected.rebuild(root)
+        if set(self.nodes) != set(expected.nodes) or self.dup != expected.dup:
+            missing = set(expected.nodes) - set(self.nodes)
+            extra = set(self.nodes) - set(expected.nodes)
+            raise AssertionError(f"ValueIndex out of sync: missing {sorted(missing)}, extra {sorted(extra)}")
+        for val, node in self.nodes.items():
+            if node.val != val or (val not in self.dup and expected.nodes[val] != node):
+                raise AssertionError(f"ValueIndex maps {val} to a node that is not in the tree")
@@ -4,6 +4,7 @@ from components.header import Header
 from components.sidebar import Sidebar
 from visualizer.binary_tree_visualizer import BinaryTreeVisualizer
 from components.traversal_bar import TraversalBar
+from components.perf_hud import PerfHUD
 from visualizer.bst_visualizer import BSTVisualizer
 from visualizer.avl_visualizer import AVLVisualizer
 
@@ -119,12 +120,13 @@ def setup_visualizer(VisualizerClass, sidebar, right_frame):
                        yscrollcommand=y_scroll.set)
     canvas.pack(fill="both", expand=True)
 
-    x_scroll.config(command=canvas.xview)
-    y_scroll.config(command=canvas.yview)
-
     # Visualizer
     visualizer = VisualizerClass(canvas)
     visualizer.bind_click_event()
+
+    # Cuộn qua visualizer để vẽ thêm các node vừa lộ ra trong vùng nhìn
+    x_scroll.config(command=visualizer.xview)
+    y_scroll.config(command=visualizer.yview)
     sidebar.visualizer = visualizer
     visualizer.sidebar = sidebar
     sidebar.tree_root = getattr(visualizer, "root", None)  # Đảm bảo đồng bộ
@@ -133,6 +135,17 @@ def setup_visualizer(VisualizerClass, sidebar, right_frame):
     traversal_bar = TraversalBar(right_frame, visualizer, tree_getter=lambda: sidebar.tree_root)
     traversal_bar.pack(side="bottom", fill="x")
     visualizer.set_controller(traversal_bar)
+
+    # HUD hiệu năng trên canvas, bật / tắt bằng F3
+    perf_hud = PerfHUD(canvas, visualizer)
+    canvas.winfo_toplevel().bind("<F3>", lambda e: perf_hud.toggle())
+
+    # Undo / redo (khi đã bật lịch sử), bỏ qua khi đang gõ trong ô nhập
+    def on_history_key(event, action):
+        if not isinstance(event.widget, (tk.Entry, tk.Text)):
+            action()
+    canvas.winfo_toplevel().bind("<Control-z>", lambda e: on_history_key(e, visualizer.undo))
+    canvas.winfo_toplevel().bind("<Control-y>", lambda e: on_history_key(e, visualizer.redo))
     return visualizer
 
 if __name__ == "__main__":
@@ -161,6 +174,7 @@ if __name__ == "__main__":
         header.set_active(name)
         VisualizerClass = visualizers[name]
         global visualizer
+        visualizer.stop_journal()  # Journal gắn với loại cây của visualizer cũ
         visualizer = setup_visualizer(VisualizerClass, sidebar, right_frame)
         sidebar.set_visualizer(visualizer)
 
@@ -171,4 +185,10 @@ if __name__ == "__main__":
     visualizer = setup_visualizer(BinaryTreeVisualizer, sidebar, right_frame)
     sidebar.visualizer
 
+    # Đóng cửa sổ: fsync nốt các bản ghi journal đang gom
+    def on_close():
+        visualizer.stop_journal()
+        root.destroy()
+
+    root.protocol("WM_DELETE_WINDOW", on_close)
     root.mainloop()
\ No newline at end of file
@@ -1,154 +1,38 @@
 import tkinter as tk
-import random
-from visualizer.binary_tree_visualizer import BinaryTreeVisualizer, TreeNode
+from visualizer.binary_tree_visualizer import BinaryTreeVisualizer
+from core import avl, bst, perf, traversal, tree_node, sampling
+from core.avl import AVLEngine
+from core.order_stats import OrderStatistics
 
-class AVLVisualizer(BinaryTreeVisualizer):
-    def height(self, node):
-        return node.height if node else 0
-
-    def get_balance(self, node):
-        return self.height(node.left) - self.height(node.right) if node else 0
-
-    def update_height(self, node):
-        node.height = 1 + max(self.height(node.left), self.height(node.right))
-
-    def right_rotate(self, y):
-        x = y.left
-        T2 = x.right
+class AVLVisualizer(OrderStatistics, BinaryTreeVisualizer):
+    journal_kind = "avl"
 
-        x.right = y
-        y.left = T2
+    def __init__(self, canvas):
+        super().__init__(canvas)
+        self.engine = AVLEngine(listener=self)
 
-        self.update_height(y)
-        self.update_height(x)
-        return x
-
-    def left_rotate(self, x):
-        y = x.right
-        T2 = y.left
-
-        y.left = x
-        x.right = T2
+    def height(self, node):
+        return tree_node.height(node)
 
-        self.update_height(x)
-        self.update_height(y)
-        return y
+    def get_balance(self, node):
+        return avl.balance(node)
 
+    @perf.timed("tree_op")
     def insert_avl(self, root, key):
-        if not root:
-            return TreeNode(key)
-        if key < root.val:
-            root.left = self.insert_avl(root.left, key)
-        elif key > root.val:
-            root.right = self.insert_avl(root.right, key)
-        else:
-            return root  # Không chèn trùng
-
-        self.update_height(root)
-        balance = self.get_balance(root)
-
-        # Xử lý 4 case mất cân bằng
-        if balance > 1 and key < root.left.val:  # LL
-            return self.right_rotate(root)
-        if balance < -1 and key > root.right.val:  # RR
-            return self.left_rotate(root)
-        if balance > 1 and key > root.left.val:  # LR
-            root.left = self.left_rotate(root.left)
-            return self.right_rotate(root)
-        if balance < -1 and key < root.right.val:  # RL
-            root.right = self.right_rotate(root.right)
-            return self.left_rotate(root)
-
-        return root
+        return self.engine.insert(root, key)
 
+    @perf.timed("tree_op")
     def delete_avl(self, root, key):
-        # 1. Nếu cây rỗng thì trả về None
-        if not root:
-            return root
-
-        # 2. Tìm node cần xóa theo giá trị key
-        if key < root.val:
-            root.left = self.delete_avl(root.left, key)
-        elif key > root.val:
-            root.right = self.delete_avl(root.right, key)
-        else:
-            # Node cần xóa tìm thấy
-            # Trường hợp node có 1 hoặc 0 con
-            if not root.left:
-                temp = root.right
-                root = None
-                return temp
-            elif not root.right:
-                temp = root.left
-                root = None
-                return temp
-            
-            # Trường hợp node có 2 con
-            # Tìm node nhỏ nhất cây con bên phải (successor)
-            temp = self.get_min_value_node(root.right)
-            # Thay giá trị của node hiện tại bằng giá trị successor
-            root.val = temp.val
-            # Xóa node successor trong cây con bên phải
-            root.right = self.delete_avl(root.right, temp.val)
-
-        # Nếu cây con sau khi xóa trở nên rỗng thì trả về None
-        if not root:
-            return root
-
-        # 3. Cập nhật chiều cao
-        self.update_height(root)
-
-        # 4. Kiểm tra cân bằng
-        balance = self.get_balance(root)
-
-        # 5. Xử lý 4 trường hợp mất cân bằng
-
-        # Left Left Case
-        if balance > 1 and self.get_balance(root.left) >= 0:
-            return self.right_rotate(root)
-
-        # Left Right Case
-        if balance > 1 and self.get_balance(root.left) < 0:
-            root.left = self.left_rotate(root.left)
-            return self.right_rotate(root)
-
-        # Right Right Case
-        if balance < -1 and self.get_balance(root.right) <= 0:
-            return self.left_rotate(root)
-
-        # Right Left Case
-        if balance < -1 and self.get_balance(root.right) > 0:
-            root.right = self.right_rotate(root.right)
-            return self.left_rotate(root)
-
-        return root
-
-
-    def get_min_value_node(self, node):
-        if node is None or node.left is None:
-            return node
-        return self.get_min_value_node(node.left)
-
-    def create_random_tree(self, min_val, max_val, num_nodes):
+        return self.engine.delete(root, key)
+
+    def create_random_tree(self, min_val, max_val, num_nodes, progress=None):
         if max_val - min_val + 1 < num_nodes:
             tk.messagebox.showerror("Error", "Không đủ số lượng giá trị duy nhất trong khoảng để tạo cây.")
             return None
 
-        # Luôn lấy min và max, các giá trị còn lại lấy random
-        if num_nodes == 1:
-            values = [min_val]
-        elif num_nodes == 2:
-            values = [min_val, max_val]
-        else:
-            middle = list(range(min_val + 1, max_val))
-            middle_nodes = random.sample(middle, num_nodes - 2)
-            values = [min_val] + middle_nodes + [max_val]
-            random.shuffle(values)
-
-        root = None
-        for val in values:
-            root = self.insert_avl(root, val)
-        return root
+        # Luôn lấy min và max, các giá trị còn lại lấy mẫu Floyd (không dựng cả khoảng).
+        # Cây TreeNode tách rời (không dùng NodeStore của visualizer) -> chạy được trên thread nền
+        return bst.bulk_load(sampling.random_tree_values(min_val, max_val, num_nodes), progress=progress)
 
     def on_random_tree(self):
         if hasattr(self, "sidebar") and self.sidebar:
@@ -156,19 +40,8 @@ class AVLVisualizer(BinaryTreeVisualizer):
         else:
             tk.messagebox.showerror("Error", "Sidebar not found!")
     def get_array_representation(self):
-        from collections import deque
-        if not self.root:
-            return []
-        result = []
-        queue = deque([self.root])
-        while queue:
-            node = queue.popleft()
-            result.append(node.val)
-            if node.left:
-                queue.append(node.left)
-            if node.right:
-                queue.append(node.right)
-        return result
+        # Dãy inorder (tăng dần) - khớp với cách sidebar "Update tree" gán lại giá trị
+        return [node.val for node in traversal.inorder(self.root)]
 
     def print_avl(self, node):
         if not node:
@@ -218,7 +91,7 @@ class AVLVisualizer(BinaryTreeVisualizer):
         def apply():
             try:
                 new_val = int(entry.get())
-                if self.search(self.root, new_val):
+                if self.value_exists(self.root, new_val):
                     tk.messagebox.showwarning("Warning", "Value already exists in the tree!")
                     return
                 self.root = self.insert_avl(self.root, new_val)
@@ -250,17 +123,7 @@ class AVLVisualizer(BinaryTreeVisualizer):
         )
         agree_btn.pack(side="right")
     def search(self, node, key):
-            if node is None:
-                print(f"search({key}): not found (node is None)")
-                return False
-            print(f"search({key}): checking node {node.val}")
-            if key == node.val:
-                print(f"search({key}): found")
-                return True
-            elif key < node.val:
-                return self.search(node.left, key)
-            else:
-                return self.search(node.right, key)
+        return self.engine.search(node, key)
 
     def delete_node_popup(self, node):
         popup = tk.Toplevel(self.canvas.winfo_toplevel())
@@ -349,7 +212,7 @@ class AVLVisualizer(BinaryTreeVisualizer):
                 if new_val == old_val:
                     popup.destroy()
                     return
-                if self.search(self.root, new_val):
+                if self.value_exists(self.root, new_val):
                     error_label.config(text="Value already exists in the tree!")
                     return
                 self.root = self.delete_avl(self.root, old_val)
@@ -413,9 +276,6 @@ class AVLVisualizer(BinaryTreeVisualizer):
         close_btn.pack(pady=(0, 15), padx=15, anchor="e", side="right")
     def update_tree_from_array(self, new_values):
         # new_values: list các giá trị mới theo thứ tự inorder
-        # Xây lại cây AVL từ đầu với các giá trị mới
-        self.root = None
-        for val in new_values:
-            self.root = self.insert_avl(self.root, val)
-        self.draw_tree(self.root)
+        # Xây lại cây AVL từ đầu với các giá trị mới (bulk load O(n)) trên thread nền
+        self.run_tree_job("Rebuilding tree", lambda progress: bst.bulk_load(new_values, progress=progress))
 
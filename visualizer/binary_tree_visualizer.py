@@ -1,18 +1,26 @@
 import tkinter as tk
 import tkinter.messagebox as messagebox
-from tkinter.filedialog import asksaveasfilename, askopenfilename
+from tkinter.filedialog import asksaveasfilename, askopenfilename, askdirectory
+import gc
+import os
 import random
 import ast
 from tkinter import simpledialog
+from visualizer.spatial_index import SpatialIndex
+from core.tree_node import TreeNode
+from core.node_store import NodeStore, NodeView
+from core.value_index import ValueIndex
+from core.batch import Batch
+from core.jobs import Job
+from core import bst, jobs, journal, perf, persistent, serialization, traversal, tree_node, sampling
+from visualizer import layout
+from components.progress_dialog import ProgressDialog
+
+TREE_FILE_TYPES = [("Text files", "*.txt"), ("Binary tree files", "*" + serialization.BINARY_SUFFIX)]
 
-class TreeNode:
-    def __init__(self, value):
-        self.val = value
-        self.left = None
-        self.right = None
-        self.height = 1 
-        
 class BinaryTreeVisualizer:
+    journal_kind = "binary"  # loại cây ghi trong journal (core.journal.KINDS)
+
     def __init__(self, canvas):
         self.tree_root = None
         self.controller = None
@@ -20,18 +28,364 @@ class BinaryTreeVisualizer:
         self.node_radius = 18 
         self.level_height = 60
         self.highlighted_node = None  
-        self.nodes_positions = [] 
+        self.highlight_range = None  # (lo, hi): tô các node có giá trị trong khoảng (kết quả truy vấn khoảng)
         self.root = None
         self.sidebar = None
         self.zoom = 1.0  # Tỉ lệ zoom mặc định
+        # Retained-mode: node -> [oval_id, text_id, line_id, x, y, parent_xy, val, color, radius]
+        self.canvas_items = {}
+        self.tree_layout = None  # TreeLayout: tọa độ phẳng dùng chung cho vẽ / hit-test / cuộn
+        self._dirty = set()  # node có liên kết con vừa đổi -> draw_tree chỉ cập nhật layout quanh chúng
+        self._relabeled = False  # chỉ có giá trị đổi tại chỗ -> draw_tree giữ nguyên layout, chỉ vẽ lại nhãn
+        self._prepared_layout = None  # layout đã tính sẵn trên thread nền cho cây sắp vẽ
+        self.layout_mode = "tidy"  # một khóa trong layout.LAYOUTS
+        self.horizontal_spacing = 2 * self.node_radius + 8  # khoảng cách tối thiểu giữa tâm hai node cùng tầng
+        self._visible = {}  # node -> (x, y, parent_xy, label, collapsed) đang có item trên canvas
+        self._drawn_root = None
+        self._bbox = None  # hộp bao của layout = scrollregion
+        self._render_pending = None
+        self.lod_cell = 16  # px: cây con hẹp hơn ô này được gộp khi cây vượt ngân sách item
+        self.node_index = SpatialIndex()  # hit-test O(log n) cho các click
+        self.node_store = None  # NodeStore (tùy chọn) thay cho các object TreeNode
+        self.value_index = ValueIndex()  # giá trị -> node, tra cứu / kiểm tra trùng O(1)
+        self.check_tree = False  # Chế độ kiểm tra: xác thực height/size của cả cây ở mỗi lần vẽ
+        self.check_journal = False  # Chế độ kiểm tra: khôi phục journal từ đĩa và so với cây ở mỗi lần vẽ
+        self.engine = None  # BSTEngine / AVLEngine của core (lớp con gán), visualizer là listener của engine
+        self.history = None  # core.persistent.History khi bật undo (engine bền vững)
+        self.history_panel = None
+        self.journal = None  # core.journal.Journal đang ghi các thao tác sửa cây
+        self._journaled_root = None  # cây mà journal đang phản ánh; khác cây được vẽ -> ghi checkpoint
+        self._journal_flush = None
     def set_controller(self, controller):
         self.controller = controller
 
+    def use_node_store(self, enabled=True):
+        # Chuyển cây hiện tại sang NodeStore dạng mảng (hoặc ngược lại về TreeNode)
+        if enabled:
+            self.enable_history(False)  # engine bền vững chỉ chạy trên TreeNode
+        if enabled and self.node_store is None:
+            self.node_store = NodeStore()
+            self.root = self.node_store.view(self.node_store.from_tree(self.root))
+        elif not enabled and self.node_store is not None:
+            self.root = self.node_store.to_tree(self.node_store.from_tree(self.root))
+            self.node_store = None
+        if self.engine is not None:
+            self.engine.store = self.node_store
+        self.highlighted_node = None
+        if self.sidebar:
+            self.sidebar.tree_root = self.root
+
     def set_root(self, root):
+        # Cây mới từ ngoài (file, sidebar, bộ sinh ngẫu nhiên): tính height/size một lần,
+        # sau đó mọi thao tác sửa cây tự cập nhật theo đường đi. Đang dùng NodeStore mà cây là TreeNode
+        # -> chuyển vào store một lần ở đây (engine không nhận cây ngoài store). Trả về root đã gán
+        store = self.node_store
+        if store is None:
+            tree_node.augment(root)
+        elif not (isinstance(root, NodeView) and root.store is store):
+            root = store.view(store.from_tree(tree_node.augment(root)))
         self.root = root
+        return root
 
     def get_root(self):
         return self.root
+
+    def _values(self):
+        # Root bị thay nguyên cây (load, random, clear...) -> dựng lại bảng một lần
+        index = self.value_index
+        if not index.tracks(self.root):
+            index.rebuild(self.root)
+        elif index.check:
+            index.verify(self.root)
+        return index
+
+    def find_value(self, val):
+        return self._values().get(val)
+
+    # --- core.bst.TreeListener: engine báo thay đổi cây ---
+    def node_added(self, root, new_root, node):
+        # Gọi sau mỗi lần chèn: root là gốc trước thao tác, node là node mới (None nếu trùng)
+        index = self.value_index
+        if index.tracks(root):
+            if node is not None:
+                index.add(node)
+            index.root = new_root
+        if node is not None and self.engine is not None:
+            self._journal_op(journal.INSERT, node.val, root=new_root)
+
+    def node_removed(self, root, new_root, key, moved=None):
+        # moved: node có 2 con đã nhận giá trị của successor (successor bị gỡ khỏi cây)
+        index = self.value_index
+        if index.tracks(root):
+            index.discard(key)
+            if moved is not None:
+                index.nodes[moved.val] = moved
+            index.root = new_root
+        self._journal_op(journal.DELETE, key, root=new_root)
+
+    def links_changed(self, *nodes):
+        # Gọi ở mỗi chỗ sửa left/right: cha của node chèn/xóa, node bị xoay, node bị gỡ
+        self._dirty.update(n for n in nodes if n is not None)
+
+    def node_renamed(self, root, node, old):
+        index = self.value_index
+        if index.tracks(root):
+            index.rename(node, old)
+        self._relabeled = True
+        self._journal_op(journal.EDIT, old, node.val, root=root)
+
+    def nodes_copied(self, root, new_root, pairs):
+        # Engine bền vững: bản chép thế chỗ node cũ trong cây đang vẽ (layout, canvas item, bảng giá trị),
+        # node cũ giữ nguyên cho các phiên bản trước -> vẽ lại vẫn chỉ cập nhật cục bộ
+        index = self.value_index
+        tracked = index.tracks(root)
+        tree_layout = self.tree_layout
+        for old, new in pairs:
+            if tree_layout is not None:
+                tree_layout.rebind(old, new)
+            items = self.canvas_items.pop(old, None)
+            if items is not None:
+                self.canvas_items[new] = items
+            if tracked and index.nodes.get(old.val) is old:
+                index.nodes[old.val] = new
+            if self.highlighted_node is old:
+                self.highlighted_node = new
+        if tracked:
+            index.root = new_root
+        if self._drawn_root is root:
+            self._drawn_root = new_root
+
+    # --- Lịch sử phiên bản (undo / redo / snapshot) ---
+    def enable_history(self, enabled=True):
+        # Đổi sang engine bền vững cùng loại: mỗi thao tác chỉ chép O(log n) node, root cũ còn nguyên
+        if self.engine is None:
+            return
+        if enabled and self.history is None:
+            self.use_node_store(False)
+            self.engine = persistent.PERSISTENT[type(self.engine)](listener=self)
+            self.history = persistent.History(self.root)
+        elif not enabled and self.history is not None:
+            self.engine = persistent.MUTABLE[type(self.engine)](listener=self)
+            self.history = None
+            if self.history_panel is not None:
+                self.history_panel.close()
+        self._history_changed()
+
+    def _record_version(self, root):
+        history = self.history
+        changes = self.engine.changes
+        label = ", ".join(changes[:3]) + (f" (+{len(changes) - 3})" if len(changes) > 3 else "")
+        changes.clear()
+        if history.record(root, label or "replace tree"):
+            self._history_changed()
+
+    def _history_changed(self):
+        if self.history_panel is not None:
+            self.history_panel.refresh()
+
+    def goto_version(self, index):
+        if self.history is None or index == self.history.index:
+            return
+        self.highlighted_node = None
+        self._show_tree(self.history.goto(index))
+        self._history_changed()
+
+    def undo(self):
+        if self.history is not None:
+            self.goto_version(self.history.index - 1)
+
+    def redo(self):
+        if self.history is not None:
+            self.goto_version(self.history.index + 1)
+
+    def save_snapshot(self, name):
+        self.history.snapshot(name)
+        self._history_changed()
+
+    def restore_snapshot(self, name):
+        self.highlighted_node = None
+        self._show_tree(self.history.restore(name))
+        self._history_changed()
+
+    def show_history_panel(self):
+        from components.history_panel import HistoryPanel
+        if self.history is None:
+            self.enable_history()
+        if self.history_panel is None:
+            self.history_panel = HistoryPanel(self.canvas.winfo_toplevel(), self)
+        self.history_panel.lift()
+
+    def add_history_menu(self, menu):
+        # Mục undo / history trong menu chuột phải của canvas (chỉ BST / AVL có engine)
+        if self.engine is None:
+            return
+        menu.add_separator()
+        if self.history is None:
+            menu.add_command(label="Enable undo history", command=self.enable_history)
+            return
+        menu.add_command(label="Undo", command=self.undo,
+                         state="normal" if self.history.can_undo() else "disabled")
+        menu.add_command(label="Redo", command=self.redo,
+                         state="normal" if self.history.can_redo() else "disabled")
+        menu.add_command(label="History...", command=self.show_history_panel)
+        menu.add_command(label="Disable undo history", command=lambda: self.enable_history(False))
+
+    # --- Journal thao tác (ghi liên tục, khôi phục sau crash) ---
+    def start_journal(self, directory):
+        # Checkpoint cây hiện tại rồi ghi tiếp từng thao tác vào thư mục phiên
+        self.stop_journal()
+        self.journal = journal.Journal.create(directory, self.journal_kind, self.root)
+        self._journaled_root = self.root
+
+    def stop_journal(self):
+        if self._journal_flush is not None:
+            self.canvas.after_cancel(self._journal_flush)
+            self._journal_flush = None
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def recover_journal(self, directory):
+        # Đọc checkpoint + chạy lại journal trên thread nền, rồi ghi tiếp vào chính phiên đó
+        self.stop_journal()
+        kind = self.journal_kind
+        recovered = {}
+
+        def build(progress):
+            session, root = journal.Journal.recover(directory, progress)
+            if session.kind != kind:
+                session.close()
+                raise journal.JournalError(f"This journal was recorded for a {session.kind} tree.")
+            recovered["journal"] = session
+            return root
+
+        def done():
+            self.journal = recovered["journal"]
+            self._journaled_root = self.root
+
+        return self.run_tree_job("Recovering tree", build, done)
+
+    def _journal_op(self, op, a=0, b=0, c=0, root=None):
+        # root: cây sau thao tác. Bản ghi được gom lại, fsync sau tối đa FLUSH_SECONDS
+        if self.journal is None:
+            return
+        self.journal.append(op, a, b, c)
+        self._journaled_root = root
+        if self._journal_flush is None and self.journal.pending:
+            self._journal_flush = self.canvas.after(int(journal.FLUSH_SECONDS * 1000), self._flush_journal)
+
+    def _journal_path_op(self, op, node, value=0, path=None):
+        # Thao tác của cây nhị phân thường: node được chỉ bằng đường đi từ root
+        if self.journal is None:
+            return
+        bits = journal.path_bits(path if path is not None else traversal.path_to(self.root, node))
+        if bits is None:
+            self._journaled_root = None  # quá sâu để ghi theo đường đi -> checkpoint ở lần vẽ tới
+            return
+        self._journal_op(op, bits[0], bits[1], value, root=self.root)
+
+    def _flush_journal(self):
+        self._journal_flush = None
+        if self.journal is not None:
+            self.journal.flush()
+
+    def _sync_journal(self, root):
+        # Gọi mỗi lần vẽ: cây bị thay nguyên (load, random, clear, undo...) hoặc journal đã dài -> checkpoint
+        if root != self._journaled_root or self.journal.needs_compaction():
+            self.journal.checkpoint(root)
+            self._journaled_root = root
+        if self.check_journal:
+            self.journal.verify(root)
+
+    def add_journal_menu(self, menu):
+        menu.add_separator()
+        if self.journal is None:
+            menu.add_command(label="Start journal...", command=self.on_start_journal)
+        else:
+            menu.add_command(label="Stop journal", command=self.stop_journal)
+        menu.add_command(label="Recover from journal...", command=self.on_recover_journal)
+
+    def on_start_journal(self):
+        directory = askdirectory(title="Journal folder")
+        if not directory:
+            return
+        try:
+            self.start_journal(directory)
+            messagebox.showinfo("Journal", f"Journaling to:\n{directory}")
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not start journal:\n{e}")
+
+    def on_recover_journal(self):
+        directory = askdirectory(title="Journal folder", mustexist=True)
+        if directory:
+            self.recover_journal(directory)
+
+    def begin_batch(self):
+        # Gom nhiều insert / delete / edit (BST/AVL): cây chỉ đổi khi commit(), rồi layout + vẽ lại một lần
+        return Batch(self.engine, self.root, self._commit_batch)
+
+    def _commit_batch(self, root):
+        self._show_tree(root)
+
+    def _show_tree(self, root):
+        # Đặt root mới rồi vẽ lại + cập nhật ô Array của sidebar đúng một lần
+        self.root = root
+        if self.sidebar:
+            self.sidebar.tree_root = root
+        self.draw_tree(root)
+        if hasattr(self.sidebar, "update_array_display"):
+            self.sidebar.array = self.get_array_representation()
+            self.sidebar.update_array_display(self.sidebar.array)
+
+    def run_tree_job(self, title, build, on_done=None, journal_op=None):
+        # build(progress) dựng một cây TreeNode mới trên thread nền, không được chạm vào self.root / canvas.
+        # Cũng trên thread đó: tính height/size, chuyển sang NodeStore mới (nếu đang dùng store) và tính layout;
+        # UI thread chỉ còn đổi root + vẽ các node trong vùng nhìn (install_tree), rồi gọi on_done()
+        use_store = self.node_store is not None
+        mode, sep = self.layout_mode, self.horizontal_spacing * self.zoom
+        level_height, y0 = self.level_height * self.zoom, 40 * self.zoom
+
+        def work(progress):
+            # Dựng hàng trăm nghìn object kéo theo các lượt gc thế hệ 2, mỗi lượt giữ GIL hàng trăm ms
+            # -> UI thread bị giật. Cây không có chu trình: tạm tắt gc trong lúc dựng. gc là của cả process
+            # (cả UI thread cũng không thu rác vòng) nhưng hộp tiến độ là modal nên UI gần như không cấp
+            # phát gì; bật lại ở finally, rác vòng (nếu có) được thu ở lượt gc kế tiếp
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                root = tree_node.augment(build(jobs.substep(progress, 0, 0.8)))
+                progress(0.8)
+                store = None
+                if use_store:
+                    store = NodeStore()
+                    root = store.view(store.from_tree(root))
+                progress(0.9)
+                tree_layout = layout.compute(mode, root, sep, level_height, y0) if root else None
+            finally:
+                if gc_enabled:
+                    gc.enable()
+            return root, store, tree_layout
+
+        def finish(result):
+            self.install_tree(*result, journal_op=journal_op)
+            if on_done is not None:
+                on_done()
+
+        return ProgressDialog(self.canvas.winfo_toplevel(), title, Job(work).start(), finish)
+
+    def install_tree(self, root, store=None, tree_layout=None, journal_op=None):
+        # Nhận kết quả của run_tree_job: đổi NodeStore / root một lần, dùng luôn layout đã tính sẵn.
+        # journal_op: (op, a) khi cây mới suy ra được từ cây cũ bằng một bản ghi (thay cho checkpoint)
+        if store is not None:
+            self.node_store = store
+            if self.engine is not None:
+                self.engine.store = store
+        self.highlighted_node = None
+        self._prepared_layout = tree_layout
+        if journal_op is not None:
+            self._journal_op(*journal_op, root=root)
+        self._show_tree(root)
+
     def bind_click_event(self):
         self.canvas.bind("<Button-1>", self.on_canvas_left_click)   # Chuột trái: chọn node, đổi màu
         self.canvas.bind("<Button-3>", self.on_canvas_right_click)  # Chuột phải: menu node/canvas (Windows/Linux)
@@ -39,15 +393,18 @@ class BinaryTreeVisualizer:
         self.canvas.bind("<Button-1>", self.on_canvas_left_click_show_menu)   # Chuột trái: menu node
         self.canvas.bind("<Button-3>", self.on_canvas_right_click)            # Chuột phải: menu canvas (Windows/Linux)
         self.canvas.bind("<Button-2>", self.on_canvas_right_click)            # Chuột phải: menu canvas (Mac)
+        self.canvas.bind("<Configure>", self.on_viewport_changed)             # Đổi kích thước: vẽ thêm node mới lộ ra
+
+    def node_at(self, x, y):
+        # x, y là tọa độ canvas (đã qua canvasx/canvasy)
+        return self.node_index.query(x, y, self.node_radius * self.zoom)
 
     def on_canvas_left_click_show_menu(self, event):
         x = self.canvas.canvasx(event.x)
         y = self.canvas.canvasy(event.y)
-        for node_x, node_y, node in self.nodes_positions:
-            if (node_x - self.node_radius <= x <= node_x + self.node_radius and
-                node_y - self.node_radius <= y <= node_y + self.node_radius):
-                self.show_node_menu(event, node)
-                return
+        node = self.node_at(x, y)
+        if node is not None:
+            self.show_node_menu(event, node)
 
         # Không làm gì nếu không nhấn vào node
 
@@ -55,23 +412,16 @@ class BinaryTreeVisualizer:
     def on_canvas_left_click(self, event):
         x = self.canvas.canvasx(event.x)
         y = self.canvas.canvasy(event.y)
-        for node_x, node_y, node in self.nodes_positions:
-            if (node_x - self.node_radius <= x <= node_x + self.node_radius and
-                node_y - self.node_radius <= y <= node_y + self.node_radius):
-                self.highlighted_node = node
-                self.draw_tree(self.root)
-                return
-        self.highlighted_node = None
-        self.draw_tree(self.root)
+        self.set_highlight(self.node_at(x, y))
 
 
     def on_canvas_right_click(self, event):
-        x, y = event.x, event.y
-        for node_x, node_y, node in self.nodes_positions:
-            if (node_x - self.node_radius <= x <= node_x + self.node_radius and
-                node_y - self.node_radius <= y <= node_y + self.node_radius):
-                self.show_node_menu(event, node)
-                return
+        x = self.canvas.canvasx(event.x)
+        y = self.canvas.canvasy(event.y)
+        node = self.node_at(x, y)
+        if node is not None:
+            self.show_node_menu(event, node)
+            return
         self.show_canvas_menu(event)
 
     def on_canvas_middle_click(self, event):
@@ -105,118 +455,239 @@ class BinaryTreeVisualizer:
         finally:
             menu.grab_release()
 
+    @perf.timed("draw_tree")
     def draw_tree(self, root):
-        self.canvas.delete("all")
-        self.nodes_positions = []
+        if self.check_tree:
+            tree_node.validate(root)
+        if self.history is not None and root is not self.history.root:
+            self._record_version(root)
+        if self.journal is not None:
+            self._sync_journal(root)
+        dirty, self._dirty = self._dirty, set()
+        relabeled, self._relabeled = self._relabeled, False
+        prepared, self._prepared_layout = self._prepared_layout, None
+        previous = self.tree_layout
+        drawn_root = self._drawn_root
+        self._drawn_root = root
+        self.tree_layout = None
+        self._bbox = None
 
         if root:
-            max_depth = self.get_tree_depth(root)
-
-            # Ước lượng vùng canvas lớn để vẽ thoải mái
-            est_canvas_width = max(1000, int(2 ** max_depth * self.node_radius * 3 * self.zoom))
-            est_canvas_height = int((max_depth + 1) * self.level_height * self.zoom + 100)
-            self.canvas.config(scrollregion=(0, 0, est_canvas_width, est_canvas_height))
-
-            # Dùng midpoint canvas để vẽ root
-            start_x = est_canvas_width // 2
-            start_y = 40 * self.zoom
-
-            # x_offset xác định khoảng cách ngang giữa các node con
-            x_offset = self.node_radius * min(2 ** (max_depth - 1), 16) * self.zoom
-
-            self._draw_subtree(root, start_x, start_y, x_offset, 0)
-
-        # Sau khi vẽ xong, căn giữa lại theo bbox thực tế
-        self.canvas.update_idletasks()
-        bbox = self.canvas.bbox("all")
-        if bbox:
-            self.canvas.config(scrollregion=bbox)
-
-            canvas_width = bbox[2] - bbox[0]
+            # Layout tidy (Reingold–Tilford) / inorder: O(n), không chồng node, root tại x = 0
+            sep = self.horizontal_spacing * self.zoom
+            level_height = self.level_height * self.zoom
+            # Thay đổi nhỏ đã được đánh dấu: chỉ tính lại dây tổ tiên và các cây con bị dịch,
+            # giữ nguyên vị trí cuộn. Chỉ đổi giá trị tại chỗ: tọa độ không đổi, dùng lại layout cũ.
+            # Không được (zoom, đổi cây, layout inorder...) -> tính lại toàn bộ.
+            start = perf.clock()
+            reused = (previous is not None and previous.mode == self.layout_mode
+                      and previous.sep == sep and previous.level_height == level_height
+                      and (previous.update(root, dirty) is not None if dirty
+                           else relabeled and root == drawn_root))
+            if reused:
+                perf.record("layout", start)
+                self.tree_layout = previous
+                xmin, _, xmax, ymax = previous.bbox
+                pad = self.node_radius * self.zoom + 40
+                self._bbox = (xmin - pad, 0, xmax + pad, ymax + pad)
+                self.canvas.config(scrollregion=self._bbox)
+                self.render_viewport()
+                return
+            if (prepared is not None and prepared.mode == self.layout_mode and prepared.sep == sep
+                    and prepared.level_height == level_height and prepared.slot.get(root) == prepared.root_row):
+                self.tree_layout = prepared
+            else:
+                self.tree_layout = layout.compute(self.layout_mode, root, sep, level_height, 40 * self.zoom)
+            perf.record("layout", start)
+            # Vùng cuộn lấy đúng theo hộp bao của layout (có thể âm)
+            xmin, _, xmax, ymax = self.tree_layout.bbox
+            pad = self.node_radius * self.zoom + 40
+            self._bbox = (xmin - pad, 0, xmax + pad, ymax + pad)
+            self.canvas.config(scrollregion=self._bbox)
+
+            # Căn giữa theo hộp bao của layout
+            self.canvas.update_idletasks()
+            canvas_width = self._bbox[2] - self._bbox[0]
             visible_width = self.canvas.winfo_width()
             x = max((canvas_width - visible_width) // 2, 0)
             self.canvas.xview_moveto(x / canvas_width if canvas_width else 0)
 
-            canvas_height = bbox[3] - bbox[1]
+            canvas_height = self._bbox[3] - self._bbox[1]
             visible_height = self.canvas.winfo_height()
             y = max((canvas_height - visible_height) // 2, 0)
             self.canvas.yview_moveto(y / canvas_height if canvas_height else 0)
 
+        self.render_viewport()
 
-    def _draw_subtree(self, node, x, y, x_offset, depth):
-        if node.left:
-            left_x = x - x_offset
-            left_y = y + self.level_height * self.zoom
-            self.canvas.create_line(x, y, left_x, left_y)
-            self._draw_subtree(node.left, left_x, left_y, x_offset // 2, depth + 1)
-
-        if node.right:
-            right_x = x + x_offset
-            right_y = y + self.level_height * self.zoom
-            self.canvas.create_line(x, y, right_x, right_y)
-            self._draw_subtree(node.right, right_x, right_y, x_offset // 2, depth + 1)
-
+    def viewport(self):
+        # Vùng canvas đang nhìn thấy (tọa độ canvas)
+        canvas = self.canvas
+        width = max(canvas.winfo_width(), int(canvas.cget("width") or 0))
+        height = max(canvas.winfo_height(), int(canvas.cget("height") or 0))
+        x0 = canvas.canvasx(0)
+        y0 = canvas.canvasy(0)
+        return x0, y0, x0 + width, y0 + height
+
+    @perf.timed("render")
+    def render_viewport(self):
+        # Chỉ node giao với vùng nhìn thấy (+ lề một tầng) mới có canvas item.
+        # Cây lớn hơn ngân sách (diện tích màn hình / lod_cell²): cây con hẹp hơn lod_cell
+        # được gộp thành một glyph "+N" -> số item tỉ lệ với kích thước màn hình, không phải kích thước cây.
+        self._render_pending = None
+        self._visible = {}
+        self.node_index.clear()
+        tree_layout = self.tree_layout
+        if tree_layout is not None and len(tree_layout):
+            x0, y0, x1, y1 = self.viewport()
+            margin = self.level_height * self.zoom
+            x0, y0, x1, y1 = x0 - margin, y0 - margin, x1 + margin, y1 + margin
+            cell = self.lod_cell
+            budget = max(1, int((x1 - x0) * (y1 - y0)) // (cell * cell))
+            collapse = cell if len(tree_layout) > budget else None
+
+            nodes, xs, ys, size = tree_layout.nodes, tree_layout.xs, tree_layout.ys, tree_layout.size
+            for row, collapsed in tree_layout.query_rect(x0, y0, x1, y1, collapse, budget):
+                node = nodes[row]
+                label = f"+{size[row]}" if collapsed else str(node.val)
+                self._visible[node] = (xs[row], ys[row], tree_layout.parent_xy(row), label, collapsed)
+                self.node_index.add(xs[row], ys[row], node)
+            self.node_index.build()
+
+        # Chỉ tạo / di chuyển / đổi màu / xóa những item thay đổi so với lần vẽ trước
+        self._sync_canvas_items()
+
+    def on_viewport_changed(self, event=None):
+        # Cuộn / đổi kích thước: gộp nhiều sự kiện liên tiếp thành một lần render
+        if self._render_pending is None:
+            self._render_pending = self.canvas.after_idle(self.render_viewport)
+
+    def xview(self, *args):
+        self.canvas.xview(*args)
+        self.on_viewport_changed()
+
+    def yview(self, *args):
+        self.canvas.yview(*args)
+        self.on_viewport_changed()
+
+    def _node_color(self, node):
+        if node == self.highlighted_node:
+            return "grey"
+        visible = self._visible.get(node)
+        if visible is not None and visible[4]:
+            return "#cfd8dc"
+        if self.highlight_range is not None and self.highlight_range[0] <= node.val <= self.highlight_range[1]:
+            return "#ffe082"
+        return "white"
+
+    def _sync_canvas_items(self):
+        canvas = self.canvas
         radius = self.node_radius * self.zoom
-        color = "grey" if node == self.highlighted_node else "white"
-        self.canvas.create_oval(x - radius, y - radius, x + radius, y + radius, fill=color)
-        self.canvas.create_text(x, y, text=str(node.val), font=("Arial", int(12 * self.zoom), "bold"))
-        self.nodes_positions.append((x, y, node))
+        font = ("Arial", int(12 * self.zoom), "bold")
+
+        # Xóa item của các node không còn trong cây / đã ra khỏi vùng nhìn
+        for node in [n for n in self.canvas_items if n not in self._visible]:
+            oval, text, line = self.canvas_items.pop(node)[:3]
+            canvas.delete(oval, text)
+            if line is not None:
+                canvas.delete(line)
+
+        for node, (x, y, parent_xy, label, _) in self._visible.items():
+            color = self._node_color(node)
+            items = self.canvas_items.get(node)
+            if items is None:
+                line = None
+                if parent_xy is not None:
+                    line = canvas.create_line(parent_xy[0], parent_xy[1], x, y, tags=("edge",))
+                    canvas.tag_lower(line)  # cạnh luôn nằm dưới các node
+                oval = canvas.create_oval(x - radius, y - radius, x + radius, y + radius,
+                                          fill=color, tags=("node",))
+                text = canvas.create_text(x, y, text=label, font=font, tags=("label",))
+                self.canvas_items[node] = [oval, text, line, x, y, parent_xy, label, color, radius]
+                continue
+
+            oval, text, line, old_x, old_y, old_parent, old_label, old_color, old_radius = items
+            if x != old_x or y != old_y or radius != old_radius:
+                canvas.coords(oval, x - radius, y - radius, x + radius, y + radius)
+                canvas.coords(text, x, y)
+            if radius != old_radius:
+                canvas.itemconfig(text, font=font)
+            if parent_xy != old_parent or (line is not None and (x != old_x or y != old_y)):
+                if parent_xy is None:
+                    if line is not None:
+                        canvas.delete(line)
+                    line = None
+                elif line is None:
+                    line = canvas.create_line(parent_xy[0], parent_xy[1], x, y, tags=("edge",))
+                    canvas.tag_lower(line)
+                else:
+                    canvas.coords(line, parent_xy[0], parent_xy[1], x, y)
+            if label != old_label:
+                canvas.itemconfig(text, text=label)
+            if color != old_color:
+                canvas.itemconfig(oval, fill=color)
+            items[:] = [oval, text, line, x, y, parent_xy, label, color, radius]
+
+    def set_highlight(self, node):
+        # Đổi node được tô sáng mà không vẽ lại cả cây: tối đa 2 lần itemconfig
+        previous = self.highlighted_node
+        self.highlighted_node = node
+        for n in (previous, node):
+            items = self.canvas_items.get(n) if n is not None else None
+            if items is None:
+                continue
+            color = self._node_color(n)
+            if color != items[7]:
+                self.canvas.itemconfig(items[0], fill=color)
+                items[7] = color
+
+    def set_highlight_range(self, bounds):
+        # Màu được tính theo giá trị lúc vẽ -> chỉ đổi màu các item đang có trên canvas, không cần danh sách node
+        self.highlight_range = bounds
+        for node, items in self.canvas_items.items():
+            color = self._node_color(node)
+            if color != items[7]:
+                self.canvas.itemconfig(items[0], fill=color)
+                items[7] = color
+
+    def clear_canvas(self):
+        self.canvas.delete("all")
+        self.canvas_items = {}
+        self.tree_layout = None
+        self._dirty = set()
+        self._relabeled = False
+        self._visible = {}
+        self._drawn_root = None
+        self._bbox = None
+        self.node_index.clear()
+
+    def bulk_load(self, values):
+        # Cây cân bằng (dùng cho BST/AVL) từ danh sách giá trị, O(n) với dãy đã sắp xếp
+        return bst.bulk_load(values, self.node_store)
 
     def get_tree_depth(self, node):
-        if not node:
-            return 0
-        return 1 + max(self.get_tree_depth(node.left), self.get_tree_depth(node.right))
+        return tree_node.height(node)
 
     def scroll_to_node(self, node):
-
-        if not node or not hasattr(node, 'canvas_x') or not hasattr(node, 'canvas_y'):
+        # Đưa node ra giữa vùng nhìn (node có thể chưa có item vì nằm ngoài viewport)
+        position = self.tree_layout.position(node) if self.tree_layout is not None and node is not None else None
+        if position is None or not self._bbox:
             return
-        # Giả sử node.canvas_x, node.canvas_y là tọa độ node trên canvas
-        canvas = self.canvas
-        canvas_width = int(canvas.cget("width"))
-        canvas_height = int(canvas.cget("height"))
-        x = max(node.canvas_x - canvas_width // 2, 0)
-        y = max(node.canvas_y - canvas_height // 2, 0)
-        canvas.xview_moveto(x / canvas.bbox("all")[2])
-        canvas.yview_moveto(y / canvas.bbox("all")[3])
-
-        for x, y, n in self.nodes_positions:
-            if n == node:
-                # Kích thước vùng vẽ (toàn bộ canvas)
-                bbox = self.canvas.bbox("all")
-                if not bbox:
-                    return
-                total_width = bbox[2]
-                total_height = bbox[3]
-
-                # Kích thước hiển thị canvas
-                visible_width = self.canvas.winfo_width()
-                visible_height = self.canvas.winfo_height()
-
-                # Tính vị trí muốn scroll tới (đưa node ra giữa)
-                x_target = max(min(x - visible_width // 2, total_width - visible_width), 0)
-                y_target = max(min(y - visible_height // 2, total_height - visible_height), 0)
-
-                # Scroll theo tỷ lệ (0.0 -> 1.0)
-                self.canvas.xview_moveto(x_target / total_width)
-                self.canvas.yview_moveto(y_target / total_height)
-                
-                break
+        x, y = position
+        bx0, by0, bx1, by1 = self._bbox
+        vx0, vy0, vx1, vy1 = self.viewport()
+        total_width, total_height = bx1 - bx0, by1 - by0
+        x_target = max(min(x - bx0 - (vx1 - vx0) / 2, total_width - (vx1 - vx0)), 0)
+        y_target = max(min(y - by0 - (vy1 - vy0) / 2, total_height - (vy1 - vy0)), 0)
+        self.canvas.xview_moveto(x_target / total_width)
+        self.canvas.yview_moveto(y_target / total_height)
+        self.render_viewport()
 
     def tree_to_array(self, root):
-        if not root:
-            return []
-        result = []
-        queue = [root]
-        while queue:
-            current = queue.pop(0)
-            if current:
-                result.append(current.val)
-                queue.append(current.left)
-                queue.append(current.right)
-            else:
-                result.append(0)
-        return result
+        # Bảng (value, left, right) theo preorder, left/right là chỉ số dòng (-1 = không có con)
+        return serialization.tree_to_table(root)
+
+    def get_array_representation(self):
+        return self.tree_to_array(self.root)
 
     def edit_node(self, node):
         popup = tk.Toplevel(self.canvas)
@@ -270,10 +741,14 @@ class BinaryTreeVisualizer:
                 if self.value_exists(self.root, new_value) and new_value != node.val:
                     error_label.config(text=f"The value {new_value} already exists in the tree.")
                     return
+                old_value = node.val
                 node.val = new_value
+                if self.value_index.tracks(self.root):
+                    self.value_index.rename(node, old_value)
+                self._journal_path_op(journal.SET_VALUE, node, new_value)
                 self.draw_tree(self.root)
                 if self.sidebar:
-                    new_array = self.tree_to_array(self.root)
+                    new_array = self.get_array_representation()
                     self.sidebar.array = new_array
                     self.sidebar.update_array_display(new_array)
                 popup.destroy()
@@ -289,38 +764,34 @@ class BinaryTreeVisualizer:
 
 
     def delete_node(self, node):
-        def remove_node(parent, target):
-            if parent.left == target:
-                parent.left = None
-            elif parent.right == target:
-                parent.right = None
-
-        def find_and_remove(parent, current, target):
-            if current is None:
-                return
-            if current == target:
-                remove_node(parent, target)
-                return
-            find_and_remove(current, current.left, target)
-            find_and_remove(current, current.right, target)
-
         if self.root == node:
+            self._journal_path_op(journal.CUT, node, path=[node])
             self.root = None
         else:
-            find_and_remove(None, self.root, node)
+            path = traversal.path_to(self.root, node)
+            if path is None:
+                return
+            self._journal_path_op(journal.CUT, node, path=path)
+            if self.value_index.tracks(self.root):
+                self.value_index.remove_subtree(node)
+            parent = path[-2]
+            if parent.left == node:
+                parent.left = None
+            else:
+                parent.right = None
+            tree_node.update_path(path[:-1])
+            self.links_changed(node)
 
         self.draw_tree(self.root)
         if self.sidebar:
-            new_array = self.tree_to_array(self.root)
+            new_array = self.get_array_representation()
             self.sidebar.array = new_array
             self.sidebar.update_array_display(new_array)
 
     def value_exists(self, node, val):
-        if node is None:
-            return False
-        if node.val == val:
-            return True
-        return self.value_exists(node.left, val) or self.value_exists(node.right, val)
+        if node is self.root:
+            return val in self._values()
+        return any(n.val == val for n in traversal.preorder(node))
 
     
     def is_valid_insert(self, parent, val, is_left):
@@ -396,11 +867,16 @@ class BinaryTreeVisualizer:
                 node.left = new_node
             else:
                 node.right = new_node
+            path = traversal.path_to(self.root, node)
+            tree_node.update_path(path)
+            self.node_added(self.root, self.root, new_node)
+            self._journal_path_op(journal.ADD_CHILD, new_node, new_value, path=path + [new_node])
+            self.links_changed(node)
 
             popup.destroy()
             self.draw_tree(self.root)
             if self.sidebar:
-                new_array = self.tree_to_array(self.root)
+                new_array = self.get_array_representation()
                 self.sidebar.array = new_array
                 self.sidebar.update_array_display(new_array)
 
@@ -413,28 +889,19 @@ class BinaryTreeVisualizer:
 
 
     def switch_all_nodes_with_two_children(self):
-        def dfs(node):
-            if node is None:
-                return
-            # Nếu node có đủ cả trái và phải, thì hoán đổi
-            if node.left is not None and node.right is not None:
-                node.left, node.right = node.right, node.left
-            # Đệ quy tiếp các node con
-            dfs(node.left)
-            dfs(node.right)
-
         if self.root is None:
             self.show_toast_notification("The tree is empty.", bg_color="lightcoral")
             return
 
-        dfs(self.root)  # Duyệt cây từ root
+        tree_node.switch_full_nodes(self.root)  # Hoán đổi con của mọi node có đủ hai con
+        self._journal_op(journal.SWITCH_ALL, root=self.root)
 
         self.highlighted_node = None
         self.switching_node = None
         self.draw_tree(self.root)
 
         if self.sidebar:
-            new_array = self.tree_to_array(self.root)
+            new_array = self.get_array_representation()
             self.sidebar.array = new_array
             self.sidebar.update_array_display(new_array)
 
@@ -447,6 +914,8 @@ class BinaryTreeVisualizer:
         menu.add_command(label="Delete tree", command=self.on_clear_tree)
         menu.add_command(label="Save to file", command=self.save_tree_to_file)
         menu.add_command(label="Load from file", command=self.load_tree_from_file)
+        self.add_history_menu(menu)
+        self.add_journal_menu(menu)
         try:
             menu.tk_popup(event.x_root, event.y_root)
         finally:
@@ -528,20 +997,14 @@ class BinaryTreeVisualizer:
                 )
                 return
 
-            arr = sorted(self.generate_random_tree_array(min_value, max_value, depth))
-            tree_root = self.build_random_tree(arr.copy(), 1, depth)
+            self.popup.destroy()
 
-            if tree_root:
-                self.root = tree_root
-                self.draw_tree(self.root)
-                if self.sidebar:
-                    new_array = self.tree_to_array(self.root)
-                    self.sidebar.array = new_array
-                    self.sidebar.update_array_display(new_array)
-            else:
-                messagebox.showwarning("Error", "Failed to create tree.")
+            # Lấy mẫu + dựng 2**depth - 1 node trên thread nền; xong thì thay root, vẽ và cập nhật mảng một lần
+            def build(progress):
+                arr = sorted(self.generate_random_tree_array(min_value, max_value, depth))
+                return self.build_random_tree(arr, 1, depth, progress)
 
-            self.popup.destroy()
+            self.run_tree_job("Creating random tree", build)
 
         except ValueError:
             messagebox.showwarning("Invalid Input", "Please enter valid integers for Min, Max, and Depth.")
@@ -549,45 +1012,33 @@ class BinaryTreeVisualizer:
             messagebox.showerror("Error", f"An error occurred: {e}")
 
     def generate_random_tree_array(self, min_value, max_value, depth):
-        max_nodes = 2**depth - 1
-        all_values = list(range(min_value, max_value + 1))
-
-        if max_nodes > len(all_values):
-            # Không đủ giá trị duy nhất => cho phép trùng
-            array = [random.choice(all_values) for _ in range(max_nodes)]
-            if min_value not in array:
-                array[0] = min_value
-            if max_value not in array:
-                array[-1] = max_value
-            return array
-        else:
-            # Đủ giá trị => đảm bảo min và max có mặt
-            base_values = all_values.copy()
-            base_values.remove(min_value)
-            if max_value != min_value:  # tránh remove 2 lần nếu bằng nhau
-                base_values.remove(max_value)
-
-            sample = random.sample(base_values, max_nodes - 2)
-            sample += [min_value, max_value]
-            random.shuffle(sample)
-            return sample
+        # Luôn có min và max; không đủ giá trị duy nhất => cho phép trùng.
+        # Lấy mẫu Floyd: O(số node) bộ nhớ, không dựng cả khoảng [min, max]
+        return sampling.random_tree_values(min_value, max_value, 2**depth - 1)
         
-    def build_random_tree(self, values, current_depth, max_depth):
+    def build_random_tree(self, values, current_depth, max_depth, progress=None, total=None):
+        # Không dùng self.root / canvas -> chạy được trên thread nền; values bị rút dần
         if not values or current_depth > max_depth:
             return None
-
-        val = values.pop(random.randrange(len(values)))
+        if total is None:
+            total = len(values)
+        jobs.report(progress, total - len(values), total)
+
+        # Lấy một phần tử ngẫu nhiên trong O(1): đổi chỗ với phần tử cuối rồi pop
+        i = random.randrange(len(values))
+        values[i], values[-1] = values[-1], values[i]
+        val = values.pop()
         node = TreeNode(val)
 
         force_create = current_depth < 2  # Ép phải có nhánh lúc đầu cho chắc kèo
 
         # Random nhánh trái
         if values and (force_create or random.random() < 0.7):
-            node.left = self.build_random_tree(values, current_depth + 1, max_depth)
+            node.left = self.build_random_tree(values, current_depth + 1, max_depth, progress, total)
 
         # Random nhánh phải
         if values and (force_create or random.random() < 0.7):
-            node.right = self.build_random_tree(values, current_depth + 1, max_depth)
+            node.right = self.build_random_tree(values, current_depth + 1, max_depth, progress, total)
 
         return node
 
@@ -609,37 +1060,32 @@ class BinaryTreeVisualizer:
             self.depth_hint_label.config(text="")
     
     def on_clear_tree(self):
+        # Qua draw_tree: history / journal thấy root đổi thành None
         self.root = None
+        self.highlighted_node = None
         self.draw_tree(self.root)
         if self.sidebar:
+            self.sidebar.tree_root = None
             self.sidebar.array = []
             self.sidebar.update_array_display([])
 
     def on_find_node(self):
+        # Có sidebar: cùng bộ phân tích truy vấn với ô Find (giá trị, 10..20, #3, rank 7, floor 7...)
+        if self.sidebar:
+            text = simpledialog.askstring("Find Node", "Value or query (10..20, #3, rank 7, floor 7):",
+                                          parent=self.canvas)
+            if text is not None:
+                self.sidebar.search(text)
+            return
         # Hiển thị hộp thoại nhập giá trị node cần tìm
         value = simpledialog.askinteger("Find Node", "Enter node value to find:", parent=self.canvas)
         if value is None:
             return  # Người dùng bấm Cancel
 
-        # Tìm node theo giá trị (duyệt BFS)
-        def find_node(root, val):
-            if not root:
-                return None
-            queue = [root]
-            while queue:
-                node = queue.pop(0)
-                if node and node.val == val:
-                    return node
-                if node:
-                    queue.append(node.left)
-                    queue.append(node.right)
-            return None
-
         try:
-            found_node = find_node(self.root, value)
+            found_node = self.find_value(value)
             if found_node:
-                self.highlighted_node = found_node
-                self.draw_tree(self.root)
+                self.set_highlight(found_node)
                 self.scroll_to_node(found_node)
                 messagebox.showinfo("Found", f"Node with value {value} found and highlighted.")
             else:
@@ -651,24 +1097,9 @@ class BinaryTreeVisualizer:
         if node is None:
             return None
 
-        # Define find_node as a local function
-        def find_node(root, val):
-            if not root:
-                return None
-            queue = [root]
-            while queue:
-                n = queue.pop(0)
-                if n and n.val == val:
-                    return n
-                if n:
-                    queue.append(n.left)
-                    queue.append(n.right)
-            return None
-
-        found_node = find_node(self.root, value)
+        found_node = self.find_value(value)
         if found_node:
-            self.highlighted_node = found_node
-            self.draw_tree(self.root)
+            self.set_highlight(found_node)
             self.scroll_to_node(found_node)  # Đảm bảo gọi dòng này!
             messagebox.showinfo("Found", f"Node {value} found and highlighted.")
         else:
@@ -678,72 +1109,26 @@ class BinaryTreeVisualizer:
         if not self.root:
             messagebox.showwarning("No Tree", "There is no tree to save.")
             return
-        file_path = asksaveasfilename(defaultextension=".txt", filetypes=[("Text files", "*.txt")])
+        file_path = asksaveasfilename(defaultextension=".txt", filetypes=TREE_FILE_TYPES)
         if file_path:
-            arr = self.tree_to_array(self.root)
-            # Ghi mảng ra file, mỗi giá trị cách nhau bởi dấu cách
-            with open(file_path, "w") as f:
-                f.write(" ".join(map(str, arr)))
+            # Đuôi .btree -> định dạng nhị phân, còn lại -> bảng text
+            serialization.save_file(file_path, self.root)
             messagebox.showinfo("Save", "Tree saved successfully!")
 
     def load_tree_from_file(self):
-        file_path = askopenfilename(defaultextension=".txt", filetypes=[("Text files", "*.txt")])
+        file_path = askopenfilename(defaultextension=".txt", filetypes=TREE_FILE_TYPES)
         if not file_path:
             return
-        with open(file_path, "r") as f:
-            content = f.read().strip()
-            if not content:
-                messagebox.showwarning("Empty File", "The selected file is empty.")
-                return
-            arr = [int(x) for x in content.split()]
-        loaded_tree = self.array_to_tree(arr)
-        self.root = loaded_tree  # hoặc self.tree_root = loaded_tree
-        self.draw_tree(self.root)
-        if self.sidebar:
-            arr = self.tree_to_array(self.root)
-            self.sidebar.array = arr
-            self.sidebar.update_array_display(arr)
-
-    def create_random_tree(self, min_val, max_val, depth):
-        
-        max_nodes = 2**depth - 1
-        all_values = list(range(min_val, max_val + 1))
-        if max_nodes > len(all_values):
-            values = [random.choice(all_values) for _ in range(max_nodes)]
-            values[0] = min_val
-            values[-1] = max_val
-        else:
-            base_values = all_values.copy()
-            base_values.remove(min_val)
-            if max_val != min_val:
-                base_values.remove(max_val)
-            values = random.sample(base_values, max_nodes - 2)
-            values += [min_val, max_val]
-            random.shuffle(values)
-
-        def insert_random(root, val):
-            if not root:
-                return TreeNode(val)
-            node = root
-            while True:
-                if random.choice([True, False]):
-                    if node.left is None:
-                        node.left = TreeNode(val)
-                        break
-                    else:
-                        node = node.left
-                else:
-                    if node.right is None:
-                        node.right = TreeNode(val)
-                        break
-                    else:
-                        node = node.right
-            return root
+        if os.path.getsize(file_path) == 0:
+            messagebox.showwarning("Empty File", "The selected file is empty.")
+            return
+        # Đọc file, dựng cây + layout trên thread nền; file lỗi -> hộp thông báo lỗi của job
+        self.run_tree_job("Loading tree", lambda progress: serialization.load_file(file_path, progress))
 
-        root = None
-        for v in values:
-            root = insert_random(root, v)
-        return root
+    def create_random_tree(self, min_val, max_val, depth, progress=None):
+        # Không dùng self -> chạy được trên thread nền (run_tree_job)
+        values = sampling.random_tree_values(min_val, max_val, 2**depth - 1)
+        return sampling.random_insert_tree(values, progress=progress)
 
     def create_random_binary_tree(self):
         # Gọi hàm create_random_tree của BinaryTreeVisualizer với tham số mặc định hoặc tự lấy từ UI nếu có
@@ -752,13 +1137,14 @@ class BinaryTreeVisualizer:
         # Gọi hàm create_random_tree của BinaryTreeVisualizer, truyền tham số nếu cần
         tree_root = visualizer.create_random_tree(1, 99, 10)  
         if tree_root:
-            self.set_root(tree_root)
-            self.draw_tree(tree_root)
+            self.draw_tree(self.set_root(tree_root))
 
     def switch_node(self, node):
         if node is None:
             return
         node.left, node.right = node.right, node.left
+        self._journal_path_op(journal.SWITCH, node)
+        self.links_changed(node)
         self.draw_tree(self.root)
         # Cập nhật array trên sidebar nếu có
         if hasattr(self, "sidebar") and hasattr(self.sidebar, "tree_to_array") and hasattr(self.sidebar, "update_array_display"):
@@ -1,58 +1,39 @@
 import tkinter as tk
 import tkinter.messagebox
-import random
-from visualizer.binary_tree_visualizer import BinaryTreeVisualizer, TreeNode
+import math
+from visualizer.binary_tree_visualizer import BinaryTreeVisualizer
+from core import bst, journal, perf, tree_node, sampling
+from core.bst import BSTEngine
+from core.order_stats import OrderStatistics
 
 # --- BST Visualizer kế thừa BinaryTreeVisualizer ---
-class BSTVisualizer(BinaryTreeVisualizer):
+class BSTVisualizer(OrderStatistics, BinaryTreeVisualizer):
+    journal_kind = "bst"
+
     def __init__(self, canvas):
         super().__init__(canvas)
-        self.horizontal_spacing = 30
+        self.horizontal_spacing = 40
         self.level_height = 50
-    def create_random_tree(self, min_val, max_val, num_nodes):
+        self.layout_mode = "inorder"  # x theo thứ hạng inorder: node xếp trái -> phải theo giá trị
+        # Tự cân bằng lại (DSW) khi độ sâu vượt quá rebalance_factor * log2(n)
+        self.auto_rebalance = False
+        self.rebalance_factor = 2.0
+        self.engine = BSTEngine(listener=self)
+    def create_random_tree(self, min_val, max_val, num_nodes, progress=None):
         if max_val - min_val + 1 < num_nodes:
             tk.messagebox.showerror("Error", "Không đủ số lượng giá trị duy nhất trong khoảng để tạo cây.")
             return None
 
-        values = list(range(min_val, max_val + 1))
-        # Luôn giữ lại min_val và max_val
-        selected = {min_val, max_val}
-
-        # Lấy ngẫu nhiên các giá trị còn lại (trừ min/max)
-        remaining = list(set(values) - selected)
-        sample_count = num_nodes - 2 if num_nodes >= 2 else 0
-        selected.update(random.sample(remaining, sample_count))
-
-        values = list(selected)
-        random.shuffle(values)  # Trộn lại thứ tự để tạo cây đa dạng
-
-        root = None
-        for val in values:
-            root = self.insert_bst(root, val)
-        return root
-
-    def draw_tree(self, root):
-        super().draw_tree(root)  # Gọi hàm cha để vẽ như cũ
-        self.canvas.update_idletasks()
-        bbox = self.canvas.bbox("all")
-        if bbox:
-            self.canvas.config(scrollregion=bbox)
-            canvas_width = bbox[2] - bbox[0]
-            visible_width = self.canvas.winfo_width()
-            x = max((canvas_width - visible_width) // 2, 0)
-            self.canvas.xview_moveto(x / canvas_width if canvas_width else 0)
-            canvas_height = bbox[3] - bbox[1]
-            visible_height = self.canvas.winfo_height()
-            y = max((canvas_height - visible_height) // 2, 0)
-            self.canvas.yview_moveto(y / canvas_height if canvas_height else 0)
+        # Luôn giữ lại min_val và max_val, các giá trị còn lại lấy mẫu Floyd (O(num_nodes) bộ nhớ)
+        selected = sampling.random_tree_values(min_val, max_val, num_nodes)
+
+        # Dựng cây cân bằng từ các giá trị đã chọn (tránh cây suy biến thành chuỗi).
+        # Cây TreeNode tách rời (không dùng NodeStore của visualizer) -> chạy được trên thread nền
+        return bst.bulk_load(selected, progress=progress)
+
+    @perf.timed("tree_op")
     def insert_bst(self, root, val):
-        if not root:
-            return TreeNode(val)
-        if val < root.val:
-            root.left = self.insert_bst(root.left, val)
-        elif val > root.val:
-            root.right = self.insert_bst(root.right, val)
-        return root
+        return self.engine.insert(root, val)
     def insert_node_popup(self, parent_node):
         popup = tk.Toplevel(self.canvas.winfo_toplevel())
         popup.title("Insert Node")
@@ -81,10 +62,11 @@ class BSTVisualizer(BinaryTreeVisualizer):
         def apply_insert():
             try:
                 new_val = int(entry.get())
-                if self.search(self.root, new_val):
+                if self.value_exists(self.root, new_val):
                     error_label.config(text="Value already exists in the tree!")
                     return
                 self.root = self.insert_bst(self.root, new_val)
+                self.maybe_rebalance()
                 self.draw_tree(self.root)
                 if hasattr(self, "sidebar") and hasattr(self.sidebar, "update_array_display"):
                     arr = self.get_array_representation()
@@ -146,11 +128,12 @@ class BSTVisualizer(BinaryTreeVisualizer):
                 if new_val == node.val:
                     popup.destroy()
                     return
-                if self.search(self.root, new_val):
+                if self.value_exists(self.root, new_val):
                     error_label.config(text="Value already exists in the tree!")
                     return
                 self.root = self.delete_node(self.root, node.val)
                 self.root = self.insert_bst(self.root, new_val)
+                self.maybe_rebalance()
                 self.draw_tree(self.root)
                 if hasattr(self, "sidebar") and hasattr(self.sidebar, "update_array_display"):
                     arr = self.get_array_representation()
@@ -167,34 +150,10 @@ class BSTVisualizer(BinaryTreeVisualizer):
         agree_btn.pack(side="right", padx=(0, 8))
         
     def search(self, root, key):
-        if not root:
-            return False
-        if key == root.val:
-            return True
-        elif key < root.val:
-            return self.search(root.left, key)
-        else:
-            return self.search(root.right, key)
+        return self.engine.search(root, key)
+    @perf.timed("tree_op")
     def delete_node(self, root, key):
-        if not root:
-            return None
-        if key < root.val:
-            root.left = self.delete_node(root.left, key)
-        elif key > root.val:
-            root.right = self.delete_node(root.right, key)
-        else:
-            # Node cần xóa tìm thấy
-            if not root.left:
-                return root.right
-            elif not root.right:
-                return root.left
-            # Node có 2 con: tìm node nhỏ nhất bên phải
-            temp = root.right
-            while temp.left:
-                temp = temp.left
-            root.val = temp.val
-            root.right = self.delete_node(root.right, temp.val)
-        return root
+        return self.engine.delete(root, key)
     def delete_node_popup(self, node):
         popup = tk.Toplevel(self.canvas.winfo_toplevel())
         popup.title("Delete Node")
@@ -214,6 +173,7 @@ class BSTVisualizer(BinaryTreeVisualizer):
 
         def do_delete():
             self.root = self.delete_node(self.root, node.val)
+            self.maybe_rebalance()
             self.draw_tree(self.root)
             if hasattr(self, "sidebar") and hasattr(self.sidebar, "update_array_display"):
                 arr = self.get_array_representation()
@@ -235,86 +195,70 @@ class BSTVisualizer(BinaryTreeVisualizer):
             tk.messagebox.showerror("Error", "Sidebar not found!")
 
     def get_array_representation(self):
+        return self.inorder_traversal(self.root)
+
+    def rebuild_with_new_root(self, new_root_node):
+        # Chạy trên thread nền: hộp tiến độ modal giữ cây hiện tại không đổi trong lúc đọc
+        root, key = self.root, new_root_node.val
+        self.run_tree_job("Rebuilding tree", lambda progress: bst.rebuild_with_root(root, key, progress),
+                          journal_op=(journal.TO_ROOT, key))
+
+    def set_new_root(self, node):
+        self.rebuild_with_new_root(node)
+    def inorder_traversal(self, root):
         result = []
-        self._inorder(self.root, result)
+        stack = []
+        node = root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            result.append(node.val)
+            node = node.right
         return result
 
-    def _inorder(self, node, result):
-        if not node:
-            return
-        self._inorder(node.left, result)
-        result.append(node.val)
-        self._inorder(node.right, result)
-        
-    def rebuild_with_new_root(self, new_root_node):
-        # Duyệt cây hiện tại để lấy toàn bộ giá trị
-        all_values = self.inorder_traversal(self.root)
+    def rebalance(self):
+        # Day–Stout–Warren (core.bst): cân bằng lại self.root tại chỗ, O(n) thời gian, O(1) bộ nhớ phụ
+        self.root = self.engine.rebalance(self.root)
+        self._journal_op(journal.REBALANCE, root=self.root)
 
-        # Đảm bảo không bị lỗi nếu node bị trùng
-        all_values.remove(new_root_node.val)
-        random.shuffle(all_values)
+    def _commit_batch(self, root):
+        self.root = root
+        self.maybe_rebalance()
+        super()._commit_batch(self.root)
 
-        # Tạo cây mới với node được chọn làm root
-        self.root = TreeNode(new_root_node.val)
-        for val in all_values:
-            self.root = self.insert_bst(self.root, val)
+    def needs_rebalance(self):
+        # Số node và độ sâu đọc O(1) từ size/height của root
+        count = tree_node.size(self.root)
+        depth = tree_node.height(self.root)
+        return count > 2 and depth > self.rebalance_factor * math.log2(count + 1)
 
-        self.draw_tree(self.root)
+    def maybe_rebalance(self):
+        if self.auto_rebalance and self.needs_rebalance():
+            self.rebalance()
 
+    def on_rebalance(self):
+        self.rebalance()
+        self.draw_tree(self.root)
         if hasattr(self, "sidebar") and hasattr(self.sidebar, "update_array_display"):
             arr = self.get_array_representation()
             self.sidebar.update_array_display(arr)
-    
-    def set_new_root(self, node):
-        self.rebuild_with_new_root(node)
-    def inorder_traversal(self, root):
-        if not root:
-            return []
-        return self.inorder_traversal(root.left) + [root.val] + self.inorder_traversal(root.right)
-    def _calculate_positions(self, node, depth=0, x_offset=0, total_nodes=None):
-        if total_nodes is None:
-            # Đếm tổng số node để căn giữa
-            total_nodes = self.count_nodes(self.root)
-            self._x_start = (self.canvas.winfo_width() // 2) - ((total_nodes // 2) * self.horizontal_spacing)
-        if not node:
-            return x_offset
-
-        x_offset = self._calculate_positions(node.left, depth + 1, x_offset, total_nodes)
-
-        # Đặt vị trí node hiện tại dựa trên thứ tự inorder, căn giữa canvas
-        node.x = self._x_start + x_offset * self.horizontal_spacing
-        node.y = depth * self.level_height + 60
-        self.nodes_positions.append((node, node.x, node.y))
-
-        x_offset += 1
-        x_offset = self._calculate_positions(node.right, depth + 1, x_offset, total_nodes)
-        return x_offset
-    def on_find_node(self):
-        popup = tk.Toplevel(self.canvas.winfo_toplevel())
-        popup.title("Find Node")
-        popup.geometry("320x130")
-        popup.resizable(False, False)
-
-        label = tk.Label(popup, text="Enter value to find:", font=("Arial", 12))
-        label.pack(pady=(10, 0))
-
-        entry = tk.Entry(popup, font=("Arial", 12))
-        entry.pack(pady=(0, 10))
-
-        def find_node():
-            value = entry.get()
-            # Implement the logic to find the node in the BST
-            # If found, highlight the node
-            # If not found, show an error message
-            popup.destroy()
 
-        find_button = tk.Button(popup, text="Find", command=find_node)
-        find_button.pack(pady=(0, 10))
+    def toggle_auto_rebalance(self):
+        self.auto_rebalance = not self.auto_rebalance
+        if self.auto_rebalance and self.needs_rebalance():
+            self.on_rebalance()
 
-    def show_canvas_menu(self, event, node):
+    def show_canvas_menu(self, event):
         menu = tk.Menu(self.canvas, tearoff=0)
         menu.add_command(label="Find node", command=self.on_find_node)
         menu.add_command(label="Create random tree", command=self.on_random_tree)
+        menu.add_command(label="Rebalance tree (DSW)", command=self.on_rebalance)
+        menu.add_command(label="Disable auto rebalance" if self.auto_rebalance else "Enable auto rebalance",
+                         command=self.toggle_auto_rebalance)
+        self.add_history_menu(menu)
+        self.add_journal_menu(menu)
     # ...
         try:
             menu.tk_popup(event.x_root, event.y_root)
@@ -388,7 +332,7 @@ class Sidebar(tk.Frame):
             if self.tree_root is None:
                 raise ValueError("Không tạo được cây")
 
-            self.visualizer.set_root(self.tree_root)
+            self.tree_root = self.visualizer.set_root(self.tree_root)
             self.visualizer.draw_tree(self.tree_root)
 
             if hasattr(self, "tree_to_array") and hasattr(self, "update_array_display"):
@@ -411,38 +355,26 @@ class Sidebar(tk.Frame):
     def update_array_display(self, array):
         # Lưu lại array hiện tại để dùng cho update
         self.array = array.copy()
-        # Xóa frame cũ nếu có
-        if hasattr(self, "array_frame"):
-            self.array_frame.destroy()
-        self.array_frame = tk.Frame(self)
-        self.array_frame.pack(pady=10)
-
-        self.array_entries = []
-        for i, val in enumerate(array):
-            entry = tk.Entry(self.array_frame, width=5, font=("Arial", 12))
-            entry.insert(0, str(val))
-            entry.grid(row=0, column=i, padx=2)
-            self.array_entries.append(entry)
-
-        # Thêm nút Update Tree
-        update_btn = tk.Button(self.array_frame, text="Update Tree", font=("Arial", 12), bg="blue", fg="white",
-                               command=self.on_update_tree)
-        update_btn.grid(row=1, column=0, columnspan=len(array), pady=5)
-            
+        # Một ô Text duy nhất (dựng một lần), mỗi dòng một giá trị: không tạo Entry cho từng giá trị
+        if not hasattr(self, "array_frame"):
+            self.array_frame = tk.Frame(self)
+            self.array_frame.pack(pady=10, fill="both", expand=True)
+            self.array_text = tk.Text(self.array_frame, width=12, height=15, font=("Arial", 12))
+            scroll = tk.Scrollbar(self.array_frame, command=self.array_text.yview)
+            self.array_text.config(yscrollcommand=scroll.set)
+            self.array_text.grid(row=0, column=0, sticky="nsew")
+            scroll.grid(row=0, column=1, sticky="ns")
+            update_btn = tk.Button(self.array_frame, text="Update Tree", font=("Arial", 12), bg="blue", fg="white",
+                                   command=self.on_update_tree)
+            update_btn.grid(row=1, column=0, columnspan=2, pady=5)
+        self.array_text.delete("1.0", "end")
+        self.array_text.insert("1.0", "\n".join(map(str, array)))
+
     def on_update_tree(self):
         try:
-            new_values = [int(entry.get()) for entry in self.array_entries]
-            # Duyệt cây theo inorder để lấy danh sách node
-            inorder_nodes = []
-            def inorder(node):
-                if not node:
-                    return
-                inorder(node.left)
-                inorder_nodes.append(node)
-                inorder(node.right)
-            inorder(self.tree_root)
+            new_values = [int(line) for line in self.array_text.get("1.0", "end").split()]
 
-            if len(new_values) != len(inorder_nodes):
+            if len(new_values) != len(self.array):
                 tk.messagebox.showerror("Lỗi", "Số lượng giá trị không khớp số node trong cây.")
                 return
 
@@ -452,18 +384,16 @@ class Sidebar(tk.Frame):
                     tk.messagebox.showerror("Lỗi", "Giá trị mới không thỏa mãn tính chất BST (inorder phải tăng dần).")
                     return
 
-            changed = False
-            for i, (node, val) in enumerate(zip(inorder_nodes, new_values)):
-                if val != self.array[i]:
-                    node.val = val
-                    changed = True
-
-            if changed:
-                self.visualizer.draw_tree(self.tree_root)
-                if hasattr(self, "tree_to_array"):
-                    self.array = self.tree_to_array(self.tree_root)
-                    self.update_array_display(self.array)
-                tk.messagebox.showinfo("Thành công", "Cập nhật giá trị node thành công.")
+            if new_values != self.array:
+                # Đổi tại chỗ trong một batch -> một lần layout + vẽ lại
+                batch = self.visualizer.begin_batch()
+                batch.relabel(self.array, new_values)
+                self.tree_root = batch.commit()
+                self.array = self.visualizer.inorder_traversal(self.tree_root)
+                if batch.skipped:
+                    tk.messagebox.showwarning("Thông báo", f"Bỏ qua {len(batch.skipped)} giá trị (không có hoặc đã có trong cây).")
+                else:
+                    tk.messagebox.showinfo("Thành công", "Cập nhật giá trị node thành công.")
             else:
                 tk.messagebox.showinfo("Thông báo", "Không có giá trị nào thay đổi.")
 
@@ -561,6 +491,4 @@ class Sidebar(tk.Frame):
                 self.show_toast_notification("No values changed.")
 
     def count_nodes(self, node):
-        if not node:
-            return 0
-        return 1 + self.count_nodes(node.left) + self.count_nodes(node.right)
+        return tree_node.size(node)
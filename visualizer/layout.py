@@ -0,0 +1,512 @@
+from array import array
+
+# Bộ tính layout cho cây nhị phân. Kết quả là TreeLayout dạng mảng phẳng: mỗi node có một dòng cố định
+# (xs/ys/left/right/parents...), dùng chung cho renderer, chỉ mục hit-test, scroll_to_node
+# và hộp bao vùng cuộn. Layout tidy cập nhật được từng phần sau một thay đổi nhỏ (update).
+
+NONE = -1
+
+
+class _Rebuild(Exception):
+    # Thay đổi không cập nhật từng phần được (cấu trúc lạ) -> tính lại toàn bộ
+    pass
+
+
+class TreeLayout:
+    def __init__(self, mode, sep, level_height, y0):
+        self.mode = mode
+        self.sep = sep
+        self.level_height = level_height
+        self.y0 = y0
+        self.nodes = []
+        self.slot = {}
+        self.left = array("q")
+        self.right = array("q")
+        self.parents = array("q")
+        self.depth = array("q")
+        self.xs = array("d")
+        self.ys = array("d")
+        self.xmin = array("d")
+        self.xmax = array("d")
+        self.ymax = array("d")
+        self.size = array("q")
+        # Độ dịch đang treo cho các node bên dưới (dịch cả cây con kiểu lazy, đẩy xuống khi duyệt qua)
+        self.shift_x = array("d")
+        self.shift_depth = array("q")
+        self.root_row = NONE
+        self.bbox = None
+        self._free = []
+        # Trạng thái Reingold–Tilford (chỉ layout tidy): offset tới con / độ dài thread,
+        # con hoặc thread để dò contour, node sâu nhất trái/phải (row, offset, số tầng bên dưới),
+        # lá mà node này đã gắn thread lên
+        self.off = []
+        self.next_left = []
+        self.next_right = []
+        self.lmost = []
+        self.rmost = []
+        self.thread_of = []
+
+    def __len__(self):
+        return len(self.slot)
+
+    def __contains__(self, node):
+        return node in self.slot
+
+    def position(self, node):
+        row = self.slot.get(node)
+        return None if row is None else self._xy(row)
+
+    def rebind(self, old, new):
+        # Engine bền vững thay node bằng bản chép: bản chép nhận luôn dòng (tọa độ) của node cũ
+        row = self.slot.pop(old, None)
+        if row is not None:
+            self.slot[new] = row
+            self.nodes[row] = new
+
+    def parent_xy(self, row):
+        parent = self.parents[row]
+        return None if parent < 0 else self._xy(parent)
+
+    def _xy(self, row):
+        # Tọa độ tuyệt đối: cộng các độ dịch còn treo ở tổ tiên
+        x, d = self.xs[row], self.depth[row]
+        p = self.parents[row]
+        while p >= 0:
+            x += self.shift_x[p]
+            d += self.shift_depth[p]
+            p = self.parents[p]
+        return x, self.y0 + d * self.level_height
+
+    def _shift(self, row, dx, dd):
+        # Dịch row và (lazy) cả cây con của nó
+        self.xs[row] += dx
+        self.xmin[row] += dx
+        self.xmax[row] += dx
+        if dd:
+            self.depth[row] += dd
+            self.ys[row] = self.y0 + self.depth[row] * self.level_height
+            self.ymax[row] += dd * self.level_height
+        self.shift_x[row] += dx
+        self.shift_depth[row] += dd
+
+    def _push(self, row):
+        dx, dd = self.shift_x[row], self.shift_depth[row]
+        if dx or dd:
+            for child in (self.left[row], self.right[row]):
+                if child >= 0:
+                    self._shift(child, dx, dd)
+            self.shift_x[row] = 0.0
+            self.shift_depth[row] = 0
+
+    # --- Dòng (slot) cố định cho mỗi node, dòng trống được dùng lại ---
+    def _new_row(self, node):
+        if self._free:
+            row = self._free.pop()
+            self.nodes[row] = node
+            self.left[row] = self.right[row] = self.parents[row] = NONE
+            self.off[row] = 0.0
+            self.shift_x[row] = 0.0
+            self.shift_depth[row] = 0
+            self.next_left[row] = self.next_right[row] = NONE
+            self.thread_of[row] = NONE
+        else:
+            row = len(self.nodes)
+            self.nodes.append(node)
+            for column in (self.left, self.right, self.parents, self.depth, self.size):
+                column.append(NONE)
+            for column in (self.xs, self.ys, self.xmin, self.xmax, self.ymax, self.shift_x):
+                column.append(0.0)
+            self.shift_depth.append(0)
+            self.off.append(0.0)
+            self.next_left.append(NONE)
+            self.next_right.append(NONE)
+            self.lmost.append(None)
+            self.rmost.append(None)
+            self.thread_of.append(NONE)
+        self.slot[node] = row
+        return row
+
+    def _free_row(self, row):
+        self._clear_thread(row)
+        del self.slot[self.nodes[row]]
+        self.nodes[row] = None
+        self._free.append(row)
+
+    def _clear_thread(self, row):
+        leaf = self.thread_of[row]
+        if leaf != NONE:
+            if self.nodes[leaf] is not None:
+                self.next_left[leaf] = self.left[leaf]
+                self.next_right[leaf] = self.right[leaf]
+                if self.left[leaf] == NONE and self.right[leaf] == NONE:
+                    self.off[leaf] = 0.0
+            self.thread_of[row] = NONE
+
+    def _add_subtree(self, node, parent):
+        # Cấp dòng cho cả cây con mới (preorder), trả về các dòng theo thứ tự đã cấp
+        rows = []
+        stack = [(node, parent, 0)]
+        while stack:
+            n, p, side = stack.pop()
+            row = self._new_row(n)
+            rows.append(row)
+            self.parents[row] = p
+            if side < 0:
+                self.left[p] = self.next_left[p] = row
+            elif side > 0:
+                self.right[p] = self.next_right[p] = row
+            if n.right:
+                stack.append((n.right, row, 1))
+            if n.left:
+                stack.append((n.left, row, -1))
+        return rows
+
+    # --- Reingold–Tilford ---
+    def _setup(self, t):
+        # Đặt hai cây con của t sát nhau nhất có thể (contour cách nhau >= sep), t nằm giữa.
+        # Chỉ đọc trạng thái của hai cây con -> gọi theo thứ tự con trước cha.
+        sep = self.sep
+        off, next_left, next_right = self.off, self.next_left, self.next_right
+        L, R = self.left[t], self.right[t]
+        self.thread_of[t] = NONE
+        if L < 0 and R < 0:
+            off[t] = 0.0
+            self.lmost[t] = self.rmost[t] = (t, 0.0, 0)
+            return
+
+        cursep = rootsep = sep
+        lsum = rsum = 0.0
+        l, r = L, R
+        while l >= 0 and r >= 0:
+            if cursep < sep:
+                rootsep += sep - cursep
+                cursep = sep
+            # Cây con trái: đi theo contour phải
+            if next_right[l] >= 0:
+                lsum += off[l]
+                cursep -= off[l]
+                l = next_right[l]
+            else:
+                lsum -= off[l]
+                cursep += off[l]
+                l = next_left[l]
+            # Cây con phải: đi theo contour trái
+            if next_left[r] >= 0:
+                rsum -= off[r]
+                cursep -= off[r]
+                r = next_left[r]
+            else:
+                rsum += off[r]
+                cursep += off[r]
+                r = next_right[r]
+
+        half = rootsep / 2
+        off[t] = half
+        lsum -= half
+        rsum += half
+
+        LL = self.lmost[L] if L >= 0 else None
+        LR = self.rmost[L] if L >= 0 else None
+        RL = self.lmost[R] if R >= 0 else None
+        RR = self.rmost[R] if R >= 0 else None
+        if LL is None or (RL is not None and RL[2] > LL[2]):
+            self.lmost[t] = (RL[0], RL[1] + half, RL[2] + 1)
+        else:
+            self.lmost[t] = (LL[0], LL[1] - half, LL[2] + 1)
+        if RR is None or (LR is not None and LR[2] > RR[2]):
+            self.rmost[t] = (LR[0], LR[1] - half, LR[2] + 1)
+        else:
+            self.rmost[t] = (RR[0], RR[1] + half, RR[2] + 1)
+
+        # Cây con cao hơn: nối thread từ lá sâu nhất của cây con thấp hơn sang contour còn lại
+        if l >= 0 and l != L:
+            leaf, leaf_off = RR[0], RR[1] + half
+            off[leaf] = abs(leaf_off - lsum)
+            if lsum <= leaf_off:
+                next_left[leaf] = l
+            else:
+                next_right[leaf] = l
+            self.thread_of[t] = leaf
+        elif r >= 0 and r != R:
+            leaf, leaf_off = LL[0], LL[1] - half
+            off[leaf] = abs(leaf_off - rsum)
+            if rsum >= leaf_off:
+                next_right[leaf] = r
+            else:
+                next_left[leaf] = r
+            self.thread_of[t] = leaf
+
+    def _place(self, rows):
+        # Đổi offset tương đối thành tọa độ tuyệt đối (rows: cha trước con)
+        xs, ys, depth, off = self.xs, self.ys, self.depth, self.off
+        left, parents = self.left, self.parents
+        y0, level_height = self.y0, self.level_height
+        for t in rows:
+            p = parents[t]
+            if p < 0:
+                xs[t], depth[t] = 0.0, 0
+            else:
+                xs[t] = xs[p] - off[p] if left[p] == t else xs[p] + off[p]
+                depth[t] = depth[p] + 1
+            ys[t] = y0 + depth[t] * level_height
+
+    def _replace(self, dirty, new_rows):
+        # Như _place nhưng chỉ đi qua các node dirty (từ root xuống). Cây con sạch giữ nguyên hình dạng:
+        # nếu gốc của nó đổi chỗ thì cả cây được dịch lazy trong O(1).
+        # Trả về (các dòng dirty - cha trước con, gốc các cây con / node đã đổi chỗ)
+        xs, ys, depth, off = self.xs, self.ys, self.depth, self.off
+        left, right, parents = self.left, self.right, self.parents
+        y0, level_height = self.y0, self.level_height
+        visited = []
+        moved = []
+        stack = [self.root_row]
+        while stack:
+            t = stack.pop()
+            p = parents[t]
+            if p < 0:
+                x, d = 0.0, 0
+            else:
+                x = xs[p] - off[p] if left[p] == t else xs[p] + off[p]
+                d = depth[p] + 1
+            if t not in dirty:
+                if x != xs[t] or d != depth[t]:
+                    self._shift(t, x - xs[t], d - depth[t])
+                    moved.append(t)
+                continue
+            self._push(t)
+            if x != xs[t] or d != depth[t] or t in new_rows:
+                xs[t], depth[t] = x, d
+                ys[t] = y0 + d * level_height
+                moved.append(t)
+            visited.append(t)
+            if right[t] >= 0:
+                stack.append(right[t])
+            if left[t] >= 0:
+                stack.append(left[t])
+        return visited, moved
+
+    def _compute_extents(self, rows):
+        # Hộp bao (xmin, xmax, ymax) và số node của từng cây con; rows theo thứ tự cha trước con
+        xs, ys, left, right = self.xs, self.ys, self.left, self.right
+        xmin, xmax, ymax, size = self.xmin, self.xmax, self.ymax, self.size
+        for row in reversed(rows):
+            x0 = x1 = xs[row]
+            y1 = ys[row]
+            n = 1
+            for child in (left[row], right[row]):
+                if child >= 0:
+                    if xmin[child] < x0:
+                        x0 = xmin[child]
+                    if xmax[child] > x1:
+                        x1 = xmax[child]
+                    if ymax[child] > y1:
+                        y1 = ymax[child]
+                    n += size[child]
+            xmin[row], xmax[row], ymax[row], size[row] = x0, x1, y1, n
+        r = self.root_row
+        self.bbox = (xmin[r], ys[r], xmax[r], ymax[r]) if r >= 0 else None
+
+    def update(self, root, changed):
+        # Cập nhật sau một thay đổi nhỏ. changed: các node mà liên kết con có thể đã đổi
+        # (cha của node được chèn/xóa, các node bị xoay). Tổ tiên của chúng (theo layout cũ)
+        # được đọc lại liên kết; chỉ những node này (và cây con mới) chạy lại setup và đặt lại tọa độ,
+        # các cây con sạch bị đẩy sang bên được dịch nguyên khối -> chi phí theo độ dài dây, không theo n.
+        # Trả về các node đã đổi chỗ (node trên dây / gốc cây con bị dịch kèm cả cây con),
+        # hoặc None nếu cần tính lại toàn bộ.
+        if self.mode != "tidy" or root is None or self.root_row < 0:
+            return None
+        try:
+            return self._update(root, changed)
+        except _Rebuild:
+            return None
+
+    def _update(self, root, changed):
+        slot, nodes, parents = self.slot, self.nodes, self.parents
+
+        # Dây tổ tiên (theo liên kết cũ) của các node thay đổi
+        spine = set()
+        for node in changed:
+            row = slot.get(node)
+            while row is not None and row >= 0 and row not in spine:
+                spine.add(row)
+                row = parents[row]
+        if not spine:
+            if slot.get(root) != self.root_row:
+                raise _Rebuild
+            return []
+        if len(spine) > len(slot) // 2:
+            raise _Rebuild
+
+        # Đẩy độ dịch đang treo trên dây xuống theo liên kết cũ, trước khi liên kết bị đọc lại
+        stack = [self.root_row]
+        while stack:
+            t = stack.pop()
+            self._push(t)
+            for child in (self.left[t], self.right[t]):
+                if child >= 0 and child in spine:
+                    stack.append(child)
+
+        # Gỡ thread do các node trên dây tạo ra trước khi chạy lại setup
+        for t in spine:
+            self._clear_thread(t)
+
+        # Đọc lại liên kết con từ root, đi qua node trên dây và node mới (cấp dòng mới).
+        # Node sạch giữ nguyên cây con nên mọi đường tới node trên dây đều đi qua dây / node mới.
+        fresh = set()
+
+        def row_of(node):
+            row = slot.get(node)
+            if row is None:
+                row = self._new_row(node)
+                fresh.add(row)
+            return row
+
+        root_row = row_of(root)
+        if root_row not in spine and root_row not in fresh:
+            raise _Rebuild
+        dirty = set()
+        linked = {root_row}
+        candidates = []
+        stack = [root_row]
+        while stack:
+            t = stack.pop()
+            if t in dirty:
+                raise _Rebuild  # Chu trình
+            dirty.add(t)
+            node = nodes[t]
+            for child, column, next_column in ((node.left, self.left, self.next_left),
+                                               (node.right, self.right, self.next_right)):
+                old = column[t]
+                row = NONE if child is None else row_of(child)
+                if row != NONE:
+                    if row in linked:
+                        raise _Rebuild  # Node dùng chung
+                    linked.add(row)
+                    parents[row] = t
+                    if row in spine or row in fresh:
+                        stack.append(row)
+                if old != NONE and old != row:
+                    candidates.append(old)
+                column[t] = next_column[t] = row
+        parents[root_row] = NONE
+        if self.root_row != root_row:
+            candidates.append(self.root_row)
+        candidates.extend(t for t in spine if t not in dirty)
+        self.root_row = root_row
+
+        # Gỡ các cây con không còn được gắn ở đâu (node bị xóa)
+        stack = candidates
+        while stack:
+            row = stack.pop()
+            if row in linked or nodes[row] is None:
+                continue
+            for child in (self.left[row], self.right[row]):
+                if child >= 0:
+                    stack.append(child)
+            self._free_row(row)
+
+        # Setup lại theo thứ tự con trước cha trên phần đã đổi, các cây con sạch giữ nguyên trạng thái
+        order = []
+        stack = [(root_row, False)]
+        while stack:
+            t, done = stack.pop()
+            if done:
+                order.append(t)
+                continue
+            stack.append((t, True))
+            for child in (self.right[t], self.left[t]):
+                if child >= 0 and child in dirty:
+                    stack.append((child, False))
+        if len(order) != len(dirty):
+            raise _Rebuild
+        for t in order:
+            self._setup(t)
+
+        visited, moved = self._replace(dirty, fresh)
+        self._compute_extents(visited)
+        return [nodes[row] for row in moved]
+
+    def query_rect(self, x0, y0, x1, y1, collapse_width=None, limit=None):
+        # Các dòng cần vẽ trong hình chữ nhật: [(row, collapsed)].
+        # Bỏ qua cây con có hộp bao nằm ngoài; con của node trong vùng luôn được trả về (giữ cạnh).
+        # collapse_width: cây con hẹp hơn giá trị này được trả về một lần dưới dạng gộp.
+        result = []
+        if self.root_row < 0:
+            return result
+        xs, ys, left, right = self.xs, self.ys, self.left, self.right
+        xmin, xmax, ymax, size = self.xmin, self.xmax, self.ymax, self.size
+        stack = [(self.root_row, False)]
+        while stack and (limit is None or len(result) < limit):
+            row, parent_inside = stack.pop()
+            if not parent_inside and (xmax[row] < x0 or xmin[row] > x1 or ymax[row] < y0 or ys[row] > y1):
+                continue
+            if collapse_width is not None and size[row] > 1 and xmax[row] - xmin[row] < collapse_width:
+                result.append((row, True))
+                continue
+            inside = x0 <= xs[row] <= x1 and y0 <= ys[row] <= y1
+            if inside or parent_inside:
+                result.append((row, False))
+            self._push(row)
+            if right[row] >= 0:
+                stack.append((right[row], inside))
+            if left[row] >= 0:
+                stack.append((left[row], inside))
+        return result
+
+
+def _build(mode, root, sep, level_height, y0):
+    # Cấp dòng theo preorder: cha luôn đứng trước con
+    tree_layout = TreeLayout(mode, sep, level_height, y0)
+    rows = tree_layout._add_subtree(root, NONE) if root else []
+    tree_layout.root_row = rows[0] if rows else NONE
+    return tree_layout, rows
+
+
+def tidy_layout(root, sep, level_height, y0=0.0):
+    # Reingold–Tilford cho cây nhị phân, O(n): mỗi cha cách đều hai con (offset),
+    # hai cây con được đẩy ra vừa đủ để hai đường viền (contour) cách nhau >= sep.
+    # Contour đi theo thread nối các lá sâu nhất, vị trí lưu tương đối so với cha.
+    tree_layout, rows = _build("tidy", root, sep, level_height, y0)
+    for t in reversed(rows):
+        tree_layout._setup(t)
+    tree_layout._place(rows)
+    tree_layout._compute_extents(rows)
+    return tree_layout
+
+
+def inorder_layout(root, sep, level_height, y0=0.0):
+    # x = thứ hạng inorder * sep (hợp với BST: node xếp theo giá trị), root đặt tại x = 0
+    tree_layout, rows = _build("inorder", root, sep, level_height, y0)
+    left, right, xs = tree_layout.left, tree_layout.right, tree_layout.xs
+    rank = 0
+    stack = []
+    row = tree_layout.root_row
+    while stack or row >= 0:
+        while row >= 0:
+            stack.append(row)
+            row = left[row]
+        row = stack.pop()
+        xs[row] = rank * sep
+        rank += 1
+        row = right[row]
+    if rows:
+        shift = xs[rows[0]]
+        for row in rows:
+            xs[row] -= shift
+    depth, ys, parents = tree_layout.depth, tree_layout.ys, tree_layout.parents
+    for row in rows:
+        p = parents[row]
+        depth[row] = depth[p] + 1 if p >= 0 else 0
+        ys[row] = y0 + depth[row] * level_height
+    tree_layout._compute_extents(rows)
+    return tree_layout
+
+
+LAYOUTS = {
+    "tidy": tidy_layout,
+    "inorder": inorder_layout,
+}
+
+
+def compute(mode, root, sep, level_height, y0=0.0):
+    return LAYOUTS[mode](root, sep, level_height, y0)
@@ -0,0 +1,43 @@
+from bisect import bisect_left, bisect_right
+
+
+class SpatialIndex:
+    # Chỉ mục theo từng hàng (mỗi level của cây có cùng y): danh sách x đã sắp xếp + bisect
+    def __init__(self):
+        self._pending = {}
+        self._ys = []
+        self._rows = {}
+
+    def clear(self):
+        self._pending = {}
+        self._ys = []
+        self._rows = {}
+
+    def add(self, x, y, node):
+        self._pending.setdefault(y, []).append((x, node))
+
+    def build(self):
+        for y, entries in self._pending.items():
+            entries.sort(key=lambda e: e[0])
+            self._rows[y] = ([e[0] for e in entries], [e[1] for e in entries])
+        self._pending = {}
+        self._ys = sorted(self._rows)
+
+    def __len__(self):
+        return sum(len(xs) for xs, _ in self._rows.values())
+
+    def query(self, x, y, radius):
+        # Trả về node gần nhất có hộp bao chứa điểm (x, y), hoặc None
+        best = None
+        best_dist = None
+        lo = bisect_left(self._ys, y - radius)
+        hi = bisect_right(self._ys, y + radius)
+        for row_y in self._ys[lo:hi]:
+            xs, nodes = self._rows[row_y]
+            i = bisect_left(xs, x - radius)
+            j = bisect_right(xs, x + radius)
+            for k in range(i, j):
+                dist = (xs[k] - x) ** 2 + (row_y - y) ** 2
+                if best_dist is None or dist < best_dist:
+                    best, best_dist = nodes[k], dist
+        return best